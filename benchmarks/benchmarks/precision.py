@@ -0,0 +1,46 @@
+"""Benchmarks comparing float32 and float64 precision on the large SWO rasters."""
+
+import numpy as np
+from sklearn.neighbors import KNeighborsRegressor
+
+from sknnr_spatial import wrap
+from sknnr_spatial.datasets import load_swo_ecoplot
+
+
+class PrecisionSuite:
+    """Prediction time, memory, and output size at different float precisions."""
+
+    params = [np.float32, np.float64]
+    param_names = ["dtype"]
+    timeout = 600
+
+    def setup(self, dtype):
+        self.X_image, X, y = load_swo_ecoplot(as_dataset=True, large_rasters=True)
+        self.estimator = wrap(KNeighborsRegressor(n_neighbors=7)).fit(X, y)
+
+    def time_predict(self, dtype):
+        self.estimator.predict(self.X_image, dtype=dtype).compute()
+
+    def peakmem_predict(self, dtype):
+        self.estimator.predict(self.X_image, dtype=dtype).compute()
+
+    def time_kneighbors(self, dtype):
+        dist, _ = self.estimator.kneighbors(self.X_image, dtype=dtype)
+        dist.compute()
+
+    def track_predict_nbytes(self, dtype):
+        return self.estimator.predict(self.X_image, dtype=dtype).nbytes
+
+    track_predict_nbytes.unit = "bytes"
+
+    def track_kneighbors_distance_nbytes(self, dtype):
+        dist, _ = self.estimator.kneighbors(self.X_image, dtype=dtype)
+        return dist.nbytes
+
+    track_kneighbors_distance_nbytes.unit = "bytes"
+
+    def track_kneighbors_nbytes(self, dtype):
+        dist, nn = self.estimator.kneighbors(self.X_image, dtype=dtype)
+        return dist.nbytes + nn.nbytes
+
+    track_kneighbors_nbytes.unit = "bytes"
@@ -0,0 +1,56 @@
+"""Benchmarks comparing neighbor searches to scikit-learn's brute force search."""
+
+import numpy as np
+from sklearn.neighbors import KNeighborsRegressor
+
+from sknnr_spatial.search import IVFKNN, BruteForceKNN, neighbor_recall
+
+
+class BruteForceSearchSuite:
+    """Neighbor search time for a chunk of pixels against many references."""
+
+    params = [[1_000, 10_000, 30_000], [1, 7]]
+    param_names = ["n_references", "n_neighbors"]
+
+    def setup(self, n_references, n_neighbors):
+        rng = np.random.default_rng(0)
+        X = rng.random((n_references, 12))
+        y = rng.random((n_references, 3))
+
+        self.chunk = rng.random((4_096, 12))
+        self.estimator = KNeighborsRegressor(algorithm="brute").fit(X, y)
+        self.search = BruteForceKNN().fit(self.estimator)
+
+    def time_sklearn_kneighbors(self, n_references, n_neighbors):
+        self.estimator.kneighbors(self.chunk, n_neighbors=n_neighbors)
+
+    def time_precomputed_kneighbors(self, n_references, n_neighbors):
+        self.search.kneighbors(self.chunk, n_neighbors=n_neighbors)
+
+
+class IVFSearchSuite:
+    """Approximate search time and recall at different numbers of probed clusters."""
+
+    params = [1, 4, 16]
+    param_names = ["n_probe"]
+
+    def setup(self, n_probe):
+        rng = np.random.default_rng(0)
+        X = rng.random((30_000, 12))
+        y = rng.random((30_000, 3))
+
+        self.chunk = rng.random((4_096, 12))
+        self.estimator = KNeighborsRegressor(algorithm="brute").fit(X, y)
+        self.search = IVFKNN(n_probe=n_probe, random_state=0).fit(self.estimator)
+
+    def time_ivf_kneighbors(self, n_probe):
+        self.search.kneighbors(self.chunk, n_neighbors=7)
+
+    def track_recall(self, n_probe):
+        ind = self.search.kneighbors(self.chunk, n_neighbors=7, return_distance=False)
+        expected = self.estimator.kneighbors(
+            self.chunk, n_neighbors=7, return_distance=False
+        )
+        return neighbor_recall(ind, expected)
+
+    track_recall.unit = "recall"
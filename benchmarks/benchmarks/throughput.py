@@ -0,0 +1,193 @@
+"""Benchmarks of image prediction throughput and memory across image configurations."""
+
+import time
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.neighbors import KNeighborsRegressor
+from sknnr import EuclideanKNNRegressor
+
+from sknnr_spatial import wrap
+from sknnr_spatial.datasets import load_swo_ecoplot, make_synthetic_image
+
+NODATA = -32768.0
+
+# Synthetic images are square with this many pixels per side
+SIZE = 512
+
+ESTIMATORS = {
+    "KNeighborsRegressor": lambda k: KNeighborsRegressor(n_neighbors=k),
+    "EuclideanKNNRegressor": lambda k: EuclideanKNNRegressor(n_neighbors=k),
+    "RandomForestRegressor": lambda k: RandomForestRegressor(
+        n_estimators=10, max_depth=8, random_state=0
+    ),
+}
+
+
+def _make_synthetic_data(image_type="DataArray", chunk_size=128, **kwargs):
+    """Generate a synthetic image of the given type with matching plot data."""
+    X_image, X, y = make_synthetic_image(
+        (SIZE, SIZE),
+        chunks=chunk_size,
+        n_samples=2_000,
+        nodata=NODATA,
+        as_dataset=image_type == "Dataset",
+        random_state=0,
+        **kwargs,
+    )
+    if image_type == "ndarray":
+        X_image = X_image.values
+
+    return X_image, X, y
+
+
+def _compute(result):
+    """Compute a lazy result, or each result of a tuple."""
+    results = result if isinstance(result, tuple) else (result,)
+    for r in results:
+        if hasattr(r, "compute"):
+            r.compute()
+
+
+def _get_pixels_per_second(func, n_pixels):
+    """Time a single call and return its throughput in pixels per second."""
+    start = time.perf_counter()
+    _compute(func())
+    return n_pixels / (time.perf_counter() - start)
+
+
+class ImageTypeSuite:
+    """Prediction throughput and memory for each image type and chunk size."""
+
+    params = [["ndarray", "DataArray", "Dataset"], [128, 512]]
+    param_names = ["image_type", "chunk_size"]
+    timeout = 300
+    number = 1
+    repeat = (1, 3, 60.0)
+
+    def setup(self, image_type, chunk_size):
+        if image_type == "ndarray" and chunk_size != 128:
+            # Numpy images aren't chunked, so only one chunk size is benchmarked
+            raise NotImplementedError
+
+        self.X_image, X, y = _make_synthetic_data(image_type, chunk_size=chunk_size)
+        self.n_pixels = SIZE * SIZE
+        self.estimator = wrap(KNeighborsRegressor(n_neighbors=7)).fit(X, y)
+
+    def time_predict(self, image_type, chunk_size):
+        _compute(self.estimator.predict(self.X_image))
+
+    def peakmem_predict(self, image_type, chunk_size):
+        _compute(self.estimator.predict(self.X_image))
+
+    def track_predict_pixels_per_second(self, image_type, chunk_size):
+        return _get_pixels_per_second(
+            lambda: self.estimator.predict(self.X_image), self.n_pixels
+        )
+
+    track_predict_pixels_per_second.unit = "pixels/s"
+
+
+class BandNoDataSuite:
+    """Prediction throughput and memory by band count and NoData fraction."""
+
+    params = [[4, 16, 32], [0.0, 0.5, 0.9]]
+    param_names = ["n_bands", "nodata_fraction"]
+    timeout = 300
+    number = 1
+    repeat = (1, 3, 60.0)
+
+    def setup(self, n_bands, nodata_fraction):
+        self.X_image, X, y = _make_synthetic_data(
+            n_bands=n_bands, nodata_fraction=nodata_fraction
+        )
+        self.n_pixels = SIZE * SIZE
+        self.estimator = wrap(KNeighborsRegressor(n_neighbors=7)).fit(X, y)
+
+    def time_predict(self, n_bands, nodata_fraction):
+        _compute(self.estimator.predict(self.X_image, nodata_vals=NODATA))
+
+    def peakmem_predict(self, n_bands, nodata_fraction):
+        _compute(self.estimator.predict(self.X_image, nodata_vals=NODATA))
+
+    def track_predict_pixels_per_second(self, n_bands, nodata_fraction):
+        return _get_pixels_per_second(
+            lambda: self.estimator.predict(self.X_image, nodata_vals=NODATA),
+            self.n_pixels,
+        )
+
+    track_predict_pixels_per_second.unit = "pixels/s"
+
+
+class EstimatorSuite:
+    """Prediction and neighbor search throughput for each estimator type and k."""
+
+    params = [list(ESTIMATORS), [1, 7, 25]]
+    param_names = ["estimator", "n_neighbors"]
+    timeout = 300
+    number = 1
+    repeat = (1, 3, 60.0)
+
+    def setup(self, estimator, n_neighbors):
+        if estimator == "RandomForestRegressor" and n_neighbors != 7:
+            # Random forests don't use neighbors, so only one k is benchmarked
+            raise NotImplementedError
+
+        self.X_image, X, y = _make_synthetic_data()
+        self.n_pixels = SIZE * SIZE
+        self.estimator = wrap(ESTIMATORS[estimator](n_neighbors)).fit(X, y)
+
+    def time_predict(self, estimator, n_neighbors):
+        _compute(self.estimator.predict(self.X_image))
+
+    def peakmem_predict(self, estimator, n_neighbors):
+        _compute(self.estimator.predict(self.X_image))
+
+    def track_predict_pixels_per_second(self, estimator, n_neighbors):
+        return _get_pixels_per_second(
+            lambda: self.estimator.predict(self.X_image), self.n_pixels
+        )
+
+    track_predict_pixels_per_second.unit = "pixels/s"
+
+    def time_kneighbors(self, estimator, n_neighbors):
+        if estimator == "RandomForestRegressor":
+            raise NotImplementedError
+
+        _compute(self.estimator.kneighbors(self.X_image))
+
+    def peakmem_kneighbors(self, estimator, n_neighbors):
+        if estimator == "RandomForestRegressor":
+            raise NotImplementedError
+
+        _compute(self.estimator.kneighbors(self.X_image))
+
+
+class SWOEcoplotSuite:
+    """Prediction throughput and memory on the bundled 128x128 SWO rasters."""
+
+    params = [["ndarray", "Dataset"], [32, 128]]
+    param_names = ["image_type", "chunk_size"]
+
+    def setup(self, image_type, chunk_size):
+        if image_type == "ndarray" and chunk_size != 32:
+            raise NotImplementedError
+
+        self.X_image, X, y = load_swo_ecoplot(
+            as_dataset=image_type == "Dataset",
+            chunks={"x": chunk_size, "y": chunk_size},
+        )
+        self.n_pixels = 128 * 128
+        self.estimator = wrap(KNeighborsRegressor(n_neighbors=7)).fit(X, y)
+
+    def time_predict(self, image_type, chunk_size):
+        _compute(self.estimator.predict(self.X_image))
+
+    def peakmem_predict(self, image_type, chunk_size):
+        _compute(self.estimator.predict(self.X_image))
+
+    def track_predict_pixels_per_second(self, image_type, chunk_size):
+        return _get_pixels_per_second(
+            lambda: self.estimator.predict(self.X_image), self.n_pixels
+        )
+
+    track_predict_pixels_per_second.unit = "pixels/s"
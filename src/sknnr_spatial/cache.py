@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from dask.base import tokenize
+from dask.utils import parse_bytes
+from numpy.typing import NDArray
+
+CACHE_SUFFIX = ".npz"
+
+# The minimum number of seconds between rescans of the cache directory for entries
+# written or read by other processes
+RESCAN_INTERVAL = 60.0
+
+
+class ChunkCache:
+    """
+    An on-disk cache of chunk results, keyed by their job and chunk contents.
+
+    Each entry is stored as a separate file in the cache directory. Entries are
+    evicted least recently used first once the cache exceeds its size limit. Use is
+    tracked in memory, starting from the file modification times of existing entries,
+    so writing an entry doesn't scan the directory. Caches can be shared between
+    threads, processes, and runs. Entries written or read by other processes are
+    accounted for by rescanning the directory when the limit is exceeded, at most
+    once every `RESCAN_INTERVAL` seconds, so the limit is approximate while several
+    processes write to the same directory.
+
+    Parameters
+    ----------
+    directory : path-like
+        The directory to store cached results in. It is created if needed.
+    max_size : int or str, default="10GB"
+        The maximum total size of cached results, in bytes or as a string such as
+        "500MB".
+    """
+
+    def __init__(self, directory: str | os.PathLike, max_size: int | str = "10GB"):
+        self.directory = Path(directory)
+        self.max_size = parse_bytes(max_size)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # The size of each known entry, from least to most recently used
+        self._entries: OrderedDict[str, int] | None = None
+        self._total = 0
+        self._scanned = -math.inf
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({str(self.directory)!r}, max_size={self.max_size})"
+        )
+
+    def __getstate__(self) -> dict:
+        # Locks can't be pickled, and other processes track their own use
+        return {"directory": self.directory, "max_size": self.max_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["directory"], max_size=state["max_size"])
+
+    @staticmethod
+    def get_key(job: str, chunk: NDArray) -> str:
+        """Get the key of a chunk processed by a job, hashed from its contents."""
+        return tokenize(job, chunk)
+
+    def _get_path(self, key: str) -> Path:
+        return self.directory / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> NDArray | tuple[NDArray, ...] | None:
+        """Get a cached result, or None if it isn't cached."""
+        path = self._get_path(key)
+
+        # Entries may be evicted by other writers at any time
+        try:
+            with np.load(path) as npz:
+                arrays = [npz[f"arr_{i}"] for i in range(len(npz.files) - 1)]
+                is_tuple = bool(npz["is_tuple"])
+            os.utime(path)
+            size = path.stat().st_size
+        except FileNotFoundError:
+            with self._lock:
+                self._remove(key)
+            return None
+
+        with self._lock:
+            self._add(key, size)
+
+        return tuple(arrays) if is_tuple else arrays[0]
+
+    def set(self, key: str, result: NDArray | tuple[NDArray, ...]) -> None:
+        """Cache a result, evicting the least recently used entries if needed."""
+        is_tuple = isinstance(result, tuple)
+        arrays = result if is_tuple else (result,)
+
+        # Write to a temporary file first so partial entries are never read
+        path = self._get_path(key)
+        tmp_path = path.with_name(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, *arrays, is_tuple=is_tuple)
+        size = tmp_path.stat().st_size
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._add(key, size)
+            if self._total > self.max_size:
+                self._evict()
+
+    @property
+    def size(self) -> int:
+        """The total size of cached results, in bytes."""
+        with self._lock:
+            self._load()
+            return self._total
+
+    def _load(self) -> None:
+        """Index the existing entries if they haven't been indexed yet."""
+        if self._entries is None:
+            self._scan()
+
+    def _scan(self) -> None:
+        """Index the size of each entry on disk, ordered by modification time."""
+        entries = []
+        for path in self.directory.glob(f"*{CACHE_SUFFIX}"):
+            with contextlib.suppress(FileNotFoundError):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total = sum(self._entries.values())
+        self._scanned = time.monotonic()
+
+    def _add(self, key: str, size: int) -> None:
+        """Record an entry as the most recently used."""
+        self._load()
+        self._remove(key)
+        self._entries[key] = size
+        self._total += size
+
+    def _remove(self, key: str) -> None:
+        """Forget an entry, if it's known."""
+        if self._entries is not None and key in self._entries:
+            self._total -= self._entries.pop(key)
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its limit."""
+        if time.monotonic() - self._scanned > RESCAN_INTERVAL:
+            self._scan()
+
+        while self._total > self.max_size and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._get_path(key).unlink(missing_ok=True)
+            self._total -= size
+
+    def clear(self) -> None:
+        """Remove all cached results."""
+        with self._lock:
+            for path in self.directory.glob(f"*{CACHE_SUFFIX}"):
+                path.unlink(missing_ok=True)
+
+            self._entries = OrderedDict()
+            self._total = 0
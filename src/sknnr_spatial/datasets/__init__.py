@@ -1,5 +1,7 @@
 from ._base import load_swo_ecoplot
+from ._synthetic import make_synthetic_image
 
 __all__ = [
     "load_swo_ecoplot",
+    "make_synthetic_image",
 ]
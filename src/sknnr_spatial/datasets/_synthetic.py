@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from functools import partial
+
+import dask.array as da
+import numpy as np
+import pandas as pd
+import xarray as xr
+from numpy.typing import DTypeLike, NDArray
+
+# Integer images store values in [0, 1) scaled to this range, like scaled reflectance
+INTEGER_SCALE = 10_000
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _hash_uniform(seed: int, *coords: NDArray) -> NDArray:
+    """
+    Hash integer coordinates to deterministic uniform values in [0, 1).
+
+    Coordinates are broadcast together and mixed with a SplitMix64 finalizer, so the
+    same coordinates always give the same value regardless of which chunk they're
+    generated in.
+    """
+    h = np.uint64(seed)
+    with np.errstate(over="ignore"):
+        for coord in coords:
+            h = (h ^ np.asarray(coord).astype(np.uint64)) * _GOLDEN_GAMMA
+            h ^= h >> np.uint64(30)
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(27)
+            h *= np.uint64(0x94D049BB133111EB)
+            h ^= h >> np.uint64(31)
+
+    return (h >> np.uint64(11)) * 2.0**-53
+
+
+def _generate_field(
+    rows: NDArray, cols: NDArray, *, n_bands: int, correlation_range: float, seed: int
+) -> NDArray:
+    """
+    Generate spatially autocorrelated values in [0, 1) of shape (rows, cols, bands).
+
+    Values are random at points of a lattice spaced `correlation_range` pixels apart
+    and smoothly interpolated between them. Only lattice points around the requested
+    rows and columns are generated.
+    """
+    bands = np.arange(n_bands)
+    if correlation_range <= 1:
+        return _hash_uniform(
+            seed, rows[:, None, None], cols[None, :, None], bands[None, None, :]
+        )
+
+    # Lattice coordinates, relative to the first lattice point of the requested area
+    y, x = rows / correlation_range, cols / correlation_range
+    y0, x0 = np.floor(y).astype(np.int64), np.floor(x).astype(np.int64)
+    lattice_rows = np.arange(y0.min(), y0.max() + 2)
+    lattice_cols = np.arange(x0.min(), x0.max() + 2)
+    lattice = _hash_uniform(
+        seed,
+        lattice_rows[:, None, None],
+        lattice_cols[None, :, None],
+        bands[None, None, :],
+    )
+
+    # Smoothstep weights avoid visible creases at lattice points
+    wy, wx = y - y0, x - x0
+    wy = (wy * wy * (3 - 2 * wy))[:, None, None]
+    wx = (wx * wx * (3 - 2 * wx))[None, :, None]
+    iy, ix = y0 - lattice_rows[0], x0 - lattice_cols[0]
+
+    top = lattice[iy][:, ix] * (1 - wx) + lattice[iy][:, ix + 1] * wx
+    bottom = lattice[iy + 1][:, ix] * (1 - wx) + lattice[iy + 1][:, ix + 1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def _scale_values(values: NDArray, dtype: np.dtype) -> NDArray:
+    """
+    Scale values in [0, 1) to the range stored by a dtype.
+
+    Integer values are scaled to [0, INTEGER_SCALE), or to [0, max) for dtypes whose
+    maximum is smaller, so they never wrap or reach the default NoData value.
+    """
+    if dtype.kind in "iu":
+        values = np.floor(values * min(INTEGER_SCALE, np.iinfo(dtype).max))
+
+    return values.astype(dtype)
+
+
+def _generate_block(
+    *,
+    palette: NDArray,
+    dtype: np.dtype,
+    nodata: float,
+    nodata_fraction: float,
+    duplicate_fraction: float,
+    correlation_range: float,
+    seed: int,
+    block_info: dict,
+) -> NDArray:
+    """Generate one (bands, y, x) block of the synthetic image."""
+    _, (row_start, row_stop), (col_start, col_stop) = block_info[None]["array-location"]
+    rows, cols = np.arange(row_start, row_stop), np.arange(col_start, col_stop)
+    n_bands = palette.shape[1]
+
+    values = _scale_values(
+        _generate_field(
+            rows,
+            cols,
+            n_bands=n_bands,
+            correlation_range=correlation_range,
+            seed=seed,
+        ),
+        dtype,
+    )
+
+    # Separate streams decide which pixels are duplicated, which value they copy, and
+    # which pixels are NoData.
+    row_grid, col_grid = rows[:, None], cols[None, :]
+    duplicated = _hash_uniform(seed + 1, row_grid, col_grid) < duplicate_fraction
+    copied = _hash_uniform(seed + 2, row_grid, col_grid) * len(palette)
+    values[duplicated] = palette[copied[duplicated].astype(np.int64)]
+
+    values[_hash_uniform(seed + 3, row_grid, col_grid) < nodata_fraction] = nodata
+
+    return np.moveaxis(values, -1, 0)
+
+
+def make_synthetic_image(
+    shape: tuple[int, int] = (1024, 1024),
+    n_bands: int = 8,
+    *,
+    n_samples: int = 1000,
+    n_targets: int = 3,
+    dtype: DTypeLike = np.float32,
+    chunks: int | tuple[int, int] = 1024,
+    correlation_range: float = 32.0,
+    nodata_fraction: float = 0.0,
+    duplicate_fraction: float = 0.0,
+    nodata: float | None = None,
+    as_dataset: bool = False,
+    random_state: int | None = None,
+) -> tuple[xr.DataArray | xr.Dataset, pd.DataFrame, pd.DataFrame]:
+    """
+    Generate a lazy synthetic image with matching plot data.
+
+    Images are backed by Dask and each chunk is generated independently when it's
+    computed, so images far larger than memory can be created instantly and processed
+    without network access or disk storage. Pixel values are deterministic, so the same
+    arguments always generate the same image, regardless of chunking.
+
+    Parameters
+    ----------
+    shape : tuple of int, default=(1024, 1024)
+        The (y, x) size of the image in pixels.
+    n_bands : int, default=8
+        The number of bands in the image and features in the plot data.
+    n_samples : int, default=1000
+        The number of plots to sample from the image.
+    n_targets : int, default=3
+        The number of target attributes of each plot.
+    dtype : data-type, default=np.float32
+        The dtype of the image. Values are in [0, 1) for float dtypes and scaled to
+        [0, 10000) for integer dtypes, or to [0, max) for integer dtypes with a
+        smaller maximum value, e.g. [0, 255) for `np.uint8`.
+    chunks : int or tuple of int, default=1024
+        The (y, x) chunk size of the image. Bands are always stored in one chunk.
+    correlation_range : float, default=32.0
+        The distance in pixels over which values are spatially autocorrelated. Values
+        of 1 or less generate independent pixels.
+    nodata_fraction : float, default=0.0
+        The approximate fraction of pixels that are NoData in all bands.
+    duplicate_fraction : float, default=0.0
+        The approximate fraction of pixels that exactly duplicate the values of one of
+        the plots, and therefore other pixels.
+    nodata : float, optional
+        The value of NoData pixels, stored as the `_FillValue` attribute. Defaults to
+        NaN for float dtypes and the smallest or largest value of signed or unsigned
+        integer dtypes, respectively.
+    as_dataset : bool, default=False
+        If True, return the image as an `xarray.Dataset` with bands as variables.
+        Otherwise, return an `xarray.DataArray` of shape (bands, y, x).
+    random_state : int, optional
+        Seed for the generated values. If not provided, a random image is generated.
+
+    Returns
+    -------
+    tuple
+        Image data as a Dask-backed `xarray.DataArray` or `xarray.Dataset`, and plot
+        data as X and y dataframes.
+
+    Notes
+    -----
+    Plots are sampled at random pixel locations before NoData and duplicated pixels
+    are added, so their features follow the same distribution as the image. Targets
+    are a random linear combination of plot features plus noise.
+
+    Examples
+    --------
+
+    Generate a 50,000x50,000 image without computing it:
+
+    >>> from sknnr_spatial.datasets import make_synthetic_image
+    >>> X_image, X, y = make_synthetic_image((50_000, 50_000), random_state=0)
+    >>> print(X_image.shape)
+    (8, 50000, 50000)
+    >>> print(X.shape, y.shape)
+    (1000, 8) (1000, 3)
+    """
+    dtype = np.dtype(dtype)
+    if nodata is None and dtype.kind == "f":
+        nodata = np.nan
+    elif nodata is None:
+        info = np.iinfo(dtype)
+        nodata = info.min if dtype.kind == "i" else info.max
+
+    for name, fraction in (
+        ("nodata_fraction", nodata_fraction),
+        ("duplicate_fraction", duplicate_fraction),
+    ):
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"`{name}` must be between 0 and 1, not {fraction}.")
+
+    rng = np.random.default_rng(random_state)
+    seed = int(rng.integers(2**62))
+    band_names = [f"b{i}" for i in range(n_bands)]
+
+    # Sample plots one location at a time so only the lattice around each is generated
+    field = partial(
+        _generate_field,
+        n_bands=n_bands,
+        correlation_range=correlation_range,
+        seed=seed,
+    )
+    plot_rows = rng.integers(0, shape[0], size=n_samples)
+    plot_cols = rng.integers(0, shape[1], size=n_samples)
+    palette = np.concatenate(
+        [field(plot_rows[i : i + 1], plot_cols[i : i + 1])[0] for i in range(n_samples)]
+    )
+    palette = _scale_values(palette, dtype)
+
+    weights = rng.normal(size=(n_bands, n_targets))
+    targets = palette.astype(np.float64) @ weights
+    targets += rng.normal(scale=targets.std() * 0.1 + 1e-12, size=targets.shape)
+    X = pd.DataFrame(palette, columns=band_names)
+    y = pd.DataFrame(targets, columns=[f"target{i}" for i in range(n_targets)])
+
+    chunks = (chunks, chunks) if isinstance(chunks, int) else tuple(chunks)
+    data = da.map_blocks(
+        partial(
+            _generate_block,
+            palette=palette,
+            dtype=dtype,
+            nodata=nodata,
+            nodata_fraction=nodata_fraction,
+            duplicate_fraction=duplicate_fraction,
+            correlation_range=correlation_range,
+            seed=seed,
+        ),
+        chunks=da.core.normalize_chunks((n_bands, *chunks), (n_bands, *shape)),
+        dtype=dtype,
+        meta=np.empty((0, 0, 0), dtype=dtype),
+    )
+
+    X_image = xr.DataArray(
+        data,
+        dims=["variable", "y", "x"],
+        coords={"variable": band_names},
+        attrs={"_FillValue": nodata},
+        name="synthetic_image",
+    )
+
+    if as_dataset:
+        X_image = X_image.to_dataset(dim="variable")
+        for var in X_image.data_vars:
+            X_image[var].attrs["_FillValue"] = nodata
+
+    return X_image, X, y
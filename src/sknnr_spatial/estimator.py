@@ -1,25 +1,78 @@
 from __future__ import annotations
 
+import os
+import time
+import tracemalloc
+import warnings
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, cast
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, cast
 from warnings import warn
 
+import dask
 import numpy as np
-from sklearn.base import clone
-from sklearn.utils.validation import _get_feature_names, check_is_fitted
+import xarray as xr
+from dask.utils import parse_bytes
+from sklearn.base import BaseEstimator, clone
+from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+from sklearn.utils.validation import (
+    _get_feature_names,
+    _num_samples,
+    check_is_fitted,
+)
 from typing_extensions import Literal, overload
 
-from .image import Image
+from .image import EXECUTOR_TILE_SIZE, Image, get_nodata_fill
+from .search import neighbor_recall
 from .types import EstimatorType
-from .utils.estimator import is_fitted, suppress_feature_name_warnings
-from .utils.image import image_or_fallback
+from .utils.chunks import RunEstimate
+from .utils.estimator import (
+    get_estimator_type,
+    get_fingerprint,
+    is_fitted,
+    suppress_feature_name_warnings,
+)
+from .utils.image import concat_bands, image_or_fallback
+from .utils.neighbors import (
+    IMPUTE_METHODS,
+    impute_from_neighbors,
+    predict_from_neighbors,
+)
 from .utils.wrapper import AttrWrapper, check_wrapper_implements
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from concurrent.futures import Executor
+
     import pandas as pd
-    from numpy.typing import NDArray
+    from numpy.typing import DTypeLike, NDArray
 
+    from .cache import ChunkCache
+    from .progress import Progress, ProgressTracker
+    from .search import NeighborSearch
     from .types import ImageType, NoDataType
+    from .utils.neighbors import ImputeMethod
+
+# Estimators whose predict method can be replaced by predicting from neighbors
+NEIGHBOR_PREDICTORS: tuple[type[BaseEstimator], ...] = (
+    KNeighborsClassifier,
+    KNeighborsRegressor,
+)
+
+# Options that change how an image is processed, but not the results
+EXECUTION_OPTIONS = (
+    "skip_nodata",
+    "deduplicate",
+    "max_pixels_per_batch",
+    "memory_limit",
+    "chunk_memory",
+    "executor",
+    "cache",
+    "progress",
+)
+
+# Methods whose cost can be estimated by sampling chunks
+ESTIMATE_METHODS = ("predict", "kneighbors", "predict_with_neighbors", "impute")
 
 ESTIMATOR_OUTPUT_DTYPES: dict[str, np.dtype] = {
     "classifier": np.int32,
@@ -32,11 +85,39 @@ ESTIMATOR_OUTPUT_DTYPES: dict[str, np.dtype] = {
 class FittedMetadata:
     """Metadata from a fitted estimator."""
 
+    n_samples: int
     n_targets: int
     target_names: tuple[str | int, ...]
     feature_names: NDArray
 
 
+def _measure_compute(arrays: list) -> tuple[float, int]:
+    """
+    Compute Dask arrays in the current thread, returning the runtime in seconds and
+    the peak memory allocated in bytes.
+
+    Tracing memory slows down allocations, so the arrays are computed once to measure
+    the runtime and again to measure the peak memory.
+    """
+    start = time.perf_counter()
+    dask.compute(*arrays, scheduler="synchronous")
+    runtime = time.perf_counter() - start
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        dask.compute(*arrays, scheduler="synchronous")
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return runtime, peak
+
+
 class ImageEstimator(AttrWrapper[EstimatorType]):
     """
     An sklearn-compatible estimator wrapper with overriden methods for image data.
@@ -46,13 +127,19 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
     wrapped : BaseEstimator
         An sklearn-compatible estimator to wrap with image methods. Fitted estimators
         will be reset when wrapped and must be re-fit after wrapping.
+    search : NeighborSearch, optional
+        A neighbor search fit alongside the estimator and used in place of its
+        `kneighbors` method for images, e.g. `BruteForceKNN`. If given, predictions
+        of KNeighbors regressors and classifiers are derived from the search.
     """
 
     _wrapped: EstimatorType
     _wrapped_meta: FittedMetadata
+    _search: NeighborSearch | None
 
-    def __init__(self, wrapped: EstimatorType):
+    def __init__(self, wrapped: EstimatorType, search: NeighborSearch | None = None):
         super().__init__(self._reset_estimator(wrapped))
+        self._search = search
 
     @staticmethod
     def _reset_estimator(estimator: EstimatorType) -> EstimatorType:
@@ -122,19 +209,37 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
         fitted_feature_names = _get_feature_names(X)
 
         self._wrapped_meta = FittedMetadata(
+            n_samples=_num_samples(X),
             n_targets=self._get_n_targets(y),
             target_names=self._get_target_names(y),
             feature_names=fitted_feature_names
             if fitted_feature_names is not None
             else np.array([]),
         )
+        if self._search is not None:
+            self._search.fit(self._wrapped)
 
         return self
 
     @check_wrapper_implements
     @image_or_fallback
     def predict(
-        self, X_image: ImageType, *, nodata_vals: NoDataType = None, **predict_kwargs
+        self,
+        X_image: ImageType,
+        *,
+        nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
+        n_neighbors: int | Sequence[int] | None = None,
+        **predict_kwargs,
     ) -> ImageType:
         """
         Predict target(s) for X_image.
@@ -153,30 +258,139 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
             NoData values to mask in the output image. A single value will be broadcast
             to all bands while sequences of values will be assigned band-wise. If None,
             values will be inferred if possible based on image metadata.
+        skip_nodata : bool, default=False
+            If True, only pixels without NoData in any band are passed to the
+            estimator, and chunks that are entirely NoData are skipped. This can
+            substantially reduce computation for images with large NoData areas.
+        deduplicate : bool, default=False
+            If True, the estimator is only called with the unique pixels of each
+            chunk, and their results are copied to duplicate pixels. This can reduce
+            computation for images with many identical pixels, e.g. from categorical
+            or masked bands. The number of unique pixels in each chunk is logged at
+            the DEBUG level and recorded by `ChunkProfiler`.
+        dtype : data-type, default=np.float64
+            The floating point dtype used for the image passed to the estimator, for
+            masking NoData, and for floating point outputs. Using `np.float32` halves
+            memory use at the cost of precision.
+        output_nodata : int, optional
+            The value used to mark NoData pixels in integer outputs, e.g. classes or
+            cluster labels. If None, the minimum value of signed dtypes or maximum of
+            unsigned dtypes is used. Floating point outputs always mark NoData with
+            NaN.
+        n_neighbors : int or sequence of int, optional
+            The number of neighbors used to predict, for KNeighbors-style regressors
+            and classifiers. If a sequence is given, neighbors are searched once at
+            the largest value and predictions for each value are stacked along a new
+            `n_neighbors` dimension following the targets. If None, the estimator's
+            own predict method is used.
+        max_pixels_per_batch : int, optional
+            The maximum number of pixels passed to the estimator at once. Chunks are
+            split into batches of pixels to bound peak memory use independently of the
+            chunk size. If None, each chunk is processed at once.
+        memory_limit : int or str, optional
+            The approximate memory available to each batch, in bytes or as a string
+            such as "512MB", used to choose `max_pixels_per_batch`. Memory is estimated
+            from the distance block of shape (pixels, fitted samples) built by
+            neighbor searches. Ignored if `max_pixels_per_batch` is given.
+        chunk_memory : int or str, optional
+            The approximate memory available to process each chunk, in bytes or as a
+            string such as "2GB". If given, a spatial chunk size that fits within the
+            budget is planned from the number of bands, outputs, dtypes, and fitted
+            samples, and Dask-backed images are rechunked to it before processing,
+            keeping bands in a single chunk. In-memory images are processed in tiles of
+            the planned size. The plan is logged at the INFO level.
+        executor : concurrent.futures.Executor, optional
+            An executor used to process tiles of in-memory images concurrently, e.g. a
+            `ThreadPoolExecutor` or `ProcessPoolExecutor`. Results are written into
+            preallocated outputs, and tiles are sized by `chunk_memory` if given.
+            Process workers attach to the estimator's large arrays in shared memory
+            rather than receiving copies. Dask-backed images are computed by Dask's
+            scheduler instead.
+        cache : ChunkCache, optional
+            An on-disk cache of chunk results. Each chunk is looked up by the fitted
+            estimator, neighbor search, options, and chunk contents before being
+            processed, so reprocessing unchanged chunks only reads cached results.
+        progress : ProgressTracker or callable, optional
+            A tracker that each chunk is reported to once processed, to monitor the
+            number of processed chunks and pixels and the throughput of long runs. A
+            callable, e.g. `print`, is called with a `Progress` snapshot after each
+            chunk instead.
         **predict_kwargs
-            Additional arguments passed to the estimator's predict method.
+            Additional arguments passed to the estimator's predict method. They can't
+            be used when predicting from neighbors, i.e. with `n_neighbors` or a
+            neighbor search.
 
         Returns
         -------
         y_image : Numpy or Xarray image with 3 dimensions (y, x, targets)
-            The predicted values.
+            The predicted values. If `n_neighbors` is a sequence, the image has an
+            additional `n_neighbors` dimension.
         """
         output_dim_name = "variable"
         image = Image.from_image(X_image, nodata_vals=nodata_vals)
 
         self._check_feature_names(image.band_names)
+        # Predicting from neighbors bypasses the estimator's predict method, so there's
+        # nowhere to pass its arguments.
+        if predict_kwargs and (n_neighbors is not None or self._predicts_with_search):
+            raise ValueError(
+                "Additional predict arguments "
+                f"{sorted(predict_kwargs)} can't be used when predicting from "
+                "neighbors with `n_neighbors` or a neighbor search."
+            )
 
-        # Any estimator with an undefined type should fall back to floating
-        # point for safety.
-        estimator_type = getattr(self._wrapped, "_estimator_type", "")
-        output_dtype = ESTIMATOR_OUTPUT_DTYPES.get(estimator_type, np.float64)
+        max_pixels_per_batch = self._get_max_pixels_per_batch(
+            max_pixels_per_batch, memory_limit=memory_limit
+        )
+
+        cache_key = self._get_cache_key(
+            cache,
+            "predict",
+            image,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            n_neighbors=n_neighbors,
+            **predict_kwargs,
+        )
+
+        # Predictions are derived from the neighbor search so that it replaces the
+        # estimator's own search in its predict method
+        if n_neighbors is None and self._predicts_with_search:
+            n_neighbors = cast(int, self._wrapped.n_neighbors)
+
+        if n_neighbors is not None:
+            return self._predict_from_neighbors(
+                image,
+                n_neighbors=n_neighbors,
+                skip_nodata=skip_nodata,
+                deduplicate=deduplicate,
+                dtype=dtype,
+                output_nodata=output_nodata,
+                max_pixels_per_batch=max_pixels_per_batch,
+                chunk_memory=chunk_memory,
+                executor=executor,
+                cache=cache,
+                progress=progress,
+                cache_key=cache_key,
+            )
 
         return image.apply_ufunc_across_bands(
             suppress_feature_name_warnings(self._wrapped.predict),
             output_dims=[[output_dim_name]],
-            output_dtypes=[output_dtype],
+            output_dtypes=[self._get_predict_dtype(dtype)],
             output_sizes={output_dim_name: self._wrapped_meta.n_targets},
             output_coords={output_dim_name: list(self._wrapped_meta.target_names)},
+            skip_nodata=skip_nodata,
+            deduplicate=deduplicate,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+            chunk_memory=chunk_memory,
+            executor=executor,
+            cache=cache,
+            progress=progress,
+            cache_key=cache_key,
+            working_bytes_per_pixel=self._working_bytes_per_pixel,
             **predict_kwargs,
         )
 
@@ -190,6 +404,17 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
         n_neighbors: int | None = None,
         return_distance: Literal[False] = False,
         nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        index_dtype: DTypeLike | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
         **kneighbors_kwargs,
     ) -> ImageType: ...
 
@@ -203,6 +428,17 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
         n_neighbors: int | None = None,
         return_distance: Literal[True] = True,
         nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        index_dtype: DTypeLike | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
         **kneighbors_kwargs,
     ) -> tuple[ImageType, ImageType]: ...
 
@@ -215,6 +451,17 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
         n_neighbors: int | None = None,
         return_distance: bool = True,
         nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        index_dtype: DTypeLike | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
         **kneighbors_kwargs,
     ) -> ImageType | tuple[ImageType, ImageType]:
         """
@@ -242,8 +489,40 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
             NoData values to mask in the output image. A single value will be broadcast
             to all bands while sequences of values will be assigned band-wise. If None,
             values will be inferred if possible based on image metadata.
+        skip_nodata : bool, default=False
+            If True, only pixels without NoData in any band are passed to the
+            estimator, and chunks that are entirely NoData are skipped. This can
+            substantially reduce computation for images with large NoData areas.
+        deduplicate : bool, default=False
+            See `predict`.
+        dtype : data-type, default=np.float64
+            The floating point dtype used for the image passed to the estimator, for
+            masking NoData, and for floating point outputs. Using `np.float32` halves
+            memory use at the cost of precision.
+        output_nodata : int, optional
+            The value used to mark NoData pixels in neighbor indices. If None, the
+            minimum value of signed dtypes or maximum of unsigned dtypes is used, e.g.
+            the maximum value of the default unsigned index dtype. Distances always
+            mark NoData with NaN.
+        index_dtype : data-type, optional
+            The integer dtype of the neighbor indices. If None, the smallest dtype
+            that can store every index of the fitted samples and the NoData value is
+            used, e.g. `np.uint16` for up to 65,535 samples.
+        max_pixels_per_batch : int, optional
+            See `predict`.
+        memory_limit : int or str, optional
+            See `predict`.
+        chunk_memory : int or str, optional
+            See `predict`.
+        executor : concurrent.futures.Executor, optional
+            See `predict`.
+        cache : ChunkCache, optional
+            See `predict`.
+        progress : ProgressTracker or callable, optional
+            See `predict`.
         **kneighbors_kwargs
-            Additional arguments passed to the estimator's kneighbors method.
+            Additional arguments passed to the estimator's kneighbors method. They
+            can't be used with a neighbor search.
 
         Returns
         -------
@@ -257,18 +536,1082 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
         k = n_neighbors or cast(int, getattr(self._wrapped, "n_neighbors", 5))
 
         self._check_feature_names(image.band_names)
+        max_pixels_per_batch = self._get_max_pixels_per_batch(
+            max_pixels_per_batch, memory_limit=memory_limit
+        )
+        index_dtype = self._get_index_dtype(index_dtype, output_nodata=output_nodata)
+        cache_key = self._get_cache_key(
+            cache,
+            "kneighbors",
+            image,
+            n_neighbors=k,
+            return_distance=return_distance,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            index_dtype=index_dtype,
+            **kneighbors_kwargs,
+        )
 
         return image.apply_ufunc_across_bands(
-            suppress_feature_name_warnings(self._wrapped.kneighbors),
+            self._get_kneighbors(kneighbors_kwargs),
             output_dims=[["k"], ["k"]] if return_distance else [["k"]],
-            output_dtypes=[float, int] if return_distance else [int],
+            output_dtypes=[dtype, index_dtype] if return_distance else [index_dtype],
             output_sizes={"k": k},
             output_coords={"k": list(range(1, k + 1))},
             n_neighbors=k,
             return_distance=return_distance,
+            skip_nodata=skip_nodata,
+            deduplicate=deduplicate,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+            chunk_memory=chunk_memory,
+            executor=executor,
+            cache=cache,
+            progress=progress,
+            cache_key=cache_key,
+            working_bytes_per_pixel=self._working_bytes_per_pixel,
             **kneighbors_kwargs,
         )
 
+    def predict_with_neighbors(
+        self,
+        X_image: ImageType,
+        *,
+        nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        index_dtype: DTypeLike | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
+        **kneighbors_kwargs,
+    ) -> tuple[ImageType, ImageType, ImageType]:
+        """
+        Predict target(s) and find the K-neighbors of each pixel in a single pass.
+
+        Neighbors are searched once per chunk, and predictions are derived from the
+        neighbors using the estimator's fitted targets and `weights`. This gives the
+        same results as calling `predict` and `kneighbors` at roughly half the cost.
+        Only KNeighbors-style regressors and classifiers are supported.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        nodata_vals : float or sequence of floats, optional
+            NoData values to mask in the output image. A single value will be broadcast
+            to all bands while sequences of values will be assigned band-wise. If None,
+            values will be inferred if possible based on image metadata.
+        skip_nodata : bool, default=False
+            If True, only pixels without NoData in any band are passed to the
+            estimator, and chunks that are entirely NoData are skipped.
+        deduplicate : bool, default=False
+            See `predict`.
+        dtype : data-type, default=np.float64
+            The floating point dtype used for the image passed to the estimator and for
+            floating point outputs.
+        output_nodata : int, optional
+            The value used to mark NoData pixels in integer outputs. If None, the
+            minimum value of signed dtypes or maximum of unsigned dtypes is used.
+        index_dtype : data-type, optional
+            The integer dtype of the neighbor indices. If None, the smallest dtype
+            that can store every index of the fitted samples and the NoData value is
+            used.
+        max_pixels_per_batch : int, optional
+            See `predict`.
+        memory_limit : int or str, optional
+            See `predict`.
+        chunk_memory : int or str, optional
+            See `predict`.
+        executor : concurrent.futures.Executor, optional
+            See `predict`.
+        cache : ChunkCache, optional
+            See `predict`.
+        progress : ProgressTracker or callable, optional
+            See `predict`.
+        **kneighbors_kwargs
+            Additional arguments passed to the estimator's kneighbors method. They
+            can't be used with a neighbor search.
+
+        Returns
+        -------
+        y_image : Numpy or Xarray image with 3 dimensions (y, x, targets)
+            The predicted values.
+        neigh_dist : Numpy or Xarray image with 3 dimensions (y, x, neighbor)
+            Array representing the lengths to points.
+        neigh_ind : Numpy or Xarray image with 3 dimensions (y, x, neighbor)
+            Indices of the nearest points in the population matrix.
+        """
+        self._check_predicts_from_neighbors()
+
+        output_dim_name = "variable"
+        image = Image.from_image(X_image, nodata_vals=nodata_vals)
+        k = cast(int, self._wrapped.n_neighbors)
+
+        self._check_feature_names(image.band_names)
+        max_pixels_per_batch = self._get_max_pixels_per_batch(
+            max_pixels_per_batch, memory_limit=memory_limit
+        )
+        index_dtype = self._get_index_dtype(index_dtype, output_nodata=output_nodata)
+        cache_key = self._get_cache_key(
+            cache,
+            "predict_with_neighbors",
+            image,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            index_dtype=index_dtype,
+            **kneighbors_kwargs,
+        )
+
+        kneighbors = self._get_kneighbors(kneighbors_kwargs)
+        # Avoid capturing the wrapper in the chunk function, which may be pickled
+        wrapped = self._wrapped
+
+        def predict_with_neighbors_chunk(X):
+            dist, ind = kneighbors(
+                X, n_neighbors=k, return_distance=True, **kneighbors_kwargs
+            )
+            y_pred = predict_from_neighbors(wrapped, ind, dist=dist)
+
+            return y_pred, dist, ind
+
+        return image.apply_ufunc_across_bands(
+            predict_with_neighbors_chunk,
+            output_dims=[[output_dim_name], ["k"], ["k"]],
+            output_dtypes=[self._get_predict_dtype(dtype), dtype, index_dtype],
+            output_sizes={output_dim_name: self._wrapped_meta.n_targets, "k": k},
+            output_coords={
+                output_dim_name: list(self._wrapped_meta.target_names),
+                "k": list(range(1, k + 1)),
+            },
+            skip_nodata=skip_nodata,
+            deduplicate=deduplicate,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+            chunk_memory=chunk_memory,
+            executor=executor,
+            cache=cache,
+            progress=progress,
+            cache_key=cache_key,
+            working_bytes_per_pixel=self._working_bytes_per_pixel,
+        )
+
+    def impute(
+        self,
+        X_image: ImageType,
+        attributes: NDArray | pd.DataFrame | pd.Series,
+        *,
+        method: ImputeMethod = "mean",
+        kth: int = 1,
+        n_neighbors: int | None = None,
+        nodata_vals: NoDataType = None,
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
+        **kneighbors_kwargs,
+    ) -> ImageType:
+        """
+        Impute reference attributes for each pixel from its nearest neighbors.
+
+        Neighbors are searched once per chunk and used to impute every attribute, so
+        any number of attributes can be mapped for the cost of a single search.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        attributes : array-like of shape (n_samples,) or (n_samples, n_attributes)
+            Numeric reference attributes for each sample used to fit the estimator.
+            Dataframe columns or a series name are used to name the output attributes.
+        method : {"mean", "weighted_mean", "mode", "kth"}, default="mean"
+            How to impute attributes from the neighbors: their mean, their inverse
+            distance weighted mean, their most common value, or the value of the k-th
+            nearest neighbor.
+        kth : int, default=1
+            The 1-based rank of the neighbor used when `method="kth"`.
+        n_neighbors : int, optional
+            Number of neighbors used for each pixel. The default is the value passed
+            to the wrapped estimator's constructor.
+        nodata_vals : float or sequence of floats, optional
+            NoData values to mask in the output image. A single value will be broadcast
+            to all bands while sequences of values will be assigned band-wise. If None,
+            values will be inferred if possible based on image metadata.
+        skip_nodata : bool, default=False
+            If True, only pixels without NoData in any band are passed to the
+            estimator, and chunks that are entirely NoData are skipped.
+        deduplicate : bool, default=False
+            See `predict`.
+        dtype : data-type, default=np.float64
+            The floating point dtype used for the image passed to the estimator and for
+            floating point outputs.
+        output_nodata : int, optional
+            The value used to mark NoData pixels in integer outputs. If None, the
+            minimum value of signed dtypes or maximum of unsigned dtypes is used.
+        max_pixels_per_batch : int, optional
+            See `predict`.
+        memory_limit : int or str, optional
+            See `predict`.
+        chunk_memory : int or str, optional
+            See `predict`.
+        executor : concurrent.futures.Executor, optional
+            See `predict`.
+        cache : ChunkCache, optional
+            See `predict`.
+        progress : ProgressTracker or callable, optional
+            See `predict`.
+        **kneighbors_kwargs
+            Additional arguments passed to the estimator's kneighbors method. They
+            can't be used with a neighbor search.
+
+        Returns
+        -------
+        attribute_image : Numpy or Xarray image with 3 dimensions (y, x, attribute)
+            The imputed attributes.
+        """
+        if not hasattr(self._wrapped, "kneighbors"):
+            wrapped_class = self._wrapped.__class__.__name__
+            raise NotImplementedError(f"{wrapped_class} does not implement kneighbors.")
+
+        image = Image.from_image(X_image, nodata_vals=nodata_vals)
+        k = n_neighbors or cast(int, getattr(self._wrapped, "n_neighbors", 5))
+
+        self._check_feature_names(image.band_names)
+        max_pixels_per_batch = self._get_max_pixels_per_batch(
+            max_pixels_per_batch, memory_limit=memory_limit
+        )
+        attributes, attribute_names = self._validate_attributes(attributes)
+        self._validate_impute_method(method, kth=kth, k=k)
+        cache_key = self._get_cache_key(
+            cache,
+            "impute",
+            image,
+            attributes=attributes,
+            method=method,
+            kth=kth,
+            n_neighbors=k,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            **kneighbors_kwargs,
+        )
+
+        kneighbors = self._get_kneighbors(kneighbors_kwargs)
+        return_distance = method == "weighted_mean"
+
+        def impute_chunk(X):
+            neighbors = kneighbors(
+                X, n_neighbors=k, return_distance=return_distance, **kneighbors_kwargs
+            )
+            dist, ind = neighbors if return_distance else (None, neighbors)
+
+            return impute_from_neighbors(
+                ind, attributes, method=method, dist=dist, kth=kth
+            )
+
+        return image.apply_ufunc_across_bands(
+            impute_chunk,
+            output_dims=[["variable"]],
+            output_dtypes=[self._get_impute_dtype(attributes, method, dtype=dtype)],
+            output_sizes={"variable": attributes.shape[1]},
+            output_coords={"variable": attribute_names},
+            skip_nodata=skip_nodata,
+            deduplicate=deduplicate,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+            chunk_memory=chunk_memory,
+            executor=executor,
+            cache=cache,
+            progress=progress,
+            cache_key=cache_key,
+            working_bytes_per_pixel=self._working_bytes_per_pixel,
+        )
+
+    def impute_from_neighbors(
+        self,
+        neighbors: ImageType,
+        attributes: NDArray | pd.DataFrame | pd.Series,
+        *,
+        distances: ImageType | None = None,
+        method: ImputeMethod = "mean",
+        kth: int = 1,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+    ) -> ImageType:
+        """
+        Impute reference attributes for each pixel from precomputed neighbors.
+
+        This allows attributes to be mapped from neighbor images returned by
+        `kneighbors` without repeating the neighbor search.
+
+        Parameters
+        ----------
+        neighbors : Numpy or Xarray image with 3 dimensions (y, x, neighbor)
+            Indices of the nearest reference samples of each pixel, sorted by distance,
+            e.g. returned by `kneighbors`. Indices outside the range of the attributes
+            are treated as NoData.
+        attributes : array-like of shape (n_samples,) or (n_samples, n_attributes)
+            Numeric reference attributes for each sample used to fit the estimator.
+            Dataframe columns or a series name are used to name the output attributes.
+        distances : Numpy or Xarray image with 3 dimensions (y, x, neighbor), optional
+            Distances to the nearest reference samples of each pixel, e.g. returned
+            by `kneighbors`. Required when `method="weighted_mean"`.
+        method : {"mean", "weighted_mean", "mode", "kth"}, default="mean"
+            How to impute attributes from the neighbors: their mean, their inverse
+            distance weighted mean, their most common value, or the value of the k-th
+            nearest neighbor.
+        kth : int, default=1
+            The 1-based rank of the neighbor used when `method="kth"`.
+        dtype : data-type, default=np.float64
+            The floating point dtype used for floating point outputs.
+        output_nodata : int, optional
+            The value used to mark NoData pixels in integer outputs. If None, the
+            minimum value of signed dtypes or maximum of unsigned dtypes is used.
+
+        Returns
+        -------
+        attribute_image : Numpy or Xarray image with 3 dimensions (y, x, attribute)
+            The imputed attributes.
+        """
+        attributes, attribute_names = self._validate_attributes(attributes)
+        n_references = attributes.shape[0]
+        k = Image.from_image(neighbors).n_bands
+        self._validate_impute_method(method, kth=kth, k=k)
+
+        if method == "weighted_mean" and distances is None:
+            raise ValueError("`distances` are required when `method='weighted_mean'`.")
+
+        # Distances and indices are stacked into a single image of (dist, ind) bands
+        # to allow imputing them in the same chunks.
+        has_distances = distances is not None
+        image = Image.from_image(
+            concat_bands([distances, neighbors]) if has_distances else neighbors
+        )
+        output_dtype = self._get_impute_dtype(attributes, method, dtype=dtype)
+
+        def impute_chunk(X):
+            dist = X[:, :k] if has_distances else None
+            ind = X[:, -k:].astype(np.intp)
+
+            # Indices can't be negative or out of range unless they mark NoData
+            invalid = ((ind < 0) | (ind >= n_references)).any(axis=1)
+            ind[invalid] = 0
+
+            result = impute_from_neighbors(
+                ind, attributes, method=method, dist=dist, kth=kth
+            )
+            result = result.astype(output_dtype, copy=False)
+            result[invalid] = get_nodata_fill(output_dtype, output_nodata)
+
+            return result
+
+        return image.apply_ufunc_across_bands(
+            impute_chunk,
+            output_dims=[["variable"]],
+            output_dtypes=[output_dtype],
+            output_sizes={"variable": attributes.shape[1]},
+            output_coords={"variable": attribute_names},
+            dtype=np.float64,
+            output_nodata=output_nodata,
+        )
+
+    def measure_recall(
+        self,
+        X_image: ImageType,
+        *,
+        n_neighbors: int | None = None,
+        n_windows: int = 4,
+        window_size: tuple[int, int] = (256, 256),
+        nodata_vals: NoDataType = None,
+        random_state: int | None = None,
+    ) -> float:
+        """
+        Measure the recall of the neighbor search against the estimator's own exact
+        search on a sample of the image.
+
+        Pixels are read from randomly placed windows of the image, and the recall is
+        the fraction of their exact neighbors that the search finds. This is useful
+        for tuning approximate searches like `IVFKNN` before processing an entire
+        image.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        n_neighbors : int, optional
+            Number of neighbors to find for each pixel. The default is the value
+            passed to the wrapped estimator's constructor.
+        n_windows : int, default=4
+            The number of windows sampled from the image.
+        window_size : tuple of int, default=(256, 256)
+            The (rows, columns) size of each sampled window.
+        nodata_vals : float or sequence of floats, optional
+            NoData values of pixels to exclude from the sample. If None, values will
+            be inferred if possible based on image metadata.
+        random_state : int, optional
+            The seed used to place the windows.
+
+        Returns
+        -------
+        float
+            The recall, between 0 and 1.
+        """
+        if self._search is None:
+            raise ValueError(
+                "Measuring recall requires a neighbor search. Pass `search` when "
+                "wrapping the estimator."
+            )
+
+        image = Image.from_image(X_image, nodata_vals=nodata_vals)
+        k = n_neighbors or cast(int, getattr(self._wrapped, "n_neighbors", 5))
+
+        self._check_feature_names(image.band_names)
+        X = image.sample_windows(n_windows, window_size, random_state=random_state)
+
+        ind = self._search.kneighbors(X, n_neighbors=k, return_distance=False)
+        expected_ind = suppress_feature_name_warnings(self._wrapped.kneighbors)(
+            X, n_neighbors=k, return_distance=False
+        )
+
+        return neighbor_recall(ind, expected_ind)
+
+    def estimate(
+        self,
+        X_image: ImageType,
+        *,
+        method_name: Literal[
+            "predict", "kneighbors", "predict_with_neighbors", "impute"
+        ] = "predict",
+        n_samples: int = 3,
+        random_state: int | None = None,
+        **method_kwargs,
+    ) -> RunEstimate:
+        """
+        Estimate the runtime, per-task peak memory, and in-memory output size of
+        processing an image, without processing all of it.
+
+        The Dask graph of the method is built as it would be for the full image, and a
+        random sample of its chunks are processed in sequence to measure their runtime
+        and peak memory, which are extrapolated to every chunk. In-memory images are
+        sampled in the tiles they would be processed in. Images that would be
+        processed in a single chunk are sampled in tiles of `EXECUTOR_TILE_SIZE`, and
+        their runtime and peak memory are scaled up to the full image by the number of
+        pixels. This is useful for checking that a large run fits in memory and for
+        choosing options like `chunk_memory` before launching it.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        method_name : {"predict", "kneighbors", "predict_with_neighbors", "impute"}, \
+            default="predict"
+            The name of the method to estimate.
+        n_samples : int, default=3
+            The number of chunks to process. More samples give better estimates for
+            images where chunks vary, e.g. in the amount of NoData.
+        random_state : int, optional
+            The seed used to select the sampled chunks.
+        **method_kwargs
+            Additional arguments passed to the method, e.g. `chunk_memory`.
+
+        Returns
+        -------
+        RunEstimate
+            The number of tasks and the estimated runtime, peak memory, and in-memory
+            output size.
+
+        Notes
+        -----
+        Peak memory is measured with `tracemalloc`, which tracks memory allocated by
+        Python and Numpy, but not by other libraries, e.g. BLAS buffers or GDAL block
+        caches. Runtime assumes chunks are processed in sequence, so the runtime with
+        multiple workers is approximately divided by the number of workers.
+        """
+        if method_name not in ESTIMATE_METHODS:
+            raise ValueError(
+                f"`method_name` must be one of {ESTIMATE_METHODS}, not {method_name!r}."
+            )
+        if n_samples < 1:
+            raise ValueError(f"`n_samples` must be at least 1, not {n_samples}.")
+
+        lazy_image, single_task = self._get_lazy_image(
+            X_image,
+            executor=method_kwargs.get("executor"),
+            chunk_memory=method_kwargs.get("chunk_memory"),
+        )
+        with warnings.catch_warnings():
+            # Band names are only added to arrays to build the graph
+            if isinstance(X_image, np.ndarray):
+                warnings.filterwarnings("ignore", message="X_image has feature names")
+            result = getattr(self, method_name)(lazy_image, **method_kwargs)
+
+        arrays = [
+            var.data
+            for output in (result if isinstance(result, tuple) else (result,))
+            for var in (
+                output.data_vars.values()
+                if isinstance(output, xr.Dataset)
+                else (output,)
+            )
+        ]
+        # Outputs are (..., y, x) and share a chunk grid, since they're computed by the
+        # same tasks.
+        y_chunks, x_chunks = arrays[0].chunks[-2:]
+        n_tasks = len(y_chunks) * len(x_chunks)
+
+        rng = np.random.default_rng(random_state)
+        sampled = rng.choice(n_tasks, size=min(n_samples, n_tasks), replace=False)
+        runtimes, peaks, n_pixels = [], [], []
+        for task in sampled:
+            row, col = divmod(int(task), len(x_chunks))
+            blocks = [
+                array.blocks[(*[slice(None)] * (array.ndim - 2), row, col)]
+                for array in arrays
+            ]
+            runtime, peak = _measure_compute(blocks)
+            runtimes.append(runtime)
+            peaks.append(peak)
+            n_pixels.append(y_chunks[row] * x_chunks[col])
+
+        chunks = (max(y_chunks), max(x_chunks))
+        task_runtime = float(np.mean(runtimes))
+        peak_memory = max(peaks)
+        if single_task:
+            # Tiles sample the one task that processes the image, so their cost per
+            # pixel is scaled up to every pixel of the image.
+            n_tasks = 1
+            chunks = (sum(y_chunks), sum(x_chunks))
+            image_pixels = chunks[0] * chunks[1]
+            task_runtime = sum(runtimes) / sum(n_pixels) * image_pixels
+            peak_memory = round(
+                max(peak / n for peak, n in zip(peaks, n_pixels)) * image_pixels
+            )
+
+        return RunEstimate(
+            n_tasks=n_tasks,
+            chunks=chunks,
+            n_sampled=len(sampled),
+            task_runtime=task_runtime,
+            peak_memory=peak_memory,
+            output_nbytes=sum(array.nbytes for array in arrays),
+        )
+
+    def _get_lazy_image(
+        self,
+        X_image: ImageType,
+        executor: Executor | None = None,
+        chunk_memory: int | str | None = None,
+    ) -> tuple[xr.DataArray | xr.Dataset, bool]:
+        """
+        Get a Dask-backed image, chunking in-memory images into the tiles they would
+        be processed in, and whether the image would be processed in a single task
+        that is only sampled by its tiles.
+        """
+        image = Image.from_image(X_image)
+        if image._is_chunked(image.image):
+            return X_image, False
+
+        # Images processed in one task are sampled in smaller tiles. Memory-limited
+        # runs are rechunked into their planned tiles by the method.
+        tile_size = image.tile_size or EXECUTOR_TILE_SIZE
+        single_task = (
+            image.tile_size is None and executor is None and chunk_memory is None
+        )
+
+        if isinstance(X_image, np.ndarray):
+            feature_names = self._wrapped_meta.feature_names
+            X_image = xr.DataArray(
+                X_image,
+                dims=["variable", "y", "x"],
+                coords={"variable": feature_names} if len(feature_names) else None,
+            )
+
+        y_dim, x_dim = image.image.dims[1:] if image.band_dim_name else ("y", "x")
+        return X_image.chunk({y_dim: tile_size[0], x_dim: tile_size[1]}), single_task
+
+    def predict_to_file(
+        self,
+        X_image: ImageType,
+        path: str | os.PathLike,
+        *,
+        cog: bool = False,
+        compress: str = "deflate",
+        blocksize: int = 512,
+        crs: Any = None,
+        transform: Any = None,
+        **predict_kwargs,
+    ) -> Path:
+        """
+        Predict target(s) for X_image and stream them into a GeoTIFF.
+
+        Chunks are computed in parallel and written into tiled, compressed windows of
+        the file as they complete, so the full prediction is never held in memory for
+        Dask-backed images. Targets are written as bands.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        path : path-like
+            The path to write the predictions to.
+        cog : bool, default=False
+            If True, the file is written as a Cloud Optimized GeoTIFF.
+        compress : str, default="deflate"
+            The compression method used for the file.
+        blocksize : int, default=512
+            The width and height of the internal tiles of the file.
+        crs : any, optional
+            The coordinate reference system of the file. If None, the CRS of the input
+            image is used when possible.
+        transform : affine.Affine, optional
+            The affine transform of the file. If None, the transform of the input image
+            is used when possible.
+        **predict_kwargs
+            Additional arguments passed to `predict`.
+
+        Returns
+        -------
+        Path
+            The path of the written file.
+        """
+        from .io.geotiff import write_geotiffs
+
+        y_image = self.predict(X_image, **predict_kwargs)
+
+        return write_geotiffs(
+            [y_image],
+            [path],
+            crs=self._get_crs(X_image, crs),
+            transform=transform,
+            nodata=[get_nodata_fill(y_image.dtype, predict_kwargs.get("output_nodata"))]
+            if isinstance(y_image, np.ndarray)
+            else None,
+            cog=cog,
+            compress=compress,
+            blocksize=blocksize,
+        )[0]
+
+    def kneighbors_to_file(
+        self,
+        X_image: ImageType,
+        path: str | os.PathLike,
+        *,
+        distance_path: str | os.PathLike | None = None,
+        cog: bool = False,
+        compress: str = "deflate",
+        blocksize: int = 512,
+        crs: Any = None,
+        transform: Any = None,
+        **kneighbors_kwargs,
+    ) -> Path | tuple[Path, Path]:
+        """
+        Find the K-neighbors of each pixel and stream them into GeoTIFFs.
+
+        Chunks are computed in parallel and written into tiled, compressed windows of
+        the files as they complete, so the full outputs are never held in memory for
+        Dask-backed images. Neighbors are written as bands, sorted by distance.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        path : path-like
+            The path to write the neighbor indices to.
+        distance_path : path-like, optional
+            The path to write the neighbor distances to. If given, indices and
+            distances are computed from a single neighbor search.
+        cog : bool, default=False
+            If True, files are written as Cloud Optimized GeoTIFFs.
+        compress : str, default="deflate"
+            The compression method used for the files.
+        blocksize : int, default=512
+            The width and height of the internal tiles of the files.
+        crs : any, optional
+            The coordinate reference system of the files. If None, the CRS of the input
+            image is used when possible.
+        transform : affine.Affine, optional
+            The affine transform of the files. If None, the transform of the input
+            image is used when possible.
+        **kneighbors_kwargs
+            Additional arguments passed to `kneighbors`.
+
+        Returns
+        -------
+        Path or tuple of Path
+            The path of the neighbor indices file, and the path of the neighbor
+            distances file if `distance_path` was given.
+        """
+        from .io.geotiff import write_geotiffs
+
+        return_distance = distance_path is not None
+        output = self.kneighbors(
+            X_image, return_distance=return_distance, **kneighbors_kwargs
+        )
+        images = list(output) if return_distance else [output]
+        paths = [distance_path, path] if return_distance else [path]
+
+        output_nodata = kneighbors_kwargs.get("output_nodata")
+        written = write_geotiffs(
+            images,
+            paths,
+            crs=self._get_crs(X_image, crs),
+            transform=transform,
+            nodata=[get_nodata_fill(image.dtype, output_nodata) for image in images]
+            if isinstance(images[0], np.ndarray)
+            else None,
+            cog=cog,
+            compress=compress,
+            blocksize=blocksize,
+        )
+
+        return (written[1], written[0]) if return_distance else written[0]
+
+    def predict_to_zarr(
+        self,
+        X_image: ImageType,
+        store: str | os.PathLike,
+        *,
+        overwrite: bool = False,
+        **predict_kwargs,
+    ) -> Path:
+        """
+        Predict target(s) for X_image into a local Zarr store, resuming previous runs.
+
+        Each chunk is written to the store as soon as it is computed and recorded in a
+        manifest of completed chunks. Running the same prediction again, with the
+        same fitted estimator, input image, and options, only computes the chunks
+        that are missing from the store, allowing interrupted runs to be resumed.
+        Options that don't change the predictions, e.g. `executor`, `cache`,
+        `progress`, or batching and chunking limits, can differ between runs.
+
+        Parameters
+        ----------
+        X_image : Numpy or Xarray image with 3 dimensions (y, x, band)
+            The input image. Features in the band dimension should correspond with the
+            features used to fit the estimator.
+        store : path-like
+            The path of the Zarr store. Predictions are stored in a `prediction`
+            variable, or one `prediction_{target}` variable per target for Dataset
+            images.
+        overwrite : bool, default=False
+            If True, any existing store is replaced and all chunks are computed.
+        **predict_kwargs
+            Additional arguments passed to `predict`.
+
+        Returns
+        -------
+        Path
+            The path of the Zarr store.
+        """
+        from .io.zarr import write_zarr
+
+        y_image = self.predict(X_image, **predict_kwargs)
+
+        # Runs with different execution options, e.g. a new executor or progress
+        # tracker, write the same results and can resume each other.
+        result_kwargs = {
+            k: v for k, v in predict_kwargs.items() if k not in EXECUTION_OPTIONS
+        }
+
+        return write_zarr(
+            {"prediction": y_image},
+            store,
+            fingerprint=self._get_fingerprint(X_image, "predict", **result_kwargs),
+            overwrite=overwrite,
+        )
+
+    @staticmethod
+    def _get_crs(X_image: ImageType, crs: Any = None) -> Any:
+        """Get a CRS, falling back to the CRS of an xarray image if available."""
+        if crs is not None or isinstance(X_image, np.ndarray):
+            return crs
+
+        return X_image.rio.crs
+
+    def _validate_attributes(
+        self, attributes: NDArray | pd.DataFrame | pd.Series
+    ) -> tuple[NDArray, list[str | int]]:
+        """
+        Get reference attributes as an array of shape (n_samples, n_attributes) and
+        their names, checking that there is one row per fitted sample.
+        """
+        if hasattr(attributes, "columns"):
+            attribute_names = list(attributes.columns)
+        elif hasattr(attributes, "name"):
+            attribute_names = [attributes.name]
+        else:
+            attribute_names = None
+
+        attributes = np.asarray(attributes)
+        if attributes.ndim == 1:
+            attributes = attributes.reshape(-1, 1)
+
+        if attributes.dtype.kind not in "iuf":
+            raise TypeError(
+                f"Attributes must be numeric, not `{attributes.dtype}`. Encode "
+                "categorical attributes as integers before imputing."
+            )
+
+        if is_fitted(self._wrapped):
+            n_samples = self._wrapped_meta.n_samples
+            if attributes.shape[0] != n_samples:
+                raise ValueError(
+                    f"Expected attributes for {n_samples} samples but got "
+                    f"{attributes.shape[0]}."
+                )
+
+        if attribute_names is None:
+            attribute_names = list(range(attributes.shape[1]))
+
+        return attributes, attribute_names
+
+    def _predict_from_neighbors(
+        self,
+        image: Image,
+        *,
+        n_neighbors: int | Sequence[int],
+        skip_nodata: bool = False,
+        deduplicate: bool = False,
+        dtype: DTypeLike = np.float64,
+        output_nodata: int | None = None,
+        max_pixels_per_batch: int | None = None,
+        chunk_memory: int | str | None = None,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
+        cache_key: str | None = None,
+    ) -> ImageType:
+        """
+        Predict target(s) for one or more numbers of neighbors from a single neighbor
+        search at the largest number of neighbors.
+        """
+        self._check_predicts_from_neighbors()
+
+        output_dim_name = "variable"
+        multi_k = not isinstance(n_neighbors, (int, np.integer))
+        ks = self._validate_n_neighbors(n_neighbors if multi_k else [n_neighbors])
+        kneighbors = self._get_kneighbors({})
+        # Avoid capturing the wrapper in the chunk function, which may be pickled
+        wrapped = self._wrapped
+
+        def predict_from_neighbors_chunk(X):
+            dist, ind = kneighbors(X, n_neighbors=max(ks), return_distance=True)
+
+            # Neighbors are sorted by distance, so the first k are the k-nearest
+            y_preds = [
+                predict_from_neighbors(wrapped, ind[:, :k], dist=dist[:, :k])
+                for k in ks
+            ]
+
+            # Flatten to (pixels, targets * n_neighbors) in target-major order
+            return np.stack(
+                [y_pred.reshape(len(X), -1) for y_pred in y_preds], axis=-1
+            ).reshape(len(X), -1)
+
+        output_sizes = {output_dim_name: self._wrapped_meta.n_targets}
+        output_coords = {output_dim_name: list(self._wrapped_meta.target_names)}
+        if multi_k:
+            output_sizes["n_neighbors"] = len(ks)
+            output_coords["n_neighbors"] = ks
+
+        return image.apply_ufunc_across_bands(
+            predict_from_neighbors_chunk,
+            output_dims=[list(output_sizes)],
+            output_dtypes=[self._get_predict_dtype(dtype)],
+            output_sizes=output_sizes,
+            output_coords=output_coords,
+            skip_nodata=skip_nodata,
+            deduplicate=deduplicate,
+            dtype=dtype,
+            output_nodata=output_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+            chunk_memory=chunk_memory,
+            executor=executor,
+            cache=cache,
+            progress=progress,
+            cache_key=cache_key,
+            working_bytes_per_pixel=self._working_bytes_per_pixel,
+        )
+
+    def _get_max_pixels_per_batch(
+        self,
+        max_pixels_per_batch: int | None = None,
+        memory_limit: int | str | None = None,
+    ) -> int | None:
+        """
+        Get the maximum number of pixels per batch, estimated from a memory limit and
+        the working memory needed per pixel if needed.
+        """
+        if max_pixels_per_batch is not None or memory_limit is None:
+            return max_pixels_per_batch
+
+        return max(1, parse_bytes(memory_limit) // self._working_bytes_per_pixel)
+
+    @property
+    def _working_bytes_per_pixel(self) -> int:
+        """
+        The estimated working memory needed to predict each pixel, in bytes. Each
+        pixel is assumed to need a row of float64 distances to every fitted sample,
+        which dominates memory use for brute-force neighbor searches.
+        """
+        return np.dtype(np.float64).itemsize * self._wrapped_meta.n_samples
+
+    def _check_predicts_from_neighbors(self) -> None:
+        """Check that the wrapped estimator can predict from its neighbors."""
+        if not hasattr(self._wrapped, "kneighbors") or not hasattr(self._wrapped, "_y"):
+            wrapped_class = self._wrapped.__class__.__name__
+            raise NotImplementedError(
+                f"{wrapped_class} does not support predicting from neighbors. Only "
+                "KNeighbors-style regressors and classifiers are supported."
+            )
+
+    def _get_fingerprint(self, *args: Any, **kwargs: Any) -> str:
+        """
+        Get a deterministic identifier of the fitted estimator and neighbor search
+        applied to some inputs.
+        """
+        return get_fingerprint((self._wrapped, self._search), *args, **kwargs)
+
+    def _get_cache_key(
+        self, cache: ChunkCache | None, job: str, image: Image, **options: Any
+    ) -> str | None:
+        """
+        Get the key identifying the chunk results of a job with the given options,
+        or None if results aren't cached. Options that don't change results, e.g.
+        batching, are excluded so that their results are shared.
+        """
+        if cache is None:
+            return None
+
+        return self._get_fingerprint(job, image.nodata_vals, **options)
+
+    def _get_kneighbors(self, kneighbors_kwargs: dict[str, Any]) -> Callable:
+        """
+        Get the function used to search the neighbors of each chunk, using the
+        neighbor search if given. Searches don't accept estimator-specific arguments.
+        """
+        if self._search is None:
+            return suppress_feature_name_warnings(self._wrapped.kneighbors)
+
+        if kneighbors_kwargs:
+            raise ValueError(
+                f"Additional kneighbors arguments {sorted(kneighbors_kwargs)} can't be "
+                "used with a neighbor search."
+            )
+
+        return suppress_feature_name_warnings(self._search.kneighbors)
+
+    @property
+    def _predicts_with_search(self) -> bool:
+        """Whether predictions can be derived from the neighbor search."""
+        predictors = {predictor.predict for predictor in NEIGHBOR_PREDICTORS}
+        return self._search is not None and type(self._wrapped).predict in predictors
+
+    def _validate_n_neighbors(self, n_neighbors: Sequence[int]) -> list[int]:
+        """Check that each number of neighbors is within the fitted samples."""
+        ks = [int(k) for k in n_neighbors]
+        n_samples = self._wrapped_meta.n_samples
+
+        if not ks or any(not 1 <= k <= n_samples for k in ks):
+            raise ValueError(
+                f"`n_neighbors` must be between 1 and {n_samples}, not {n_neighbors}."
+            )
+
+        return ks
+
+    @staticmethod
+    def _validate_impute_method(method: ImputeMethod, kth: int, k: int) -> None:
+        """Check that an imputation method and neighbor rank are valid."""
+        if method not in IMPUTE_METHODS:
+            raise ValueError(
+                f"Unknown imputation method `{method}`. Choose from {IMPUTE_METHODS}."
+            )
+
+        if method == "kth" and not 1 <= kth <= k:
+            raise ValueError(f"`kth` must be between 1 and {k}, not {kth}.")
+
+    @staticmethod
+    def _get_impute_dtype(
+        attributes: NDArray, method: ImputeMethod, dtype: DTypeLike
+    ) -> np.dtype:
+        """
+        Get the output dtype for imputed attributes. Means are always floating point,
+        while other methods preserve integer attributes.
+        """
+        if method in ("mode", "kth") and attributes.dtype.kind in "iu":
+            return attributes.dtype
+
+        return np.dtype(dtype)
+
+    def _get_predict_dtype(self, dtype: DTypeLike = np.float64) -> np.dtype:
+        """Get the output dtype for predictions based on the estimator type."""
+        # Any estimator with an undefined type should fall back to floating
+        # point for safety.
+        estimator_type = get_estimator_type(self._wrapped)
+        output_dtype = np.dtype(ESTIMATOR_OUTPUT_DTYPES.get(estimator_type, np.float64))
+
+        # Classifiers fit on floating point labels predict floating point classes
+        classes = getattr(self._wrapped, "classes_", None)
+        if estimator_type == "classifier" and classes is not None:
+            classes = classes if isinstance(classes, list) else [classes]
+            if any(np.asarray(c).dtype.kind == "f" for c in classes):
+                output_dtype = np.dtype(np.float64)
+
+        # Floating point outputs use the requested precision
+        return np.dtype(dtype) if output_dtype.kind == "f" else output_dtype
+
+    def _get_index_dtype(
+        self, index_dtype: DTypeLike | None = None, output_nodata: int | None = None
+    ) -> np.dtype:
+        """
+        Get the dtype for neighbor indices, checking that it can store the index of
+        every fitted sample and that NoData can't be confused with a valid index.
+        """
+        n_samples = self._wrapped_meta.n_samples
+
+        if output_nodata is not None and 0 <= output_nodata < n_samples:
+            raise ValueError(
+                f"`output_nodata` value {output_nodata} can't be used for neighbor "
+                f"indices because it is a valid index for {n_samples} samples."
+            )
+
+        # The smallest unsigned dtype that can store `n_samples` can store every
+        # index and leaves its maximum value free to use as NoData.
+        min_dtype = np.min_scalar_type(n_samples)
+        if output_nodata is not None:
+            min_dtype = np.promote_types(min_dtype, np.min_scalar_type(output_nodata))
+
+        if index_dtype is None:
+            return min_dtype
+
+        index_dtype = np.dtype(index_dtype)
+        if index_dtype.kind not in "iu" or np.iinfo(index_dtype).max < n_samples:
+            raise ValueError(
+                f"`index_dtype` must be an integer type that can store {n_samples} "
+                f"samples, not `{index_dtype}`."
+            )
+
+        return index_dtype
+
     def _check_feature_names(self, image_feature_names: NDArray) -> None:
         """Check that image feature names match feature names seen during fitting."""
         check_is_fitted(self._wrapped)
@@ -329,7 +1672,9 @@ class ImageEstimator(AttrWrapper[EstimatorType]):
             raise ValueError(msg)
 
 
-def wrap(estimator: EstimatorType) -> ImageEstimator[EstimatorType]:
+def wrap(
+    estimator: EstimatorType, *, search: NeighborSearch | None = None
+) -> ImageEstimator[EstimatorType]:
     """
     Wrap an sklearn-compatible estimator with overriden methods for image data.
 
@@ -338,6 +1683,10 @@ def wrap(estimator: EstimatorType) -> ImageEstimator[EstimatorType]:
     estimator : BaseEstimator
         An sklearn-compatible estimator to wrap with image methods. Fitted estimators
         will be reset when wrapped and must be re-fit after wrapping.
+    search : NeighborSearch, optional
+        A neighbor search fit alongside the estimator and used in place of its
+        `kneighbors` method for images, e.g. `BruteForceKNN`. If given, predictions
+        of KNeighbors regressors and classifiers are derived from the search.
 
     Returns
     -------
@@ -361,4 +1710,4 @@ def wrap(estimator: EstimatorType) -> ImageEstimator[EstimatorType]:
     >>> pred.PSME_COV.shape
     (128, 128)
     """
-    return ImageEstimator(estimator)
+    return ImageEstimator(estimator, search=search)
@@ -1,15 +1,123 @@
 from __future__ import annotations
 
+import logging
+import math
 from abc import ABC, abstractmethod
-from collections.abc import Sized
-from typing import Any, Callable, Generic
-
+from collections.abc import Iterator, Sized
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import cached_property, partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Callable, Generic
+
+import dask
 import numpy as np
 import xarray as xr
-from numpy.typing import NDArray
+from numpy.typing import DTypeLike, NDArray
 from typing_extensions import Concatenate
 
+from .profiling import ChunkProfile, finish_chunk, start_chunk
+from .progress import Progress, ProgressTracker
 from .types import ImageType, NoDataType, P
+from .utils.chunks import ChunkPlan, plan_chunks
+from .utils.shared import dumps_shared, loads_shared, release_shared
+
+if TYPE_CHECKING:
+    from .cache import ChunkCache
+
+logger = logging.getLogger(__name__)
+
+# The approximate number of bytes read per tile when processing memory-mapped images
+MEMMAP_TILE_BYTES = 128 * 2**20
+
+# The (y, x) tile size used to process in-memory images with an executor
+EXECUTOR_TILE_SIZE = (512, 512)
+
+
+def _validate_float_dtype(dtype: DTypeLike) -> np.dtype:
+    """Validate that a dtype is floating point and return it as a Numpy dtype."""
+    dtype = np.dtype(dtype)
+    if dtype.kind != "f":
+        raise ValueError(f"`dtype` must be a floating point type, not `{dtype}`.")
+
+    return dtype
+
+
+def get_nodata_fill(
+    dtype: DTypeLike = None, output_nodata: int | None = None
+) -> float | int | None:
+    """
+    Get the value used to fill NoData in an output of a given dtype.
+
+    Integer outputs are filled with `output_nodata` if given, or the minimum value of
+    signed dtypes or maximum value of unsigned dtypes otherwise. Floating point outputs
+    are filled with NaN. If the dtype is unknown, None is returned.
+    """
+    if dtype is None:
+        return None
+
+    dtype = np.dtype(dtype)
+    if dtype.kind not in "iu":
+        return np.nan
+
+    info = np.iinfo(dtype)
+    if output_nodata is None:
+        return dtype.type(info.min if dtype.kind == "i" else info.max)
+
+    if not info.min <= output_nodata <= info.max:
+        raise ValueError(
+            f"`output_nodata` value {output_nodata} is out of range for "
+            f"output dtype `{dtype}`."
+        )
+
+    return dtype.type(output_nodata)
+
+
+class _PickledFunction:
+    """
+    A function pickled by value with cloudpickle, allowing closures to be sent to
+    process workers. Each worker unpickles the most recent function once and reuses it
+    for subsequent calls.
+
+    Large arrays referenced by the function, e.g. the training data of an estimator,
+    are placed in shared memory once rather than copied into each task and worker.
+    Workers attach to the shared arrays without copying them. Shared memory is
+    released when the function is closed, so it should be used as a context manager.
+    """
+
+    _loaded: tuple[bytes, Callable, list[SharedMemory]] | None = None
+
+    def __init__(self, func: Callable):
+        self.payload, self._blocks = dumps_shared(func)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Workers attach to shared memory through the payload, not the owned blocks
+        return {"payload": self.payload, "_blocks": []}
+
+    def __enter__(self) -> _PickledFunction:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the shared memory owned by this function."""
+        release_shared(self._blocks)
+        self._blocks = []
+
+    def __call__(self, *args, **kwargs):
+        cls = type(self)
+        if cls._loaded is None or cls._loaded[0] != self.payload:
+            # Drop the previous function before detaching from its shared memory
+            previous, cls._loaded = cls._loaded, None
+            if previous is not None:
+                blocks = previous[2]
+                del previous
+                release_shared(blocks, unlink=False)
+
+            cls._loaded = (self.payload, *loads_shared(self.payload))
+
+        return cls._loaded[1](*args, **kwargs)
 
 
 class _ImageChunk:
@@ -24,24 +132,63 @@ class _ImageChunk:
 
     band_dim = -1
 
-    def __init__(self, array: NDArray, nodata_vals: list[float] | None = None):
+    def __init__(
+        self,
+        array: NDArray,
+        nodata_vals: list[float] | None = None,
+        dtype: DTypeLike | None = None,
+        output_nodata: int | None = None,
+        profile: ChunkProfile | None = None,
+    ):
         self.array = array
-        self.flat_array = array.reshape(-1, array.shape[self.band_dim])
+        self.flat_array = array.reshape(-1, array.shape[self.band_dim]).view()
+        # The chunk may be a view into the source image, so guarantee that it's never
+        # mutated by the chunk or the applied function.
+        self.flat_array.flags.writeable = False
         self.nodata_vals = nodata_vals
+        # The chunk is only cast to the floating point dtype if one is given or NaNs
+        # are filled. Floating point and masked outputs default to float64.
+        self.input_dtype = None if dtype is None else np.dtype(dtype)
+        self.dtype = np.dtype(np.float64 if dtype is None else dtype)
+        self.output_nodata = output_nodata
+        self.profile = profile
+
+    def _stage(self, name: str):
+        """Time a stage of processing the chunk if it's being profiled."""
+        return nullcontext() if self.profile is None else self.profile.stage(name)
+
+    def _allocated(self, *arrays: NDArray) -> None:
+        """Record arrays allocated by the chunk if it's being profiled."""
+        if self.profile is not None:
+            self.profile.allocated(*arrays)
 
-    def _mask_nodata(self, flat_image: NDArray) -> NDArray:
+    @property
+    def n_pixels(self) -> int:
+        """The number of pixels in the chunk."""
+        return self.flat_array.shape[0]
+
+    @property
+    def n_valid(self) -> int:
+        """The number of pixels that don't contain NoData in any band."""
+        if self.nodata_mask is None:
+            return self.n_pixels
+
+        return self.n_pixels - int(np.count_nonzero(self.nodata_mask))
+
+    @cached_property
+    def nodata_mask(self) -> NDArray | None:
         """
-        Set NaNs in the flat (pixels, band) image where NoData values are present.
+        A boolean mask in shape (pixels,) that is True where any band contains NoData,
+        or None if the chunk cannot contain NoData.
         """
         # Skip allocating a mask if the image is not float and NoData wasn't given
         if (
             not (is_float := self.flat_array.dtype.kind == "f")
             and self.nodata_vals is None
         ):
-            return flat_image
+            return None
 
         mask = np.zeros(self.flat_array.shape, dtype=bool)
-        flat_image = flat_image.astype(np.float64)
 
         # If it's floating point, always mask NaNs
         if is_float:
@@ -51,42 +198,364 @@ class _ImageChunk:
         if self.nodata_vals is not None:
             mask |= self.flat_array == self.nodata_vals
 
-        # Set the mask where any band contains NoData
-        flat_image[mask.max(axis=self.band_dim)] = np.nan
+        # Pixels are masked where any band contains NoData
+        return mask.any(axis=self.band_dim)
+
+    def _cast_input(self, array: NDArray) -> NDArray:
+        """Cast pixels passed to the function to the input dtype, if one is given."""
+        if self.input_dtype is None:
+            return array
+
+        return array.astype(self.input_dtype, copy=False)
+
+    def _cast_output(self, array: NDArray, output_dtype: DTypeLike = None) -> NDArray:
+        """
+        Cast a flat output to its declared dtype if it's the same kind, e.g. int64 to
+        int32 or uint16. Otherwise, cast floating point outputs to the chunk dtype.
+        """
+        if output_dtype is not None:
+            output_dtype = np.dtype(output_dtype)
+            both_integer = array.dtype.kind in "iu" and output_dtype.kind in "iu"
+
+            if both_integer or np.can_cast(
+                array.dtype, output_dtype, casting="same_kind"
+            ):
+                return array.astype(output_dtype, copy=False)
+
+        if array.dtype.kind == "f":
+            return array.astype(self.dtype, copy=False)
+
+        return array
+
+    def _get_masked_dtype(self, dtype: np.dtype) -> np.dtype:
+        """
+        Get the dtype of a masked output. Integer outputs keep their dtype while all
+        other outputs use the floating point chunk dtype to allow NaNs.
+        """
+        return dtype if dtype.kind in "iu" else self.dtype
+
+    def _mask_nodata(self, flat_image: NDArray) -> NDArray:
+        """
+        Fill NoData in the flat (pixels, band) image where NoData values are present.
+
+        Integer outputs are filled with a NoData sentinel and all other outputs are
+        filled with NaN.
+        """
+        if self.nodata_mask is None:
+            return flat_image
+
+        flat_image = flat_image.astype(
+            self._get_masked_dtype(flat_image.dtype), copy=False
+        )
+        # Avoid writing into read-only outputs or outputs that share the input memory
+        if not flat_image.flags.writeable or np.may_share_memory(
+            flat_image, self.array
+        ):
+            flat_image = flat_image.copy()
+
+        flat_image[self.nodata_mask] = get_nodata_fill(
+            flat_image.dtype, self.output_nodata
+        )
 
         return flat_image
 
-    def _postprocess(self, array: NDArray, mask_nodata: bool = True) -> NDArray:
-        """Postprocess the chunk by unflattening to (y, x, band) and masking NoData."""
+    def _postprocess(
+        self,
+        array: NDArray,
+        mask_nodata: bool = True,
+        output_dtype: DTypeLike = None,
+    ) -> NDArray:
+        """
+        Postprocess the chunk by unflattening to (y, x, band), casting to the output
+        dtype, and masking NoData.
+        """
         output_shape = [*self.array.shape[:2], -1]
+        array = self._cast_output(array, output_dtype)
+
         if mask_nodata:
             array = self._mask_nodata(array)
 
         return array.reshape(output_shape)
 
+    def _scatter_valid(
+        self, valid_array: NDArray, valid: NDArray, output_dtype: DTypeLike = None
+    ) -> NDArray:
+        """
+        Scatter a flat array of valid pixels into a NoData-filled (y, x, band) array.
+        """
+        if valid_array.ndim == 1:
+            valid_array = valid_array[:, np.newaxis]
+
+        valid_array = self._cast_output(valid_array, output_dtype)
+        dtype = self._get_masked_dtype(valid_array.dtype)
+
+        flat_output = np.full(
+            (valid.size, valid_array.shape[-1]),
+            get_nodata_fill(dtype, self.output_nodata),
+            dtype=dtype,
+        )
+        flat_output[valid] = valid_array
+
+        return self._postprocess(flat_output, mask_nodata=False)
+
+    def _apply_to_valid(
+        self,
+        func,
+        returns_tuple: bool,
+        output_widths: list[int] | None,
+        output_dtypes: list[DTypeLike] | None,
+        max_pixels_per_batch: int | None = None,
+        deduplicate: bool = False,
+        **kwargs,
+    ) -> NDArray | tuple[NDArray, ...] | None:
+        """
+        Apply a function to the valid pixels of the chunk only.
+
+        Valid pixels are gathered into a compact (valid pixels, bands) array before
+        calling the function, and the results are scattered back into NoData-filled
+        outputs. Chunks without any valid pixels skip the function call entirely, as
+        long as the width of each output is known. Otherwise, None is returned to
+        signal that the chunk must be processed in full.
+        """
+        valid = ~self.nodata_mask
+        n_valid = np.count_nonzero(valid)
+
+        if n_valid == 0:
+            if output_widths is None:
+                return None
+
+            flat_results = tuple(
+                np.empty((0, width), dtype=dtype or self.dtype)
+                for width, dtype in zip(
+                    output_widths, output_dtypes or [None] * len(output_widths)
+                )
+            )
+        else:
+            # Avoid copying when there's nothing to compact. Valid pixels never
+            # contain NaNs, so there is no need to fill them.
+            with self._stage("fill"):
+                valid_array = self._cast_input(
+                    self.flat_array if n_valid == valid.size else self.flat_array[valid]
+                )
+            if valid_array is not self.flat_array:
+                self._allocated(valid_array)
+
+            with self._stage("call"):
+                flat_result = self._call(
+                    func,
+                    valid_array,
+                    returns_tuple=returns_tuple,
+                    max_pixels_per_batch=max_pixels_per_batch,
+                    deduplicate=deduplicate,
+                    **kwargs,
+                )
+            flat_results = flat_result if returns_tuple else (flat_result,)
+            self._allocated(*flat_results)
+
+        with self._stage("postprocess"):
+            results = tuple(
+                self._scatter_valid(result, valid, output_dtype=dtype)
+                for result, dtype in zip(
+                    flat_results, output_dtypes or [None] * len(flat_results)
+                )
+            )
+        self._allocated(*results)
+        return results if returns_tuple else results[0]
+
+    def _call(
+        self,
+        func,
+        array: NDArray,
+        returns_tuple: bool,
+        max_pixels_per_batch: int | None = None,
+        deduplicate: bool = False,
+        **kwargs,
+    ) -> NDArray | tuple[NDArray, ...]:
+        """
+        Call a function on a flat array of pixels in batches, optionally calling it
+        on the unique pixels only and copying their results to duplicate pixels.
+        """
+        if not deduplicate:
+            return self._call_batched(
+                func,
+                array,
+                returns_tuple=returns_tuple,
+                max_pixels_per_batch=max_pixels_per_batch,
+                **kwargs,
+            )
+
+        unique, first, inverse = np.unique(
+            array, axis=0, return_index=True, return_inverse=True
+        )
+        # Unique pixels are sorted by value, so restore the order they first appear in
+        # to keep consecutive pixels spatially adjacent, e.g. for `CoherentKNN`.
+        order = np.argsort(first)
+        unique = unique[order]
+        # Newer versions of Numpy return the inverse with an extra dimension
+        inverse = np.argsort(order)[inverse.reshape(-1)]
+        logger.debug(
+            "Deduplicated %d pixels to %d unique pixels (%.1f%%).",
+            len(array),
+            len(unique),
+            100 * len(unique) / max(len(array), 1),
+        )
+        if self.profile is not None:
+            self.profile.n_unique = len(unique)
+
+        result = self._call_batched(
+            func,
+            unique,
+            returns_tuple=returns_tuple,
+            max_pixels_per_batch=max_pixels_per_batch,
+            **kwargs,
+        )
+        results = tuple(r[inverse] for r in (result if returns_tuple else (result,)))
+
+        return results if returns_tuple else results[0]
+
+    @staticmethod
+    def _call_batched(
+        func,
+        array: NDArray,
+        returns_tuple: bool,
+        max_pixels_per_batch: int | None = None,
+        **kwargs,
+    ) -> NDArray | tuple[NDArray, ...]:
+        """
+        Call a function on batches of at most `max_pixels_per_batch` pixels, writing
+        the results into preallocated outputs.
+
+        This bounds the size of temporary arrays allocated by the function, e.g.
+        distance blocks of shape (pixels, samples) built during neighbor searches,
+        independently of the chunk size.
+        """
+        n_pixels = array.shape[0]
+        if max_pixels_per_batch is None or n_pixels <= max_pixels_per_batch:
+            return func(array, **kwargs)
+
+        outputs = None
+        for start in range(0, n_pixels, max_pixels_per_batch):
+            batch = slice(start, start + max_pixels_per_batch)
+            result = func(array[batch], **kwargs)
+            results = result if returns_tuple else (result,)
+
+            # Allocate outputs once the shape and dtype of the results are known
+            if outputs is None:
+                outputs = tuple(
+                    np.empty((n_pixels, *r.shape[1:]), dtype=r.dtype) for r in results
+                )
+
+            for output, batch_result in zip(outputs, results):
+                output[batch] = batch_result
+
+        return outputs if returns_tuple else outputs[0]
+
     def apply(
-        self, func, returns_tuple=False, mask_nodata=True, nan_fill=0.0, **kwargs
+        self,
+        func,
+        returns_tuple=False,
+        mask_nodata=True,
+        nan_fill=0.0,
+        skip_nodata=False,
+        output_widths=None,
+        output_dtypes=None,
+        max_pixels_per_batch=None,
+        deduplicate=False,
+        **kwargs,
     ) -> NDArray | tuple[NDArray]:
         """
         Apply a function to the flattened chunk.
 
         The function should accept and return one or more NDArrays in shape
-        (pixels, bands). The output will be reshaped back to the original chunk shape.
+        (pixels, bands). The chunk is passed to the function in the chunk dtype if one
+        was given, or unchanged otherwise unless NaNs are filled, and the output will
+        be reshaped back to the original chunk shape.
+
+        If `skip_nodata` is True and NoData is masked, the function will only be
+        called with valid pixels. `output_widths` gives the number of bands in each
+        output, allowing fully masked chunks to be skipped without calling the
+        function. `output_dtypes` gives the declared dtype of each output.
+
+        If `max_pixels_per_batch` is given, the function is called on batches of at
+        most that many pixels to bound peak memory use. If `deduplicate` is True, the
+        function is only called with unique pixels, and their results are copied to
+        duplicate pixels.
         """
-        if nan_fill is not None:
-            flat_array = np.where(np.isnan(self.flat_array), nan_fill, self.flat_array)
-        else:
-            flat_array = self.flat_array
+        if self.profile is not None:
+            self._profile_nodata_mask(mask_nodata)
 
-        flat_result = func(flat_array, **kwargs)
-
-        if returns_tuple:
-            return tuple(
-                self._postprocess(result, mask_nodata=mask_nodata)
-                for result in flat_result
+        if skip_nodata and mask_nodata and self.nodata_mask is not None:
+            result = self._apply_to_valid(
+                func,
+                returns_tuple=returns_tuple,
+                output_widths=output_widths,
+                output_dtypes=output_dtypes,
+                max_pixels_per_batch=max_pixels_per_batch,
+                deduplicate=deduplicate,
+                **kwargs,
+            )
+            if result is not None:
+                return result
+
+        with self._stage("fill"):
+            # Casting only copies the chunk if it's not already in the chunk dtype
+            flat_array = self._cast_input(self.flat_array)
+
+            # Only copy the chunk if there are NaNs to fill
+            if nan_fill is not None and self.flat_array.dtype.kind == "f":
+                nan_mask = np.isnan(self.flat_array)
+                if nan_mask.any():
+                    # Fill in place unless the chunk is a read-only view of the source
+                    if flat_array is self.flat_array:
+                        flat_array = flat_array.astype(self.dtype)
+                    flat_array[nan_mask] = nan_fill
+        if flat_array is not self.flat_array:
+            self._allocated(flat_array)
+
+        with self._stage("call"):
+            flat_result = self._call(
+                func,
+                flat_array,
+                returns_tuple=returns_tuple,
+                max_pixels_per_batch=max_pixels_per_batch,
+                deduplicate=deduplicate,
+                **kwargs,
+            )
+        flat_results = flat_result if returns_tuple else (flat_result,)
+        self._allocated(*flat_results)
+
+        with self._stage("postprocess"):
+            results = tuple(
+                self._postprocess(result, mask_nodata=mask_nodata, output_dtype=dtype)
+                for result, dtype in zip(
+                    flat_results, output_dtypes or [None] * len(flat_results)
+                )
+            )
+        # Outputs are often views of the results when they don't need casting
+        self._allocated(
+            *(
+                result
+                for result, flat_result in zip(results, flat_results)
+                if not np.may_share_memory(result, flat_result)
             )
+        )
+        return results if returns_tuple else results[0]
+
+    def _profile_nodata_mask(self, mask_nodata: bool) -> None:
+        """
+        Time finding NoData and count valid pixels. The mask is only found if it will
+        be used, so profiling doesn't change the work done for the chunk.
+        """
+        if not mask_nodata:
+            self.profile.n_valid = self.n_pixels
+            return
+
+        with self._stage("mask"):
+            mask = self.nodata_mask
 
-        return self._postprocess(flat_result, mask_nodata=mask_nodata)
+        if mask is not None:
+            self._allocated(mask)
+        self.profile.n_valid = self.n_valid
 
 
 class Image(Generic[ImageType], ABC):
@@ -95,6 +564,7 @@ class Image(Generic[ImageType], ABC):
     band_dim_name: str | None = None
     band_dim: int = 0
     band_names: NDArray
+    tile_size: tuple[int, int] | None = None
 
     def __init__(self, image: ImageType, nodata_vals: NoDataType = None):
         self.image = image
@@ -143,10 +613,51 @@ class Image(Generic[ImageType], ABC):
         output_coords: dict[str, list[str | int]] | None = None,
         nan_fill: float = 0.0,
         mask_nodata: bool = True,
+        skip_nodata: bool = False,
+        dtype: DTypeLike | None = None,
+        output_nodata: int | None = None,
+        max_pixels_per_batch: int | None = None,
+        deduplicate: bool = False,
+        chunk_memory: int | str | None = None,
+        working_bytes_per_pixel: int = 0,
+        executor: Executor | None = None,
+        cache: ChunkCache | None = None,
+        cache_key: str | None = None,
+        progress: ProgressTracker | Callable[[Progress], None] | None = None,
         **ufunc_kwargs,
     ) -> ImageType | tuple[ImageType]:
-        """Apply a universal function to all bands of the image."""
+        """
+        Apply a universal function to all bands of the image.
+
+        If a floating point `dtype` is given, each chunk is cast to it before calling
+        the function, and floating point outputs are cast to it. Otherwise, chunks are
+        passed in their own dtype, unless NaNs are filled, and floating point outputs
+        are float64.
+
+        If a `cache` is given, each chunk's results are looked up by `cache_key`, which
+        must identify the function and its options, and the chunk contents before
+        calling the function. If a `progress` tracker is given, each chunk is reported
+        to it once processed. A `progress` callable is reported to through a new
+        tracker.
+        """
         n_outputs = len(output_dims)
+        input_dtype = None if dtype is None else _validate_float_dtype(dtype)
+        dtype = np.dtype(np.float64) if input_dtype is None else input_dtype
+        if max_pixels_per_batch is not None and max_pixels_per_batch < 1:
+            raise ValueError(
+                "`max_pixels_per_batch` must be a positive integer, not "
+                f"{max_pixels_per_batch}."
+            )
+        if cache is not None and cache_key is None:
+            raise ValueError("A `cache_key` is required to cache chunks.")
+        if progress is not None and not isinstance(progress, ProgressTracker):
+            progress = ProgressTracker(callback=progress)
+
+        output_dtypes_or_none = output_dtypes or [None] * n_outputs
+        # Check that the NoData sentinel fits the declared outputs before processing
+        if mask_nodata:
+            for output_dtype in output_dtypes_or_none:
+                get_nodata_fill(output_dtype, output_nodata)
 
         if output_sizes is not None:
             # Default to sequential coordinates for each output dimension
@@ -154,18 +665,131 @@ class Image(Generic[ImageType], ABC):
                 k: list(range(s)) for k, s in output_sizes.items()
             }
 
-        def ufunc(x):
-            return _ImageChunk(x, nodata_vals=self.nodata_vals).apply(
-                func,
+        output_widths = self._get_output_widths(output_dims, output_sizes)
+        image = self._preprocess_ufunc_input(self.image)
+        tile_size = self.tile_size
+        chunked = self._is_chunked(image)
+
+        if chunk_memory is not None:
+            plan = self.plan_chunks(
+                chunk_memory,
+                output_widths=output_widths,
+                output_dtypes=output_dtypes,
+                dtype=dtype,
+                working_bytes_per_pixel=working_bytes_per_pixel,
+                max_pixels_per_batch=max_pixels_per_batch,
+            )
+            logger.info("Planned %s.", plan)
+
+            # Lazy images are rechunked, while in-memory images are tiled
+            if chunked:
+                image = self._rechunk(image, plan.chunks)
+            else:
+                tile_size = plan.chunks
+
+        # Lazy images are computed by Dask, so executors only apply to in-memory images
+        executor = None if chunked else executor
+        if executor is not None and tile_size is None:
+            tile_size = EXECUTOR_TILE_SIZE
+
+        # Trackers can't be sent to other processes, so tiles processed by process
+        # workers are reported as they're collected instead of as they're processed.
+        tile_progress = progress if isinstance(executor, ProcessPoolExecutor) else None
+        chunk_progress = None if tile_progress is not None else progress
+
+        # Avoid capturing the image in the ufunc, which may be sent to other processes
+        nodata_vals = self.nodata_vals
+
+        def compute_chunk(chunk, chunk_func):
+            result = chunk.apply(
+                chunk_func,
                 returns_tuple=n_outputs > 1,
                 mask_nodata=mask_nodata,
                 nan_fill=nan_fill,
+                skip_nodata=skip_nodata,
+                output_widths=output_widths,
+                output_dtypes=output_dtypes_or_none,
+                max_pixels_per_batch=max_pixels_per_batch,
+                deduplicate=deduplicate,
                 **ufunc_kwargs,
             )
 
+            # Chunks are returned with flattened bands, so unflatten any outputs with
+            # multiple core dimensions
+            with chunk._stage("postprocess"):
+                chunk_results = result if n_outputs > 1 else (result,)
+                chunk_results = tuple(
+                    r.reshape(*r.shape[:2], *[output_sizes[d] for d in dims])
+                    if len(dims) > 1
+                    else r
+                    for r, dims in zip(chunk_results, output_dims)
+                )
+
+            return chunk_results if n_outputs > 1 else chunk_results[0]
+
+        def ufunc(x, chunk_func, tracked=True):
+            profile = start_chunk(x.shape[0] * x.shape[1]) if tracked else None
+            if tracked and chunk_progress is not None:
+                chunk_progress.start_chunk()
+
+            chunk = _ImageChunk(
+                x,
+                nodata_vals=nodata_vals,
+                dtype=input_dtype,
+                output_nodata=output_nodata,
+                profile=profile,
+            )
+            # Untracked samples, e.g. for inferring dtypes, aren't cached
+            use_cache = cache is not None and tracked
+            result = None
+            if use_cache:
+                key = cache.get_key(cache_key, x)
+                result = cache.get(key)
+
+            if result is None:
+                result = compute_chunk(chunk, chunk_func)
+                if use_cache:
+                    cache.set(key, result)
+            elif profile is not None:
+                profile.cached = True
+                profile.n_valid = chunk.n_valid
+
+            finish_chunk(profile)
+            if tracked and chunk_progress is not None:
+                chunk_progress.finish_chunk(chunk.n_pixels, chunk.n_valid)
+
+            return result
+
+        gufunc_kwargs = {}
+        if chunked:
+            # Register the function, which may wrap a large estimator, as a single key
+            # that every chunk task references rather than embedding it in each task.
+            gufunc_kwargs["chunk_func"] = dask.delayed(func, pure=False)
+
+            # Dask can't infer output dtypes from a registered function, so they're
+            # inferred from a single pixel instead. Declared integer outputs are also
+            # checked, since floating point results can't be cast to them.
+            if output_dtypes is None or any(
+                np.dtype(d).kind in "iu" for d in output_dtypes_or_none if d is not None
+            ):
+                sample = np.ones((1, 1, self.n_bands), dtype=image.dtype)
+                sample_result = ufunc(sample, chunk_func=func, tracked=False)
+                output_dtypes = [
+                    r.dtype
+                    for r in (sample_result if n_outputs > 1 else (sample_result,))
+                ]
+        else:
+            ufunc = partial(ufunc, chunk_func=func)
+
+        # In-memory images are processed immediately, so their tiles are counted first
+        if progress is not None and not chunked:
+            progress.add_chunks(self._count_tiles(tile_size))
+
         result = xr.apply_ufunc(
-            ufunc,
-            self._preprocess_ufunc_input(self.image),
+            self._wrap_ufunc(
+                ufunc, tile_size=tile_size, executor=executor, progress=tile_progress
+            ),
+            image,
             dask="parallelized",
             input_core_dims=[[self.band_dim_name]],
             exclude_dims=set((self.band_dim_name,)),
@@ -175,18 +799,136 @@ class Image(Generic[ImageType], ABC):
             dask_gufunc_kwargs=dict(
                 output_sizes=output_sizes,
                 allow_rechunk=True,
+                **gufunc_kwargs,
             ),
         )
 
-        if n_outputs > 1:
-            result = tuple(
-                self._postprocess_ufunc_output(x, output_coords=output_coords)
-                for x in result
+        # Lazy images are counted once Dask has chunked the outputs
+        results = result if n_outputs > 1 else (result,)
+        if progress is not None and chunked:
+            y_chunks, x_chunks = results[0].chunks[:2]
+            progress.add_chunks(len(y_chunks) * len(x_chunks))
+
+        results = tuple(
+            self._postprocess_ufunc_output(
+                x,
+                # Outputs may have different dimensions, so only assign their own
+                output_coords=(
+                    {k: v for k, v in output_coords.items() if k in dims}
+                    if output_coords is not None
+                    else None
+                ),
+                # Outputs that couldn't be cast to their declared dtype are filled
+                # for the dtype they were produced in.
+                fill_value=(
+                    get_nodata_fill(x.dtype, output_nodata) if mask_nodata else None
+                ),
             )
+            for x, dims in zip(results, output_dims)
+        )
+
+        return results if n_outputs > 1 else results[0]
+
+    def sample_windows(
+        self,
+        n_windows: int,
+        window_size: tuple[int, int],
+        random_state: int | None = None,
+    ) -> NDArray:
+        """
+        Read the pixels of randomly placed (y, x) windows of the image.
+
+        Only the sampled windows of lazy images are computed. Pixels with NoData or
+        NaN in any band are excluded.
+
+        Parameters
+        ----------
+        n_windows : int
+            The number of windows to sample.
+        window_size : tuple of int
+            The (rows, columns) size of each window, clipped to the image size.
+        random_state : int, optional
+            The seed used to place the windows.
+
+        Returns
+        -------
+        NDArray
+            The sampled pixels of shape (pixels, bands).
+        """
+        rng = np.random.default_rng(random_state)
+        n_rows, n_cols = self.image.shape[1:]
+        rows, cols = min(window_size[0], n_rows), min(window_size[1], n_cols)
+
+        windows = []
+        for _ in range(n_windows):
+            row = rng.integers(n_rows - rows + 1)
+            col = rng.integers(n_cols - cols + 1)
+            window = np.asarray(self.image[:, row : row + rows, col : col + cols])
+            windows.append(window.reshape(self.n_bands, -1).T)
+
+        pixels = np.concatenate(windows)
+        invalid = np.isnan(pixels).any(axis=1) if pixels.dtype.kind == "f" else False
+        if self.nodata_vals is not None:
+            invalid = invalid | (pixels == self.nodata_vals).any(axis=1)
+
+        return pixels[~invalid]
+
+    def plan_chunks(
+        self,
+        memory_limit: int | str,
+        *,
+        output_widths: list[int] | None = None,
+        output_dtypes: list[np.dtype] | None = None,
+        dtype: DTypeLike = np.float64,
+        working_bytes_per_pixel: int = 0,
+        max_pixels_per_batch: int | None = None,
+    ) -> ChunkPlan:
+        """
+        Plan a spatial chunk size for applying a ufunc within a per-task memory budget.
+
+        Memory per pixel is estimated from the input bands, their copy in the chunk
+        dtype, two copies of each output (before and after masking NoData), and any
+        working memory needed by the ufunc. Working memory is fixed per chunk if
+        pixels are processed in batches.
+        """
+        dtype = _validate_float_dtype(dtype)
+        output_widths = output_widths or [self.n_bands]
+        output_dtypes = output_dtypes or [None] * len(output_widths)
+
+        input_bytes = self.n_bands * (self.image.dtype.itemsize + dtype.itemsize)
+        output_bytes = 2 * sum(
+            width * np.dtype(output_dtype or dtype).itemsize
+            for width, output_dtype in zip(output_widths, output_dtypes)
+        )
+        pixel_bytes = input_bytes + output_bytes
+        fixed_bytes = 0
+
+        if max_pixels_per_batch is None:
+            pixel_bytes += working_bytes_per_pixel
         else:
-            result = self._postprocess_ufunc_output(result, output_coords=output_coords)
+            fixed_bytes += max_pixels_per_batch * working_bytes_per_pixel
+
+        return plan_chunks(
+            self.image.shape[1:],
+            memory_limit=memory_limit,
+            pixel_bytes=pixel_bytes,
+            fixed_bytes=fixed_bytes,
+        )
+
+    @staticmethod
+    def _get_output_widths(
+        output_dims: list[list[str]], output_sizes: dict[str, int] | None
+    ) -> list[int] | None:
+        """Get the flattened width of each output, if all core dim sizes are known."""
+        if output_sizes is None:
+            return None
 
-        return result
+        try:
+            return [
+                int(np.prod([output_sizes[d] for d in dims])) for dims in output_dims
+            ]
+        except KeyError:
+            return None
 
     def _preprocess_ufunc_input(self, image: ImageType) -> ImageType:
         """
@@ -194,22 +936,140 @@ class Image(Generic[ImageType], ABC):
         """
         return image
 
+    def _is_chunked(self, image: ImageType) -> bool:
+        """Whether the image is lazily processed in chunks by Dask."""
+        return False
+
+    def _rechunk(self, image: ImageType, chunks: tuple[int, int]) -> ImageType:
+        """
+        Rechunk a lazy image to the given spatial (y, x) chunk size. No-op unless
+        overridden by subclasses that support chunked images.
+        """
+        return image
+
+    def _wrap_ufunc(
+        self,
+        ufunc: Callable[[NDArray], Any],
+        tile_size: tuple[int, int] | None = None,
+        executor: Executor | None = None,
+        progress: ProgressTracker | None = None,
+    ) -> Callable[[NDArray], Any]:
+        """Wrap the ufunc to apply it tile-wise if a tile size was given."""
+        if tile_size is None:
+            return ufunc
+
+        def tiled_ufunc(x: NDArray, **kwargs):
+            return self._apply_tiled(
+                partial(ufunc, **kwargs),
+                x,
+                tile_size=tile_size,
+                executor=executor,
+                progress=progress,
+            )
+
+        return tiled_ufunc
+
+    def _count_tiles(self, tile_size: tuple[int, int] | None) -> int:
+        """Count the tiles an in-memory image is processed in."""
+        if tile_size is None:
+            return 1
+
+        return math.prod(
+            math.ceil(size / tile)
+            for size, tile in zip(self.image.shape[1:], tile_size)
+        )
+
+    @staticmethod
+    def _iter_tiles(
+        shape: tuple[int, int], tile_size: tuple[int, int]
+    ) -> Iterator[tuple[slice, slice]]:
+        """Iterate over (y, x) windows of the given shape in tiles."""
+        tile_rows, tile_cols = tile_size
+        for row in range(0, shape[0], tile_rows):
+            for col in range(0, shape[1], tile_cols):
+                yield slice(row, row + tile_rows), slice(col, col + tile_cols)
+
+    def _apply_tiled(
+        self,
+        ufunc: Callable[[NDArray], Any],
+        array: NDArray,
+        tile_size: tuple[int, int],
+        executor: Executor | None = None,
+        progress: ProgressTracker | None = None,
+    ) -> NDArray | tuple[NDArray, ...]:
+        """
+        Apply a ufunc to (y, x, band) tiles of an array, writing the results into
+        preallocated outputs.
+
+        If an executor is given, tiles are processed concurrently in its workers.
+        Results are written in order as they become available, and are reported to
+        the `progress` tracker if given.
+        """
+        outputs = None
+        returns_tuple = False
+        windows = list(self._iter_tiles(array.shape[:2], tile_size))
+
+        # Process workers can't receive closures, so the ufunc is pickled by value with
+        # its large arrays in shared memory, which is released once all tiles are done.
+        pickled = isinstance(executor, ProcessPoolExecutor)
+        with _PickledFunction(ufunc) if pickled else nullcontext(ufunc) as ufunc:
+            if progress is not None:
+                progress.start_chunk()
+
+            if executor is None:
+                tile_results = (ufunc(array[window]) for window in windows)
+            else:
+                tile_results = executor.map(
+                    ufunc, (array[window] for window in windows)
+                )
+
+            for window, result in zip(windows, tile_results):
+                returns_tuple = isinstance(result, tuple)
+                results = result if returns_tuple else (result,)
+
+                # Allocate outputs once the shape and dtype of the results are known
+                if outputs is None:
+                    outputs = tuple(
+                        np.empty((*array.shape[:2], *r.shape[2:]), dtype=r.dtype)
+                        for r in results
+                    )
+
+                for output, tile_result in zip(outputs, results):
+                    output[window] = tile_result
+
+                if progress is not None:
+                    tile = _ImageChunk(array[window], nodata_vals=self.nodata_vals)
+                    progress.finish_chunk(tile.n_pixels, tile.n_valid)
+
+        return outputs if returns_tuple else outputs[0]
+
     @abstractmethod
     def _postprocess_ufunc_output(
         self,
         result: ImageType,
         output_coords: dict[str, list[str | int]] | None = None,
+        fill_value: float | None = None,
     ) -> ImageType:
         """
         Postprocess the output of an applied ufunc.
 
         This method should be overridden by subclasses to handle any necessary
-        transformations to the output data, e.g. transposing dimensions.
+        transformations to the output data, e.g. transposing dimensions, and to record
+        the NoData fill value, if the image format supports it.
         """
 
     @staticmethod
     def from_image(image: Any, nodata_vals: NoDataType = None) -> Image:
         """Create an Image object from a supported image type."""
+        # Memory-mapped arrays are processed in tiles to avoid reading the entire
+        # image into memory at once.
+        if isinstance(image, np.memmap):
+            return NDArrayImage(
+                image,
+                nodata_vals=nodata_vals,
+                tile_size=_get_memmap_tile_size(image),
+            )
+
         if isinstance(image, np.ndarray):
             return NDArrayImage(image, nodata_vals=nodata_vals)
 
@@ -223,21 +1083,48 @@ class Image(Generic[ImageType], ABC):
 
 
 class NDArrayImage(Image):
-    """An image stored in a Numpy NDArray of shape (band, y, x)."""
+    """
+    An image stored in a Numpy NDArray of shape (band, y, x).
+
+    If a `tile_size` of (rows, columns) is given, the image is processed one tile at a
+    time, with results written into preallocated output arrays. This bounds the size
+    of temporary arrays, which is useful for large or memory-mapped images.
+    """
 
     band_names = np.array([])
 
-    def __init__(self, image: NDArray, nodata_vals: NoDataType = None):
+    def __init__(
+        self,
+        image: NDArray,
+        nodata_vals: NoDataType = None,
+        tile_size: tuple[int, int] | None = None,
+    ):
         super().__init__(image, nodata_vals=nodata_vals)
+        self.tile_size = tile_size
 
     def _preprocess_ufunc_input(self, image: NDArray) -> NDArray:
         """Preprocess the image by transposing to (y, x, band) for apply_ufunc."""
-        # Copy to avoid mutating the original image
-        return image.copy().transpose(1, 2, 0)
+        # Transposing returns a view, so the image is never copied. Chunks are
+        # read-only, so the original image can't be mutated.
+        return image.transpose(1, 2, 0)
 
-    def _postprocess_ufunc_output(self, result: NDArray, output_coords=None) -> NDArray:
+    def _postprocess_ufunc_output(
+        self, result: NDArray, output_coords=None, fill_value=None
+    ) -> NDArray:
         """Postprocess the ufunc output by transposing back to (band, y, x)."""
-        return result.transpose(2, 0, 1)
+        # Move the output core dimensions ahead of (y, x)
+        return np.moveaxis(result, (0, 1), (-2, -1))
+
+
+def _get_memmap_tile_size(image: np.memmap) -> tuple[int, int]:
+    """
+    Get a tile size of full-width rows that reads roughly `MEMMAP_TILE_BYTES` from a
+    memory-mapped image of shape (band, y, x).
+    """
+    n_bands, n_rows, n_cols = image.shape
+    row_bytes = n_bands * n_cols * image.dtype.itemsize
+
+    return max(1, min(n_rows, MEMMAP_TILE_BYTES // row_bytes)), n_cols
 
 
 class DataArrayImage(Image):
@@ -267,17 +1154,37 @@ class DataArrayImage(Image):
 
         return None
 
+    def _is_chunked(self, image: xr.DataArray) -> bool:
+        """Whether the image is lazily processed in chunks by Dask."""
+        return image.chunks is not None
+
+    def _rechunk(self, image: xr.DataArray, chunks: tuple[int, int]) -> xr.DataArray:
+        """
+        Rechunk a Dask-backed image to the given spatial (y, x) chunk size, keeping
+        bands in a single chunk.
+        """
+        y_dim, x_dim = (dim for dim in image.dims if dim != self.band_dim_name)
+        return image.chunk({self.band_dim_name: -1, y_dim: chunks[0], x_dim: chunks[1]})
+
     def _postprocess_ufunc_output(
         self,
         result: xr.DataArray,
         output_coords: dict[str, list[str | int]] | None = None,
+        fill_value: float | None = None,
     ) -> xr.DataArray:
-        """Process the ufunc output by assigning coordinates and transposing."""
+        """
+        Process the ufunc output by assigning coordinates, recording the NoData fill
+        value, and transposing.
+        """
         if output_coords is not None:
             result = result.assign_coords(output_coords)
 
+        # Replace any fill value inherited from the input image
+        if fill_value is not None:
+            result.attrs["_FillValue"] = fill_value
+
         # Transpose from (y, x, band) to (band, y, x)
-        return result.transpose(result.dims[-1], ...)
+        return result.transpose(..., *result.dims[:2])
 
 
 class DatasetImage(DataArrayImage):
@@ -315,9 +1222,19 @@ class DatasetImage(DataArrayImage):
         self,
         result: xr.DataArray,
         output_coords: dict[str, list[str | int]] | None = None,
+        fill_value: float | None = None,
     ) -> xr.Dataset:
         """Process the ufunc output converting from DataArray to Dataset."""
-        result = super()._postprocess_ufunc_output(result, output_coords=output_coords)
+        result = super()._postprocess_ufunc_output(
+            result, output_coords=output_coords, fill_value=fill_value
+        )
 
         var_dim = result.dims[self.band_dim]
-        return result.to_dataset(dim=var_dim)
+        dataset = result.to_dataset(dim=var_dim)
+
+        # Record the fill value on each variable, where it's read from by default
+        if fill_value is not None:
+            for var in dataset.data_vars:
+                dataset[var].attrs["_FillValue"] = fill_value
+
+        return dataset
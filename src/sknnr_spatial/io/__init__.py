@@ -0,0 +1 @@
+"""Write images to file formats that support streaming and partial writes."""
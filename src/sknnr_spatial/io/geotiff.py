@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Sequence
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+from ..types import ImageType
+
+try:
+    import rasterio
+    import rasterio.shutil
+    import rioxarray  # noqa: F401
+    from rasterio.windows import Window
+except ImportError:
+    msg = (
+        "Writing images to file requires additional dependencies. You can install "
+        "them with `pip install sknnr-spatial[io]`."
+    )
+    raise ImportError(msg) from None
+
+
+class _RasterWindowWriter:
+    """
+    A target for `dask.array.store` that writes (band, y, x) blocks into the
+    corresponding windows of an open raster dataset.
+    """
+
+    def __init__(self, dst: rasterio.io.DatasetWriter):
+        self.dst = dst
+
+    def __setitem__(self, key: tuple[slice, slice, slice], value: np.ndarray) -> None:
+        bands, rows, cols = key
+        self.dst.write(
+            value,
+            indexes=list(range(bands.start + 1, bands.stop + 1)),
+            window=Window.from_slices(rows, cols),
+        )
+
+
+def _to_band_array(image: ImageType) -> da.Array:
+    """
+    Get a Dask array of shape (band, y, x) from an image, stacking any dimensions
+    other than (y, x) into bands.
+    """
+    if isinstance(image, xr.Dataset):
+        image = image.to_dataarray()
+
+    array = image.data if isinstance(image, xr.DataArray) else image
+    if not isinstance(array, da.Array):
+        array = da.from_array(array, chunks="auto")
+
+    array = array.reshape(-1, *array.shape[-2:])
+    # Write all bands of each window at once
+    return array.rechunk({0: -1})
+
+
+def _get_band_names(image: ImageType) -> list[str] | None:
+    """Get the names of each band of an image, if it has any."""
+    if isinstance(image, xr.Dataset):
+        return [str(var) for var in image.data_vars]
+
+    if isinstance(image, xr.DataArray) and image.ndim == 3:
+        band_dim = image.dims[0]
+        if band_dim in image.coords:
+            return [str(name) for name in image[band_dim].values]
+
+    return None
+
+
+def _get_georeference(image: ImageType, crs: Any, transform: Any) -> tuple[Any, Any]:
+    """Get the CRS and transform of an image, unless they were given explicitly."""
+    if isinstance(image, (xr.DataArray, xr.Dataset)):
+        crs = crs if crs is not None else image.rio.crs
+        # Coordinates are required to infer the transform
+        if transform is None and {"x", "y"}.issubset(image.coords):
+            transform = image.rio.transform()
+
+    return crs, transform
+
+
+def _get_nodata(image: ImageType, nodata: float | None) -> float | None:
+    """Get the NoData value of an image, unless it was given explicitly."""
+    if nodata is not None or not isinstance(image, (xr.DataArray, xr.Dataset)):
+        return nodata
+
+    if isinstance(image, xr.Dataset):
+        image = image[next(iter(image.data_vars))]
+
+    return image.attrs.get("_FillValue")
+
+
+def _open_raster(
+    image: ImageType,
+    array: da.Array,
+    path: Path,
+    *,
+    crs: Any,
+    transform: Any,
+    nodata: float | None,
+    compress: str,
+    blocksize: int,
+) -> rasterio.io.DatasetWriter:
+    """Open a tiled GeoTIFF for writing an image as a (band, y, x) array."""
+    crs, transform = _get_georeference(image, crs, transform)
+    n_bands, height, width = array.shape
+
+    dst = rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=width,
+        height=height,
+        count=n_bands,
+        dtype=array.dtype,
+        crs=crs,
+        transform=transform,
+        nodata=_get_nodata(image, nodata),
+        compress=compress,
+        tiled=True,
+        blockxsize=blocksize,
+        blockysize=blocksize,
+        BIGTIFF="IF_SAFER",
+    )
+
+    band_names = _get_band_names(image)
+    if band_names is not None:
+        dst.descriptions = tuple(band_names)
+
+    return dst
+
+
+def write_geotiffs(
+    images: Sequence[ImageType],
+    paths: Sequence[str | os.PathLike],
+    *,
+    crs: Any = None,
+    transform: Any = None,
+    nodata: Sequence[float | None] | None = None,
+    cog: bool = False,
+    compress: str = "deflate",
+    blocksize: int = 512,
+    **store_kwargs,
+) -> list[Path]:
+    """
+    Stream one or more images into tiled, compressed GeoTIFFs.
+
+    All images are computed together by a single call to `dask.array.store`, so
+    images that share a task graph, e.g. neighbor distances and indices, are only
+    computed once. Chunks are computed in parallel and written into their windows of
+    each file as they complete, so the full images are never held in memory.
+
+    Parameters
+    ----------
+    images : sequence of Numpy or Xarray images with dimensions (band, y, x)
+        The images to write. Any dimensions other than (y, x) are stacked into bands.
+    paths : sequence of path-like
+        The path to write each image to.
+    crs : any, optional
+        The coordinate reference system of the images. If None, it is read from the
+        images' metadata when possible.
+    transform : affine.Affine, optional
+        The affine transform of the images. If None, it is inferred from the images'
+        coordinates when possible.
+    nodata : sequence of float, optional
+        The NoData value of each image. If None, values are read from the images'
+        `_FillValue` attributes when possible.
+    cog : bool, default=False
+        If True, each file is converted to a Cloud Optimized GeoTIFF with overviews
+        after it is written.
+    compress : str, default="deflate"
+        The compression method used for each file.
+    blocksize : int, default=512
+        The width and height of the internal tiles of each file.
+    **store_kwargs
+        Additional arguments passed to `dask.array.store`, e.g. `scheduler`. Writes
+        are serialized with a lock, so a threaded or synchronous scheduler is required.
+
+    Returns
+    -------
+    list of Path
+        The paths of the written files.
+    """
+    if blocksize % 16 != 0:
+        raise ValueError(f"`blocksize` must be a multiple of 16, not {blocksize}.")
+
+    paths = [Path(path) for path in paths]
+    nodata = nodata if nodata is not None else [None] * len(images)
+    if not len(images) == len(paths) == len(nodata):
+        raise ValueError("`images`, `paths`, and `nodata` must have the same length.")
+
+    arrays = [_to_band_array(image) for image in images]
+    # Write the COG source to a temporary file that is converted after writing
+    write_paths = [path.with_suffix(".tmp.tif") if cog else path for path in paths]
+
+    with ExitStack() as stack:
+        targets = [
+            _RasterWindowWriter(
+                stack.enter_context(
+                    _open_raster(
+                        image,
+                        array,
+                        path,
+                        crs=crs,
+                        transform=transform,
+                        nodata=image_nodata,
+                        compress=compress,
+                        blocksize=blocksize,
+                    )
+                )
+            )
+            for image, array, path, image_nodata in zip(
+                images, arrays, write_paths, nodata
+            )
+        ]
+
+        # Raster datasets aren't thread-safe, so writes are serialized
+        store_kwargs.setdefault("lock", True)
+        da.store(arrays, targets, **store_kwargs)
+
+    if cog:
+        for write_path, path in zip(write_paths, paths):
+            rasterio.shutil.copy(
+                write_path,
+                path,
+                driver="COG",
+                compress=compress,
+                blocksize=blocksize,
+            )
+            write_path.unlink()
+
+    return paths
+
+
+def write_geotiff(image: ImageType, path: str | os.PathLike, **kwargs) -> Path:
+    """
+    Stream an image into a tiled, compressed GeoTIFF.
+
+    Parameters
+    ----------
+    image : Numpy or Xarray image with dimensions (band, y, x)
+        The image to write. Any dimensions other than (y, x) are stacked into bands.
+    path : path-like
+        The path to write the image to.
+    **kwargs
+        Additional arguments passed to `write_geotiffs`, with a single `nodata` value.
+
+    Returns
+    -------
+    Path
+        The path of the written file.
+    """
+    if "nodata" in kwargs:
+        kwargs["nodata"] = [kwargs["nodata"]]
+
+    return write_geotiffs([image], [path], **kwargs)[0]
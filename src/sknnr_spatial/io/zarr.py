@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+from ..types import ImageType
+
+try:
+    import zarr
+except ImportError:
+    msg = (
+        "Writing images to Zarr requires additional dependencies. You can install "
+        "them with `pip install sknnr-spatial[zarr]`."
+    )
+    raise ImportError(msg) from None
+
+# The suffix of the manifest written alongside each Zarr store. The first line of the
+# manifest identifies the job, and each following line is a completed chunk.
+MANIFEST_SUFFIX = ".manifest"
+
+
+def _to_dataarray(image: ImageType) -> xr.DataArray:
+    """Get a Dask-backed DataArray from a Numpy or DataArray image."""
+    if isinstance(image, np.ndarray):
+        dims = [f"dim_{i}" for i in range(image.ndim - 2)] + ["y", "x"]
+        image = xr.DataArray(image, dims=dims)
+
+    if not isinstance(image.data, da.Array):
+        image = image.chunk()
+
+    # Zarr requires a regular chunk grid, with only the last chunk of each
+    # dimension allowed to be smaller.
+    return image.chunk(dict(zip(image.dims, (c[0] for c in image.chunks))))
+
+
+def _to_dataset(images: Mapping[str, ImageType]) -> xr.Dataset:
+    """Combine named images into a single Dataset with one variable per image."""
+    variables = {}
+    for name, image in images.items():
+        if isinstance(image, xr.Dataset):
+            variables.update(
+                {f"{name}_{var}": _to_dataarray(image[var]) for var in image.data_vars}
+            )
+        else:
+            variables[name] = _to_dataarray(image)
+
+    return xr.Dataset(variables)
+
+
+def get_manifest_path(store: str | os.PathLike) -> Path:
+    """Get the path of the manifest of completed chunks for a Zarr store."""
+    path = Path(store)
+    return path.with_name(path.name + MANIFEST_SUFFIX)
+
+
+def _read_completed(path: Path, fingerprint: str) -> set[str] | None:
+    """
+    Read the keys of the completed chunks of a job from the manifest of a store, or
+    None if the store doesn't exist.
+    """
+    if not path.exists():
+        return None
+
+    manifest_path = get_manifest_path(path)
+    if not manifest_path.exists():
+        raise FileExistsError(
+            f"`{path}` already exists and wasn't written by `write_zarr`. Use "
+            "`overwrite=True` to replace it."
+        )
+
+    header, *completed = manifest_path.read_text().splitlines()
+    if json.loads(header)["fingerprint"] != fingerprint:
+        raise ValueError(
+            f"`{path}` was written by a different job. Use `overwrite=True` to replace "
+            "it."
+        )
+
+    return set(completed)
+
+
+def _write_block(
+    block: np.ndarray,
+    array: zarr.Array,
+    region: tuple[slice, ...],
+    manifest_path: Path,
+    key: str,
+) -> None:
+    """Write a computed block into a region of a Zarr array and mark it completed."""
+    array[region] = block
+
+    # Keys are appended after the block is written, so interrupted writes are redone
+    with open(manifest_path, "a") as f:
+        f.write(f"{key}\n")
+
+
+def write_zarr(
+    images: Mapping[str, ImageType],
+    store: str | os.PathLike,
+    *,
+    fingerprint: str,
+    overwrite: bool = False,
+    **compute_kwargs,
+) -> Path:
+    """
+    Write images to a local Zarr store chunk by chunk, resuming any previous run.
+
+    Each chunk is written to the store as soon as it is computed, and is recorded in a
+    manifest of completed chunks alongside the store, e.g. `predictions.zarr.manifest`
+    for `predictions.zarr`. If the same job, identified by its `fingerprint`, is
+    run again after being interrupted, only the chunks missing from the manifest are
+    computed.
+
+    Parameters
+    ----------
+    images : mapping of str to Numpy or Xarray images
+        The images to write, stored as variables with the given names. Dataset
+        variables are prefixed with the name of their image.
+    store : path-like
+        The path of the Zarr store.
+    fingerprint : str
+        An identifier of the job that produces the images, e.g. a hash of the
+        estimator, input image, and options. Resuming a store written with a
+        different fingerprint raises an error.
+    overwrite : bool, default=False
+        If True, any existing store is replaced and all chunks are computed.
+    **compute_kwargs
+        Additional arguments passed to `dask.compute`, e.g. `scheduler`.
+
+    Returns
+    -------
+    Path
+        The path of the Zarr store.
+    """
+    path = Path(store)
+    dataset = _to_dataset(images)
+    completed = None if overwrite else _read_completed(path, fingerprint)
+
+    manifest_path = get_manifest_path(path)
+
+    if completed is None:
+        # Write metadata and coordinates only. Chunks are written individually below.
+        dataset.to_zarr(path, mode="w", compute=False, consolidated=False)
+        manifest_path.write_text(json.dumps({"fingerprint": fingerprint}) + "\n")
+        completed = set()
+
+    group = zarr.open_group(path, mode="r+")
+    writes = []
+
+    for name, variable in dataset.data_vars.items():
+        # Completed chunks are keyed by their index in the store, so resumed runs
+        # that are chunked differently, e.g. by memory limits, follow its chunk grid.
+        array = variable.data.rechunk(group[name].chunks)
+        offsets = [np.cumsum((0, *chunks)) for chunks in array.chunks]
+
+        for index in np.ndindex(*array.numblocks):
+            key = f"{name}/{'.'.join(map(str, index))}"
+            if key in completed:
+                continue
+
+            region = tuple(
+                slice(offset[i], offset[i + 1]) for offset, i in zip(offsets, index)
+            )
+            writes.append(
+                dask.delayed(_write_block)(
+                    array.blocks[index], group[name], region, manifest_path, key
+                )
+            )
+
+    # Compute all chunks together so that outputs sharing a graph are computed once
+    dask.compute(*writes, **compute_kwargs)
+
+    return path
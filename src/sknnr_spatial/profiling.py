@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable
+
+from dask.utils import format_bytes
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# The stages of processing a chunk, in the order they run
+STAGES = ("mask", "fill", "call", "postprocess")
+
+_active_profilers: list[ChunkProfiler] = []
+_lock = threading.Lock()
+
+
+@dataclass
+class ChunkProfile:
+    """
+    Measurements of processing one chunk of an image.
+
+    Attributes
+    ----------
+    n_pixels : int
+        The number of pixels in the chunk.
+    n_valid : int
+        The number of pixels that don't contain NoData in any band.
+    durations : dict of str to float
+        The time spent in each stage, in seconds. Stages are "mask" (finding NoData),
+        "fill" (casting, filling NaNs, and gathering valid pixels), "call" (the applied
+        function, e.g. the estimator), and "postprocess" (casting, masking, and
+        reshaping outputs). Stages that didn't run are missing.
+    nbytes : int
+        The approximate number of bytes allocated for arrays while processing the
+        chunk, excluding temporary arrays allocated inside the applied function.
+    total : float
+        The total time spent processing the chunk, in seconds.
+    cached : bool
+        Whether the chunk result was read from a cache rather than computed.
+    n_unique : int, optional
+        The number of unique pixels passed to the applied function when deduplicating,
+        or None if the chunk wasn't deduplicated.
+    """
+
+    n_pixels: int
+    n_valid: int = 0
+    durations: dict[str, float] = field(default_factory=dict)
+    nbytes: int = 0
+    total: float = 0.0
+    cached: bool = False
+    n_unique: int | None = None
+    _start: float = field(default_factory=time.perf_counter, init=False, repr=False)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage of processing the chunk, adding to any previous time."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+
+    def allocated(self, *arrays) -> None:
+        """Record arrays allocated while processing the chunk."""
+        self.nbytes += sum(array.nbytes for array in arrays)
+
+
+class ChunkProfiler:
+    """
+    A context manager that records a `ChunkProfile` for every chunk processed while
+    it's active, including chunks computed lazily by Dask.
+
+    Profiling adds a small overhead to each chunk, so it's only enabled within the
+    context. Chunks processed in other processes, e.g. by process pool executors or
+    distributed workers, aren't recorded.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        A function called with each `ChunkProfile` as soon as its chunk is processed.
+        It may be called concurrently from multiple threads.
+
+    Examples
+    --------
+
+    Profile the stages of a prediction:
+
+    >>> from sklearn.neighbors import KNeighborsRegressor
+    >>> from sknnr_spatial import wrap
+    >>> from sknnr_spatial.datasets import load_swo_ecoplot
+    >>> from sknnr_spatial.profiling import ChunkProfiler
+    >>> X_image, X, y = load_swo_ecoplot(as_dataset=True)
+    >>> est = wrap(KNeighborsRegressor()).fit(X, y)
+    >>> with ChunkProfiler() as profiler:
+    ...     _ = est.predict(X_image).compute()
+    >>> sum(profile.n_pixels for profile in profiler.profiles)
+    16384
+    >>> print(profiler.summary())  # doctest: +SKIP
+    100 chunks (0 cached), 16384 pixels (16384 valid), 3.38 MiB allocated
+    0.412s total, 39767 pixels/s
+      mask             0.004s    1.0%
+      fill             0.002s    0.5%
+      call             0.396s   96.1%
+      postprocess      0.003s    0.7%
+    """
+
+    def __init__(self, callback: Callable[[ChunkProfile], None] | None = None):
+        self.callback = callback
+        self.profiles: list[ChunkProfile] = []
+
+    def __enter__(self) -> ChunkProfiler:
+        with _lock:
+            _active_profilers.append(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        with _lock:
+            _active_profilers.remove(self)
+
+    def _record(self, profile: ChunkProfile) -> None:
+        self.profiles.append(profile)
+        if self.callback is not None:
+            self.callback(profile)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Get a dataframe of every recorded chunk, with the time spent in each stage in
+        seconds. `n_unique` is missing for chunks that weren't deduplicated.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(
+            [
+                {
+                    "n_pixels": p.n_pixels,
+                    "n_valid": p.n_valid,
+                    "nbytes": p.nbytes,
+                    "cached": p.cached,
+                    "n_unique": p.n_unique,
+                    **{stage: p.durations.get(stage, 0.0) for stage in STAGES},
+                    "total": p.total,
+                }
+                for p in self.profiles
+            ],
+            columns=[
+                "n_pixels",
+                "n_valid",
+                "nbytes",
+                "cached",
+                "n_unique",
+                *STAGES,
+                "total",
+            ],
+        )
+
+    def summary(self) -> str:
+        """Summarize the recorded chunks and the time spent in each stage."""
+        df = self.to_dataframe()
+        total = df["total"].sum()
+        n_pixels = df["n_pixels"].sum()
+
+        lines = [
+            f"{len(df)} chunks ({df['cached'].sum()} cached), {n_pixels} pixels "
+            f"({df['n_valid'].sum()} valid), {format_bytes(df['nbytes'].sum())} "
+            f"allocated",
+            f"{total:.3f}s total, {n_pixels / total if total else 0:.0f} pixels/s",
+        ]
+        deduplicated = df[df["n_unique"].notna()]
+        if len(deduplicated):
+            n_unique = int(deduplicated["n_unique"].sum())
+            n_deduplicated = deduplicated["n_pixels"].sum()
+            lines.append(
+                f"{len(deduplicated)} chunks deduplicated, {n_unique} unique pixels "
+                f"({n_unique / n_deduplicated:.1%} of their pixels)"
+            )
+        for stage in STAGES:
+            seconds = df[stage].sum()
+            share = seconds / total if total else 0
+            lines.append(f"  {stage:<12}{seconds:>10.3f}s {share:>7.1%}")
+
+        return "\n".join(lines)
+
+
+def start_chunk(n_pixels: int) -> ChunkProfile | None:
+    """Start profiling a chunk, or return None if no profilers are active."""
+    if not _active_profilers:
+        return None
+
+    return ChunkProfile(n_pixels=n_pixels)
+
+
+def finish_chunk(profile: ChunkProfile | None) -> None:
+    """Finish profiling a chunk and record it with every active profiler."""
+    if profile is None:
+        return
+
+    profile.total = time.perf_counter() - profile._start
+    with _lock:
+        profilers = list(_active_profilers)
+
+    for profiler in profilers:
+        profiler._record(profile)
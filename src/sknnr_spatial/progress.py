@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+# The default number of seconds of recent chunks used to estimate throughput
+THROUGHPUT_WINDOW = 60.0
+
+
+@dataclass(frozen=True)
+class Progress:
+    """
+    A snapshot of the progress of processing an image.
+
+    Attributes
+    ----------
+    completed : int
+        The number of chunks processed so far.
+    total : int
+        The total number of chunks to process.
+    n_pixels : int
+        The number of pixels processed so far.
+    n_valid : int
+        The number of processed pixels that don't contain NoData in any band.
+    elapsed : float
+        The seconds since the first chunk started processing.
+    throughput : float
+        The rate of recently processed pixels, in pixels per second.
+    """
+
+    completed: int
+    total: int
+    n_pixels: int
+    n_valid: int
+    elapsed: float
+    throughput: float
+
+    @property
+    def fraction(self) -> float:
+        """The fraction of chunks processed so far."""
+        return self.completed / self.total if self.total else 0.0
+
+    @property
+    def remaining(self) -> float | None:
+        """
+        The estimated seconds until all chunks are processed, assuming the remaining
+        chunks are processed at the same rate as the completed chunks, or None if no
+        chunks have been processed yet.
+        """
+        if not self.completed:
+            return None
+
+        return self.elapsed / self.completed * (self.total - self.completed)
+
+    def __str__(self) -> str:
+        remaining = "?" if self.remaining is None else f"{self.remaining:.0f}s"
+        return (
+            f"{self.completed}/{self.total} chunks ({self.fraction:.1%}), "
+            f"{self.n_pixels} pixels ({self.n_valid} valid), "
+            f"{self.throughput:.0f} pixels/s, {self.elapsed:.0f}s elapsed, "
+            f"{remaining} remaining"
+        )
+
+
+class ProgressTracker:
+    """
+    Track the progress of processing images in chunks.
+
+    Pass a tracker to a prediction method with `progress` to report each chunk as
+    it's processed, whether chunks are computed lazily by Dask or processed in tiles
+    in memory. Tiles processed by process pool executors are reported as their
+    results are collected, while chunks computed by Dask in other processes, e.g. by
+    distributed workers, aren't reported. Trackers can be polled from other threads,
+    or report each update to a callback. A tracker passed to multiple methods tracks
+    their chunks together.
+
+    The chunks of lazy results are added to the total when the result is created,
+    not when it's computed, so a tracker describes a single compute of each result.
+    Use a new tracker to monitor computing a result again or computing only some of
+    its chunks, e.g. when resuming an interrupted run.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        A function called with a `Progress` snapshot each time a chunk is processed,
+        e.g. `print`. It may be called concurrently from multiple threads.
+    window : float, default=60.0
+        The number of seconds of recently processed chunks used to estimate
+        throughput.
+
+    Examples
+    --------
+
+    Print progress while predicting:
+
+    >>> from sklearn.neighbors import KNeighborsRegressor
+    >>> from sknnr_spatial import wrap
+    >>> from sknnr_spatial.datasets import load_swo_ecoplot
+    >>> from sknnr_spatial.progress import ProgressTracker
+    >>> X_image, X, y = load_swo_ecoplot(as_dataset=True)
+    >>> est = wrap(KNeighborsRegressor()).fit(X, y)
+    >>> progress = ProgressTracker(callback=print)
+    >>> y_pred = est.predict(X_image, progress=progress).compute()  # doctest: +SKIP
+    1/100 chunks (1.0%), 169 pixels (169 valid), 4225 pixels/s, 0s elapsed, 4s remaining
+    ...
+    >>> progress.snapshot().n_pixels  # doctest: +SKIP
+    16384
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Progress], None] | None = None,
+        *,
+        window: float = THROUGHPUT_WINDOW,
+    ):
+        self.callback = callback
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._total = 0
+        self._completed = 0
+        self._n_pixels = 0
+        self._n_valid = 0
+        self._start: float | None = None
+        # Times and pixel counts of chunks processed within the throughput window
+        self._recent: deque[tuple[float, int]] = deque()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.snapshot()})"
+
+    def add_chunks(self, n_chunks: int) -> None:
+        """Add chunks to the total number of chunks to process."""
+        with self._lock:
+            self._total += n_chunks
+
+    def start_chunk(self) -> None:
+        """Record that a chunk started processing, starting the clock if needed."""
+        with self._lock:
+            if self._start is None:
+                self._start = time.perf_counter()
+
+    def finish_chunk(self, n_pixels: int, n_valid: int) -> None:
+        """Record that a chunk finished processing and report the progress."""
+        now = time.perf_counter()
+        with self._lock:
+            self._completed += 1
+            self._n_pixels += n_pixels
+            self._n_valid += n_valid
+
+            self._recent.append((now, n_pixels))
+            while self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+
+            progress = self._snapshot(now)
+
+        if self.callback is not None:
+            self.callback(progress)
+
+    def snapshot(self) -> Progress:
+        """Get the current progress."""
+        with self._lock:
+            return self._snapshot(time.perf_counter())
+
+    def _snapshot(self, now: float) -> Progress:
+        elapsed = 0.0 if self._start is None else now - self._start
+
+        # Measure throughput from the start of the window, or the first chunk if the
+        # run is shorter than the window.
+        window_start = max(now - self.window, self._start or now)
+        window_pixels = sum(n for t, n in self._recent if t >= window_start)
+        throughput = window_pixels / (now - window_start) if now > window_start else 0.0
+
+        return Progress(
+            completed=self._completed,
+            total=self._total,
+            n_pixels=self._n_pixels,
+            n_valid=self._n_valid,
+            elapsed=elapsed,
+            throughput=throughput,
+        )
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Callable
+
+import numpy as np
+from numpy.typing import NDArray
+from sklearn.base import BaseEstimator
+from sklearn.cluster import KMeans
+from typing_extensions import Self
+
+
+class NeighborSearch(ABC):
+    """
+    A neighbor search over the fitted samples of a KNeighbors-style estimator.
+
+    Searches are fit once alongside the wrapped estimator, precomputing any state
+    that would otherwise be rebuilt for every chunk, and are then used in place of
+    the estimator's own `kneighbors` method. Distances are Euclidean, measured in the
+    space of the estimator's fitted samples.
+
+    Queries are searched in their own floating point dtype, so `float32` images are
+    compared to a `float32` copy of the fitted samples, made once, with half the
+    memory and the precision of `float32`. Other queries are searched in `float64`.
+    """
+
+    X: NDArray
+    transform: Callable[[NDArray], NDArray] | None
+
+    def fit(self, estimator: BaseEstimator) -> Self:
+        """
+        Fit the search to the samples of a fitted KNeighbors-style estimator.
+
+        Parameters
+        ----------
+        estimator : BaseEstimator
+            A fitted estimator with dense fitted samples `_fit_X` and a Euclidean
+            metric. The fitted transformer of sknnr estimators is applied to queries.
+
+        Returns
+        -------
+        self : NeighborSearch
+            The fitted search.
+        """
+        if getattr(estimator, "effective_metric_", None) != "euclidean" or not (
+            isinstance(getattr(estimator, "_fit_X", None), np.ndarray)
+        ):
+            estimator_class = estimator.__class__.__name__
+            raise ValueError(
+                f"{type(self).__name__} requires a KNeighbors-style estimator fitted "
+                f"with a Euclidean metric on dense samples, not {estimator_class}."
+            )
+
+        # sknnr estimators search a transformed space that queries must be mapped to
+        transformer = getattr(estimator, "transformer_", None)
+        self.transform = transformer.transform if transformer is not None else None
+        self.X = np.ascontiguousarray(estimator._fit_X, dtype=np.float64)
+        self._casts: dict[tuple[str, np.dtype], NDArray] = {}
+        self._fit()
+
+        return self
+
+    @property
+    def n_samples(self) -> int:
+        return self.X.shape[0]
+
+    @abstractmethod
+    def _fit(self) -> None:
+        """Precompute any state needed to search the fitted samples."""
+
+    def _fitted(self, name: str, dtype: np.dtype) -> NDArray:
+        """Get a fitted array in the dtype of the queries, casting it once per dtype."""
+        array = getattr(self, name)
+        if array.dtype == dtype:
+            return array
+
+        key = (name, dtype)
+        if key not in self._casts:
+            self._casts[key] = np.ascontiguousarray(array, dtype=dtype)
+
+        return self._casts[key]
+
+    def kneighbors(
+        self, X: NDArray, n_neighbors: int, return_distance: bool = True
+    ) -> NDArray | tuple[NDArray, NDArray]:
+        """
+        Find the nearest fitted samples of each query, sorted by distance.
+
+        Parameters
+        ----------
+        X : NDArray
+            Queries of shape (samples, features). Queries are searched in `float32`
+            if given in `float32`, or `float64` otherwise.
+        n_neighbors : int
+            The number of neighbors to find.
+        return_distance : bool, default=True
+            If True, return distances to the neighbors as well as their indices.
+
+        Returns
+        -------
+        neigh_dist : NDArray
+            Distances of shape (samples, neighbors), only present if
+            `return_distance=True`.
+        neigh_ind : NDArray
+            Indices of shape (samples, neighbors).
+        """
+        if not 0 < n_neighbors <= self.n_samples:
+            raise ValueError(
+                f"`n_neighbors` must be between 1 and {self.n_samples}, not "
+                f"{n_neighbors}."
+            )
+
+        if self.transform is not None:
+            X = self.transform(X)
+
+        X = np.asarray(X)
+        dtype = np.float32 if X.dtype == np.float32 else np.float64
+        dist, ind = self._kneighbors(np.ascontiguousarray(X, dtype=dtype), n_neighbors)
+
+        return (dist, ind) if return_distance else ind
+
+    @abstractmethod
+    def _kneighbors(self, X: NDArray, n_neighbors: int) -> tuple[NDArray, NDArray]:
+        """Find the sorted distances to and indices of the neighbors of queries."""
+
+
+class BruteForceKNN(NeighborSearch):
+    """
+    Exact Euclidean neighbor search against precomputed reference norms.
+
+    The squared norms of the fitted samples are computed once, so searching a chunk
+    reduces to a single matrix product and a partial sort of each row. Samples are
+    ranked by `|r|^2 - 2 q.r`, which differs from the squared distance by `|q|^2`, so
+    query norms are only added to the selected neighbors.
+    """
+
+    sq_norms: NDArray
+
+    def _fit(self) -> None:
+        self.sq_norms = np.einsum("ij,ij->i", self.X, self.X)
+
+    def _kneighbors(self, X: NDArray, n_neighbors: int) -> tuple[NDArray, NDArray]:
+        rank = X @ self._fitted("X", X.dtype).T
+        rank *= -2.0
+        rank += self._fitted("sq_norms", X.dtype)
+
+        return _select_nearest(rank, n_neighbors, np.einsum("ij,ij->i", X, X))
+
+
+class CoherentKNN(BruteForceKNN):
+    """
+    Exact Euclidean neighbor search that reuses the neighbors of nearby pixels.
+
+    Pixels are passed to searches in row-major order, so consecutive pixels are
+    usually spatially adjacent with similar features. Every `stride`-th pixel is an
+    anchor whose `n_candidates` nearest samples are found by a full search. The
+    following pixels only search their anchor's candidates.
+
+    Results are exact: by the triangle inequality, a pixel's true neighbors are all
+    candidates of its anchor if the pixel's distance to the anchor plus its k-th
+    distance among the candidates is less than the distance to the anchor's furthest
+    candidate. Pixels that fail this bound, e.g. at edges between land cover types,
+    fall back to a full search.
+
+    Only the speed of the search depends on pixel order. Splitting chunks into
+    batches and skipping NoData pixels keep the remaining pixels in row-major order,
+    and deduplicated pixels are searched in the order they first appear. Pixels
+    that follow a gap, e.g. at the start of each row or after skipped NoData, are
+    less likely to satisfy the bound of their anchor.
+
+    Parameters
+    ----------
+    stride : int, default=4
+        The number of consecutive pixels that share each anchor's candidates.
+    n_candidates : int, optional
+        The number of candidates found for each anchor. More candidates make the
+        bound more likely to hold at the cost of a larger search per pixel. If None,
+        four times the number of neighbors is used.
+    """
+
+    def __init__(self, stride: int = 4, n_candidates: int | None = None):
+        if stride < 1:
+            raise ValueError(f"`stride` must be a positive integer, not {stride}.")
+
+        self.stride = stride
+        self.n_candidates = n_candidates
+
+    def _kneighbors(self, X: NDArray, n_neighbors: int) -> tuple[NDArray, NDArray]:
+        n_queries, n_features = X.shape
+        n_candidates = min(
+            max(self.n_candidates or 4 * n_neighbors, n_neighbors), self.n_samples
+        )
+        n_anchors = -(-n_queries // self.stride)
+
+        anchors = X[:: self.stride]
+        anchor_dist, candidates = super()._kneighbors(anchors, n_candidates)
+
+        # Rank each group of pixels against its anchor's candidates in a single
+        # batched product of (anchors, stride, features) by (anchors, features,
+        # candidates).
+        groups = np.zeros((n_anchors * self.stride, n_features), dtype=X.dtype)
+        groups[:n_queries] = X
+        groups = groups.reshape(n_anchors, self.stride, n_features)
+        rank = groups @ self._fitted("X", X.dtype)[candidates].transpose(0, 2, 1)
+        rank *= -2.0
+        rank += self._fitted("sq_norms", X.dtype)[candidates][:, np.newaxis, :]
+
+        anchor_ind = np.arange(n_queries) // self.stride
+        sq_norms = np.einsum("ij,ij->i", X, X)
+        dist, ind = _select_nearest(
+            rank.reshape(-1, n_candidates)[:n_queries],
+            n_neighbors,
+            sq_norms,
+            ind=candidates[anchor_ind],
+        )
+
+        # Searching every sample is always exact, regardless of the bound
+        if n_candidates == self.n_samples:
+            return dist, ind
+
+        offset = np.linalg.norm(X - anchors[anchor_ind], axis=1)
+        failed = offset + dist[:, -1] >= anchor_dist[anchor_ind, -1]
+        if failed.any():
+            dist[failed], ind[failed] = super()._kneighbors(X[failed], n_neighbors)
+
+        return dist, ind
+
+
+class IVFKNN(NeighborSearch):
+    """
+    Approximate Euclidean neighbor search with an inverted file index.
+
+    Fitted samples are partitioned into `n_lists` clusters by k-means. Each query is
+    only compared to the samples of its `n_probe` nearest clusters, trading recall
+    for speed. Queries whose probed clusters hold fewer than `n_neighbors` samples
+    are searched exhaustively.
+
+    Parameters
+    ----------
+    n_lists : int, optional
+        The number of clusters to partition the fitted samples into. If None, the
+        square root of the number of samples is used.
+    n_probe : int, default=8
+        The number of nearest clusters searched for each query. Higher values
+        increase recall at the cost of speed, and searching every cluster is exact.
+        This can be changed after fitting.
+    max_iter : int, default=20
+        The maximum number of k-means iterations used to fit the clusters.
+    random_state : int, optional
+        The seed used to initialize the clusters.
+    """
+
+    centroids: NDArray
+    list_ind: NDArray
+    list_offsets: NDArray
+    sq_norms: NDArray
+
+    def __init__(
+        self,
+        n_lists: int | None = None,
+        n_probe: int = 8,
+        max_iter: int = 20,
+        random_state: int | None = None,
+    ):
+        if n_probe < 1:
+            raise ValueError(f"`n_probe` must be a positive integer, not {n_probe}.")
+
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def _fit(self) -> None:
+        n_lists = self.n_lists or round(np.sqrt(self.n_samples))
+        kmeans = KMeans(
+            n_clusters=min(n_lists, self.n_samples),
+            n_init=1,
+            max_iter=self.max_iter,
+            random_state=self.random_state,
+        ).fit(self.X)
+
+        # Samples are stored sorted by cluster, with each cluster's offsets
+        labels = kmeans.labels_
+        self.centroids = kmeans.cluster_centers_
+        self.list_ind = np.argsort(labels, kind="stable")
+        self.list_offsets = np.searchsorted(
+            labels[self.list_ind], np.arange(len(self.centroids) + 1)
+        )
+        self.sq_norms = np.einsum("ij,ij->i", self.X, self.X)
+
+    def _kneighbors(self, X: NDArray, n_neighbors: int) -> tuple[NDArray, NDArray]:
+        n_queries = X.shape[0]
+        X_fit = self._fitted("X", X.dtype)
+        sq_norms = self._fitted("sq_norms", X.dtype)
+        best_rank = np.full((n_queries, n_neighbors), np.inf, dtype=X.dtype)
+        best_ind = np.zeros((n_queries, n_neighbors), dtype=np.intp)
+
+        # Group queries by the clusters they probe, so each cluster is compared to
+        # all of its queries at once.
+        probes = _nearest_centroids(X, self._fitted("centroids", X.dtype), self.n_probe)
+        query_ind = np.repeat(np.arange(n_queries), probes.shape[1])
+        probes = probes.ravel()
+        order = np.argsort(probes, kind="stable")
+        query_ind, probes = query_ind[order], probes[order]
+        bounds = np.searchsorted(probes, np.arange(len(self.centroids) + 1))
+
+        for i in range(len(self.centroids)):
+            queries = query_ind[bounds[i] : bounds[i + 1]]
+            members = self.list_ind[self.list_offsets[i] : self.list_offsets[i + 1]]
+            if not len(queries) or not len(members):
+                continue
+
+            rank = X[queries] @ X_fit[members].T
+            rank *= -2.0
+            rank += sq_norms[members]
+
+            # Merge the cluster's samples with the best samples found so far
+            rank = np.hstack([best_rank[queries], rank])
+            ind = np.hstack(
+                [
+                    best_ind[queries],
+                    np.broadcast_to(members, (len(queries), len(members))),
+                ]
+            )
+            selected = np.argpartition(rank, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            best_rank[queries] = np.take_along_axis(rank, selected, axis=1)
+            best_ind[queries] = np.take_along_axis(ind, selected, axis=1)
+
+        missing = np.isinf(best_rank).any(axis=1)
+        if missing.any():
+            rank = X[missing] @ X_fit.T
+            rank *= -2.0
+            rank += sq_norms
+            selected = np.argpartition(rank, n_neighbors - 1, axis=1)[:, :n_neighbors]
+            best_rank[missing] = np.take_along_axis(rank, selected, axis=1)
+            best_ind[missing] = selected
+
+        return _select_nearest(
+            best_rank, n_neighbors, np.einsum("ij,ij->i", X, X), ind=best_ind
+        )
+
+
+def _nearest_centroids(X: NDArray, centroids: NDArray, n: int) -> NDArray:
+    """Get the indices of the `n` nearest centroids of each query, unsorted."""
+    if n >= len(centroids):
+        return np.broadcast_to(np.arange(len(centroids)), (len(X), len(centroids)))
+
+    rank = X @ centroids.T
+    rank *= -2.0
+    rank += np.einsum("ij,ij->i", centroids, centroids)
+
+    return np.argpartition(rank, n - 1, axis=1)[:, :n]
+
+
+def neighbor_recall(ind: NDArray, expected_ind: NDArray) -> float:
+    """
+    Get the fraction of expected neighbors that were found, e.g. by an approximate
+    search compared to an exact search.
+
+    Parameters
+    ----------
+    ind : NDArray
+        Neighbor indices of shape (samples, neighbors).
+    expected_ind : NDArray
+        Expected neighbor indices of shape (samples, neighbors).
+
+    Returns
+    -------
+    float
+        The recall, between 0 and 1.
+    """
+    found = (ind[:, :, np.newaxis] == expected_ind[:, np.newaxis, :]).any(axis=1)
+    return float(found.mean())
+
+
+def _select_nearest(
+    rank: NDArray, n_neighbors: int, sq_norms: NDArray, ind: NDArray | None = None
+) -> tuple[NDArray, NDArray]:
+    """
+    Select the sorted distances to and indices of the lowest ranked samples for
+    each query, where ranks are squared distances less the query's squared norm.
+
+    Parameters
+    ----------
+    rank : NDArray
+        Ranks of shape (queries, candidates).
+    n_neighbors : int
+        The number of neighbors to select.
+    sq_norms : NDArray
+        Squared norms of the queries of shape (queries,).
+    ind : NDArray, optional
+        Sample indices of the candidates of shape (queries, candidates). If None,
+        each candidate is the sample at its column index.
+    """
+    if n_neighbors < rank.shape[1]:
+        selected = np.argpartition(rank, n_neighbors - 1, axis=1)[:, :n_neighbors]
+    else:
+        selected = np.broadcast_to(np.arange(rank.shape[1]), rank.shape)
+    rank = np.take_along_axis(rank, selected, axis=1)
+
+    order = np.argsort(rank, axis=1, kind="stable")
+    selected = np.take_along_axis(selected, order, axis=1)
+    sq_dist = np.take_along_axis(rank, order, axis=1) + sq_norms[:, np.newaxis]
+    if ind is not None:
+        selected = np.take_along_axis(ind, selected, axis=1)
+
+    # Rounding can give slightly negative squared distances for exact matches
+    return np.sqrt(np.maximum(sq_dist, 0.0)), selected
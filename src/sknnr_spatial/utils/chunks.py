@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+from dask.utils import format_bytes, parse_bytes
+
+
+@dataclass(frozen=True)
+class ChunkPlan:
+    """
+    A spatial chunk size planned to fit a per-task memory budget.
+
+    Attributes
+    ----------
+    chunks : tuple of int
+        The (y, x) size of each chunk. Bands are always kept in a single chunk.
+    n_chunks : int
+        The number of chunks covering the image.
+    peak_memory : int
+        The estimated peak memory of processing one chunk, in bytes.
+    memory_limit : int
+        The per-task memory budget the chunks were planned for, in bytes.
+    """
+
+    chunks: tuple[int, int]
+    n_chunks: int
+    peak_memory: int
+    memory_limit: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_chunks} chunks of shape {self.chunks} using an estimated "
+            f"{format_bytes(self.peak_memory)} each "
+            f"(limit {format_bytes(self.memory_limit)})"
+        )
+
+
+@dataclass(frozen=True)
+class RunEstimate:
+    """
+    The estimated cost of processing an image, extrapolated from a sample of chunks.
+
+    Attributes
+    ----------
+    n_tasks : int
+        The number of chunks the image is processed in.
+    chunks : tuple of int
+        The (y, x) size of the largest chunk.
+    n_sampled : int
+        The number of chunks that were processed to measure their cost. Images
+        processed in a single chunk are sampled in smaller tiles.
+    task_runtime : float
+        The estimated time to process one chunk, in seconds, from the mean runtime of
+        the sampled chunks.
+    peak_memory : int
+        The estimated peak memory allocated while processing one chunk, in bytes, from
+        the largest peak memory of the sampled chunks.
+    output_nbytes : int
+        The in-memory size of all outputs, in bytes. Files written from the outputs
+        may be smaller if they're compressed.
+    """
+
+    n_tasks: int
+    chunks: tuple[int, int]
+    n_sampled: int
+    task_runtime: float
+    peak_memory: int
+    output_nbytes: int
+
+    @property
+    def runtime(self) -> float:
+        """The estimated time to process every chunk in sequence, in seconds."""
+        return self.task_runtime * self.n_tasks
+
+    def __str__(self) -> str:
+        return (
+            f"{self.n_tasks} tasks of shape {self.chunks} taking an estimated "
+            f"{self.runtime:.1f}s in sequence ({self.task_runtime:.3f}s and "
+            f"{format_bytes(self.peak_memory)} peak memory each), producing "
+            f"{format_bytes(self.output_nbytes)} of outputs in memory "
+            f"(from {self.n_sampled} sampled tasks)"
+        )
+
+
+def plan_chunks(
+    shape: tuple[int, int],
+    *,
+    memory_limit: int | str,
+    pixel_bytes: int,
+    fixed_bytes: int = 0,
+) -> ChunkPlan:
+    """
+    Plan the largest spatial chunks of an image that fit within a memory budget.
+
+    Chunks are kept as square as possible, extending along the other dimension once
+    they span the full width or height of the image.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        The (y, x) shape of the image.
+    memory_limit : int or str
+        The memory available to process each chunk, in bytes or as a string such as
+        "2GB".
+    pixel_bytes : int
+        The estimated memory needed per pixel of a chunk, in bytes.
+    fixed_bytes : int, default=0
+        The estimated memory needed per chunk regardless of its size, in bytes.
+
+    Returns
+    -------
+    ChunkPlan
+        The planned chunk size and its estimated peak memory.
+    """
+    memory_limit = parse_bytes(memory_limit)
+    max_pixels = (memory_limit - fixed_bytes) // max(pixel_bytes, 1)
+
+    if max_pixels < 1:
+        raise ValueError(
+            f"A memory limit of {format_bytes(memory_limit)} is too small to process "
+            f"a single pixel, which needs an estimated "
+            f"{format_bytes(fixed_bytes + pixel_bytes)}."
+        )
+
+    n_rows, n_cols = shape
+    side = math.isqrt(max_pixels)
+    chunk_rows = min(n_rows, side)
+    chunk_cols = min(n_cols, max_pixels // chunk_rows)
+    # Use any leftover budget for more rows if the chunks span the full width
+    chunk_rows = min(n_rows, max_pixels // chunk_cols)
+
+    return ChunkPlan(
+        chunks=(chunk_rows, chunk_cols),
+        n_chunks=math.ceil(n_rows / chunk_rows) * math.ceil(n_cols / chunk_cols),
+        peak_memory=fixed_bytes + chunk_rows * chunk_cols * pixel_bytes,
+        memory_limit=memory_limit,
+    )
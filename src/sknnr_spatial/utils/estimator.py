@@ -1,6 +1,12 @@
+from __future__ import annotations
+
 import warnings
+from typing import Any
 
+from dask.base import tokenize
+from joblib.hashing import NumpyHasher
 from sklearn.base import BaseEstimator
+from sklearn.neighbors import BallTree, KDTree
 from sklearn.utils.validation import NotFittedError, check_is_fitted
 
 
@@ -13,6 +19,38 @@ def is_fitted(estimator: BaseEstimator) -> bool:
         return False
 
 
+def get_estimator_type(estimator: BaseEstimator) -> str | None:
+    """Return the estimator type, e.g. "classifier", "regressor", or "clusterer"."""
+    if hasattr(estimator, "_estimator_type"):
+        return estimator._estimator_type
+
+    # Newer versions of scikit-learn store the estimator type in tags
+    try:
+        return estimator.__sklearn_tags__().estimator_type
+    except AttributeError:
+        return None
+
+
+class _EstimatorHasher(NumpyHasher):
+    """A joblib hasher that ignores state which changes when estimators are used."""
+
+    def save(self, obj):
+        # Neighbor trees count their queries, so only their data is hashed
+        if isinstance(obj, (BallTree, KDTree)):
+            obj = (type(obj).__name__, obj.get_arrays())
+
+        return super().save(obj)
+
+
+def get_fingerprint(estimator: BaseEstimator, *args: Any, **kwargs: Any) -> str:
+    """
+    Return a deterministic identifier of a fitted estimator applied to some inputs,
+    e.g. an image, method name, and options. Identical fitted estimators and inputs
+    always give the same fingerprint.
+    """
+    return tokenize(_EstimatorHasher().hash(estimator), *args, **kwargs)
+
+
 def suppress_feature_name_warnings(func):
     """Suppress warnings related to missing feature names in a wrapped function."""
     msg = "X does not have valid feature names"
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 from functools import wraps
 from typing import Callable
 
@@ -34,3 +36,27 @@ def image_or_fallback(
         return func(self, X_image, *args, **kwargs)
 
     return wrapper
+
+
+def concat_bands(images: list[ImageType]) -> ImageType:
+    """
+    Concatenate images of the same type along their band dimension.
+
+    Numpy arrays and DataArrays are concatenated along their first dimension. Dataset
+    variables are prefixed with the position of their image to keep them unique.
+    """
+    if isinstance(images[0], np.ndarray):
+        return np.concatenate(images, axis=0)
+
+    if isinstance(images[0], xr.DataArray):
+        return xr.concat(images, dim=images[0].dims[0])
+
+    if isinstance(images[0], xr.Dataset):
+        return xr.merge(
+            [
+                image.rename({var: f"{i}_{var}" for var in image.data_vars})
+                for i, image in enumerate(images)
+            ]
+        )
+
+    raise TypeError(f"Unsupported image type `{type(images[0]).__name__}`.")
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from typing import Callable, Union
+
+import numpy as np
+from numpy.typing import NDArray
+from sklearn.base import BaseEstimator
+from typing_extensions import Literal
+
+from .estimator import get_estimator_type
+
+NeighborWeights = Union[Literal["uniform", "distance"], Callable, None]
+ImputeMethod = Literal["mean", "weighted_mean", "mode", "kth"]
+IMPUTE_METHODS: tuple[ImputeMethod, ...] = ("mean", "weighted_mean", "mode", "kth")
+
+
+def get_neighbor_weights(
+    dist: NDArray | None, weights: NeighborWeights
+) -> NDArray | None:
+    """
+    Get weights for each neighbor from their distances, following scikit-learn
+    conventions. Uniform weights return None.
+
+    Distance weights are the inverse of each distance. Samples with any neighbors at
+    zero distance give those neighbors a weight of 1 and all others a weight of 0.
+    Callable weights are called with the distances and return weights of the same
+    shape.
+    """
+    if weights in (None, "uniform"):
+        return None
+
+    if callable(weights):
+        return weights(dist)
+
+    if weights != "distance":
+        raise ValueError(
+            f"Unknown weights `{weights}`. Use 'uniform', 'distance', or a callable."
+        )
+
+    with np.errstate(divide="ignore"):
+        inverse = 1.0 / dist
+
+    # Neighbors at zero distance are exact matches and take all of the weight
+    exact = np.isinf(inverse)
+    exact_rows = exact.any(axis=1)
+    inverse[exact_rows] = exact[exact_rows]
+
+    return inverse
+
+
+def neighbor_mean(
+    ind: NDArray, attributes: NDArray, weights: NDArray | None = None
+) -> NDArray:
+    """
+    Get the mean attribute values of the neighbors of each sample.
+
+    Attributes are gathered one neighbor at a time to avoid allocating an array of
+    shape (samples, neighbors, attributes).
+
+    Parameters
+    ----------
+    ind : NDArray
+        Neighbor indices of shape (samples, neighbors).
+    attributes : NDArray
+        Reference attributes of shape (references, attributes).
+    weights : NDArray, optional
+        Neighbor weights of shape (samples, neighbors). If None, neighbors are
+        weighted uniformly.
+
+    Returns
+    -------
+    NDArray
+        Mean attribute values of shape (samples, attributes).
+    """
+    total = np.zeros((ind.shape[0], attributes.shape[1]), dtype=np.float64)
+
+    for j in range(ind.shape[1]):
+        values = attributes[ind[:, j]]
+        total += values if weights is None else values * weights[:, j : j + 1]
+
+    if weights is None:
+        return total / ind.shape[1]
+
+    return total / weights.sum(axis=1, keepdims=True)
+
+
+def neighbor_mode(
+    ind: NDArray, attributes: NDArray, weights: NDArray | None = None
+) -> NDArray:
+    """
+    Get the most common attribute values of the neighbors of each sample.
+
+    Ties are broken by choosing the smallest value, matching scikit-learn.
+
+    Parameters
+    ----------
+    ind : NDArray
+        Neighbor indices of shape (samples, neighbors).
+    attributes : NDArray
+        Reference attributes of shape (references, attributes).
+    weights : NDArray, optional
+        Neighbor weights of shape (samples, neighbors). If None, neighbors are
+        weighted uniformly.
+
+    Returns
+    -------
+    NDArray
+        Most common attribute values of shape (samples, attributes).
+    """
+    values = attributes[ind]
+    weights = np.ones(ind.shape) if weights is None else weights
+    weights = weights[:, :, np.newaxis]
+
+    best_value = values[:, 0]
+    best_count = np.full(best_value.shape, -np.inf)
+
+    # Count the total weight of each neighbor's value and keep the best so far
+    for j in range(ind.shape[1]):
+        candidate = values[:, j]
+        count = ((values == candidate[:, np.newaxis]) * weights).sum(axis=1)
+        better = (count > best_count) | (
+            (count == best_count) & (candidate < best_value)
+        )
+
+        best_value = np.where(better, candidate, best_value)
+        best_count = np.where(better, count, best_count)
+
+    return best_value
+
+
+def impute_from_neighbors(
+    ind: NDArray,
+    attributes: NDArray,
+    *,
+    method: ImputeMethod = "mean",
+    dist: NDArray | None = None,
+    kth: int = 1,
+) -> NDArray:
+    """
+    Impute attributes for each sample from the attributes of its neighbors.
+
+    Parameters
+    ----------
+    ind : NDArray
+        Neighbor indices of shape (samples, neighbors), sorted by distance.
+    attributes : NDArray
+        Reference attributes of shape (references, attributes).
+    method : {"mean", "weighted_mean", "mode", "kth"}, default="mean"
+        The mean or inverse distance weighted mean of the neighbors, their most
+        common value, or the value of the k-th nearest neighbor.
+    dist : NDArray, optional
+        Neighbor distances of shape (samples, neighbors). Required for the
+        "weighted_mean" method.
+    kth : int, default=1
+        The 1-based rank of the neighbor used by the "kth" method.
+
+    Returns
+    -------
+    NDArray
+        Imputed attributes of shape (samples, attributes).
+    """
+    if method == "mean":
+        return neighbor_mean(ind, attributes)
+
+    if method == "weighted_mean":
+        if dist is None:
+            raise ValueError("Distances are required for the `weighted_mean` method.")
+
+        return neighbor_mean(
+            ind, attributes, weights=get_neighbor_weights(dist, "distance")
+        )
+
+    if method == "mode":
+        return neighbor_mode(ind, attributes)
+
+    if method == "kth":
+        return attributes[ind[:, kth - 1]]
+
+    raise ValueError(
+        f"Unknown imputation method `{method}`. Choose from {IMPUTE_METHODS}."
+    )
+
+
+def predict_from_neighbors(
+    estimator: BaseEstimator, ind: NDArray, dist: NDArray | None = None
+) -> NDArray:
+    """
+    Predict targets from neighbor indices with a fitted KNeighbors-style estimator.
+
+    Predictions are derived from the estimator's fitted targets `_y` using its
+    `weights`, matching the estimator's own `predict` method without repeating the
+    neighbor search.
+
+    Parameters
+    ----------
+    estimator : BaseEstimator
+        A fitted KNeighbors regressor or classifier.
+    ind : NDArray
+        Neighbor indices of shape (samples, neighbors).
+    dist : NDArray, optional
+        Neighbor distances of shape (samples, neighbors). Required if the estimator
+        uses non-uniform weights.
+
+    Returns
+    -------
+    NDArray
+        Predicted targets of shape (samples,) or (samples, targets).
+    """
+    weights = get_neighbor_weights(dist, getattr(estimator, "weights", "uniform"))
+    y = estimator._y.reshape(-1, 1) if estimator._y.ndim == 1 else estimator._y
+
+    if get_estimator_type(estimator) == "classifier":
+        # Classifiers store targets as encoded class indices
+        classes = estimator.classes_ if estimator._y.ndim > 1 else [estimator.classes_]
+        y_pred = np.stack(
+            [
+                classes_k.take(neighbor_mode(ind, y[:, [i]], weights=weights)[:, 0])
+                for i, classes_k in enumerate(classes)
+            ],
+            axis=1,
+        )
+    else:
+        y_pred = neighbor_mean(ind, y, weights=weights)
+
+    return y_pred.ravel() if estimator._y.ndim == 1 else y_pred
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import pickle
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import cloudpickle
+import numpy as np
+
+# Arrays smaller than this are pickled by value rather than placed in shared memory
+SHARED_MEMORY_MIN_BYTES = 2**16
+
+
+class _SharedMemoryPickler(cloudpickle.Pickler):
+    """A pickler that moves large Numpy arrays into shared memory blocks."""
+
+    def __init__(self, file: io.BytesIO, blocks: list[SharedMemory]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.blocks = blocks
+
+    def persistent_id(self, obj: Any) -> tuple | None:
+        if (
+            type(obj) is not np.ndarray
+            or obj.dtype.hasobject
+            or obj.nbytes < SHARED_MEMORY_MIN_BYTES
+        ):
+            return None
+
+        block = SharedMemory(create=True, size=obj.nbytes)
+        np.ndarray(obj.shape, dtype=obj.dtype, buffer=block.buf)[...] = obj
+        self.blocks.append(block)
+
+        return ("shared_memory", block.name, obj.shape, obj.dtype)
+
+
+class _SharedMemoryUnpickler(pickle.Unpickler):
+    """An unpickler that attaches to arrays placed in shared memory blocks."""
+
+    def __init__(self, file: io.BytesIO, blocks: list[SharedMemory]):
+        super().__init__(file)
+        self.blocks = blocks
+
+    def persistent_load(self, pid: tuple) -> np.ndarray:
+        _, name, shape, dtype = pid
+        block = _attach_shared_memory(name)
+        self.blocks.append(block)
+
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    """Attach to an existing shared memory block without taking ownership of it."""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Python < 3.13 always registers attached blocks with the resource tracker, which
+    # unlinks them when the attaching process exits, so registration is skipped.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def dumps_shared(obj: Any) -> tuple[bytes, list[SharedMemory]]:
+    """
+    Pickle an object by value, placing large Numpy arrays in shared memory.
+
+    The pickled bytes only reference the shared arrays, so they are cheap to send to
+    other processes, which attach to the arrays without copying them. The returned
+    shared memory blocks are owned by the caller and must be released with
+    `release_shared` once the object is no longer needed.
+    """
+    blocks: list[SharedMemory] = []
+    buffer = io.BytesIO()
+
+    try:
+        _SharedMemoryPickler(buffer, blocks).dump(obj)
+    except Exception:
+        release_shared(blocks)
+        raise
+
+    return buffer.getvalue(), blocks
+
+
+def loads_shared(payload: bytes) -> tuple[Any, list[SharedMemory]]:
+    """
+    Unpickle an object pickled by `dumps_shared`, attaching to its shared arrays.
+
+    The returned blocks back the object's arrays and must be kept open for as long as
+    the object is used.
+    """
+    blocks: list[SharedMemory] = []
+    obj = _SharedMemoryUnpickler(io.BytesIO(payload), blocks).load()
+
+    return obj, blocks
+
+
+def release_shared(blocks: list[SharedMemory], unlink: bool = True) -> None:
+    """
+    Close shared memory blocks, and unlink them so their memory is freed once every
+    process has closed them.
+    """
+    for block in blocks:
+        # Blocks that still back arrays can't be closed, but are closed once the
+        # arrays are garbage collected.
+        with contextlib.suppress(BufferError):
+            block.close()
+
+        if unlink:
+            block.unlink()
@@ -1,8 +1,11 @@
 import numpy as np
 import pytest
+from sklearn.neighbors import KNeighborsRegressor
 
+from sknnr_spatial import wrap
 
-@pytest.fixture()
+
+@pytest.fixture
 def dummy_model_data():
     n_features = 5
     n_rows = 10
@@ -12,3 +15,14 @@ def dummy_model_data():
     y = np.random.rand(n_rows, 3)
 
     return X_image, X, y
+
+
+@pytest.fixture
+def estimator_and_image():
+    """A fitted estimator and a (band, y, x) image with NoData in its top rows."""
+    rng = np.random.default_rng(0)
+    X, y = rng.random((20, 3)), rng.random((20, 2))
+    image = rng.random((3, 32, 32))
+    image[:, :8, :] = np.nan
+
+    return wrap(KNeighborsRegressor()).fit(X, y), image
@@ -0,0 +1,118 @@
+"""Tests for the on-disk chunk cache."""
+
+import os
+import pickle
+from unittest import mock
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from sknnr_spatial.cache import ChunkCache
+from sknnr_spatial.image import Image
+
+
+def test_cache_roundtrip(tmp_path):
+    """Test that single and tuple results are returned as they were cached."""
+    cache = ChunkCache(tmp_path)
+    a = np.arange(12, dtype=np.float32).reshape(3, 4)
+    b = np.arange(3, dtype=np.int64)
+
+    assert cache.get("missing") is None
+
+    cache.set("single", a)
+    cache.set("tuple", (a, b))
+
+    assert_array_equal(cache.get("single"), a)
+    assert cache.get("single").dtype == a.dtype
+
+    result = cache.get("tuple")
+    assert isinstance(result, tuple)
+    assert_array_equal(result[0], a)
+    assert_array_equal(result[1], b)
+
+
+def test_cache_key_depends_on_job_and_chunk():
+    """Test that keys change with the job and the chunk contents only."""
+    chunk = np.ones((4, 3))
+
+    assert ChunkCache.get_key("job", chunk) == ChunkCache.get_key("job", chunk.copy())
+    assert ChunkCache.get_key("job", chunk) != ChunkCache.get_key("other", chunk)
+    assert ChunkCache.get_key("job", chunk) != ChunkCache.get_key("job", chunk * 2)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that the least recently used entries are evicted to fit the size limit."""
+    cache = ChunkCache(tmp_path)
+    chunk = np.zeros(1_000)
+
+    for i, key in enumerate(["a", "b"]):
+        cache.set(key, chunk)
+        os.utime(cache._get_path(key), (i, i))
+
+    # Reading "a" makes "b" the least recently used entry
+    cache.get("a")
+    cache.max_size = cache.size
+    cache.set("c", chunk)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
+
+
+def test_cache_tracks_size_without_rescanning(tmp_path):
+    """Test that writes and evictions don't rescan the cache directory."""
+    cache = ChunkCache(tmp_path)
+    chunk = np.zeros(1_000)
+    cache.set("first", chunk)
+    cache.max_size = cache.size * 5
+
+    with mock.patch.object(ChunkCache, "_scan", wraps=cache._scan) as scan:
+        for i in range(50):
+            cache.set(str(i), chunk)
+            cache.get(str(i))
+
+    scan.assert_not_called()
+    entries = list(tmp_path.glob("*.npz"))
+    assert len(entries) == 5
+    assert cache.size == sum(path.stat().st_size for path in entries)
+    assert cache.get("49") is not None
+
+
+def test_cache_rescans_entries_from_other_processes(tmp_path):
+    """Test that entries written by other caches are evicted once rescanned."""
+    cache = ChunkCache(tmp_path)
+    other = pickle.loads(pickle.dumps(cache))
+    chunk = np.zeros(1_000)
+    cache.set("a", chunk)
+    cache.max_size = cache.size * 2
+
+    other.set("b", chunk)
+    os.utime(other._get_path("b"), (0, 0))
+    with mock.patch("sknnr_spatial.cache.RESCAN_INTERVAL", 0.0):
+        cache.set("c", chunk)
+        cache.set("d", chunk)
+
+    # The other cache's entry is the least recently used once it's known
+    assert other.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.get("d") is not None
+    assert cache.size == cache.max_size
+
+
+def test_cache_requires_key(tmp_path):
+    """Test that caching chunks of an image requires a key for the job."""
+    image = Image.from_image(np.ones((2, 4, 4)))
+
+    with pytest.raises(ValueError, match="A `cache_key` is required"):
+        image.apply_ufunc_across_bands(
+            lambda x: x,
+            output_dims=[["variable"]],
+            output_sizes={"variable": 2},
+            output_dtypes=[float],
+            cache=ChunkCache(tmp_path),
+        )
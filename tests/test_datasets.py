@@ -11,10 +11,10 @@ from unittest import mock
 import numpy as np
 import pytest
 import rasterio
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
 from typing_extensions import Any
 
-from sknnr_spatial.datasets import load_swo_ecoplot
+from sknnr_spatial.datasets import load_swo_ecoplot, make_synthetic_image
 from sknnr_spatial.datasets._base import _load_rasters_to_array
 
 
@@ -131,3 +131,89 @@ def test_load_rasters_promotes_dtype():
     assert array.dtype == np.float32
     # Allow for small floating point errors during writing/reading
     assert_array_almost_equal(array, expected_array)
+
+
+@pytest.mark.parametrize("as_dataset", [False, True], ids=["as_array", "as_dataset"])
+def test_synthetic_image_is_lazy(as_dataset: bool):
+    """Test that large synthetic images are generated lazily with matching plots."""
+    X_image, X, y = make_synthetic_image(
+        (50_000, 40_000), n_bands=5, n_targets=2, chunks=2048, as_dataset=as_dataset
+    )
+
+    assert X.shape == (1000, 5)
+    assert y.shape == (1000, 2)
+
+    if as_dataset:
+        assert list(X.columns) == list(X_image.data_vars)
+        assert X_image.sizes == {"y": 50_000, "x": 40_000}
+        assert X_image.chunksizes["x"][0] == 2048
+    else:
+        assert list(X.columns) == list(X_image["variable"].values)
+        assert X_image.shape == (5, 50_000, 40_000)
+        assert X_image.chunks[1][0] == 2048
+
+
+def test_synthetic_image_is_deterministic():
+    """Test that synthetic images don't depend on chunking and match their seed."""
+    kwargs = dict(nodata_fraction=0.1, duplicate_fraction=0.1, random_state=0)
+    image, X, _ = make_synthetic_image((100, 100), chunks=100, **kwargs)
+    rechunked, rechunked_X, _ = make_synthetic_image((100, 100), chunks=32, **kwargs)
+
+    assert_array_equal(image.values, rechunked.values)
+    assert_array_equal(X, rechunked_X)
+    assert not np.array_equal(
+        image.values,
+        make_synthetic_image((100, 100), chunks=100, random_state=1)[0].values,
+        equal_nan=True,
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.int16, np.uint16, np.int8, np.uint8])
+def test_synthetic_image_fractions(dtype):
+    """Test that NoData and duplicated pixels are generated at the requested rates."""
+    X_image, X, _ = make_synthetic_image(
+        (256, 256),
+        dtype=dtype,
+        nodata_fraction=0.2,
+        duplicate_fraction=0.3,
+        random_state=0,
+    )
+    nodata = X_image.attrs["_FillValue"]
+    pixels = X_image.values.reshape(X_image.shape[0], -1).T
+
+    assert pixels.dtype == dtype
+    is_nodata = np.isnan(pixels[:, 0]) if np.isnan(nodata) else pixels[:, 0] == nodata
+    assert is_nodata.mean() == pytest.approx(0.2, abs=0.01)
+
+    # Valid pixels are either smoothly varying or copied from a plot
+    valid = pixels[~is_nodata]
+    is_duplicate = (valid[:, None, :] == X.values[None, :, :]).all(axis=-1).any(axis=1)
+    assert is_duplicate.mean() == pytest.approx(0.3, abs=0.02)
+
+    # Integer values never wrap or reach the NoData value, including plot features
+    if np.dtype(dtype).kind in "iu":
+        assert valid.min() >= 0
+        assert X.values.min() >= 0
+        assert (valid != nodata).all()
+        assert (X.values != nodata).all()
+
+
+def test_synthetic_image_autocorrelation():
+    """Test that neighboring pixels are more similar with a longer correlation range."""
+
+    def get_neighbor_correlation(correlation_range):
+        X_image, _, _ = make_synthetic_image(
+            (128, 128), correlation_range=correlation_range, random_state=0
+        )
+        band = X_image.values[0]
+        return np.corrcoef(band[:, :-1].ravel(), band[:, 1:].ravel())[0, 1]
+
+    assert abs(get_neighbor_correlation(1)) < 0.05
+    assert get_neighbor_correlation(32) > 0.9
+
+
+@pytest.mark.parametrize("fraction", ["nodata_fraction", "duplicate_fraction"])
+def test_synthetic_image_validates_fractions(fraction):
+    """Test that fractions outside of [0, 1] are rejected."""
+    with pytest.raises(ValueError, match=f"`{fraction}` must be between 0 and 1"):
+        make_synthetic_image((10, 10), **{fraction: 1.5})
@@ -1,18 +1,29 @@
 """Tests for wrapped estimators."""
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+import cloudpickle
 import numpy as np
 import pandas as pd
 import pytest
 import xarray as xr
-from numpy.testing import assert_array_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
 from sklearn.base import clone
 from sklearn.cluster import AffinityPropagation, KMeans, MeanShift
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.neighbors import KNeighborsRegressor, NearestNeighbors
+from sklearn.neighbors import (
+    KNeighborsClassifier,
+    KNeighborsRegressor,
+    NearestNeighbors,
+)
 from sklearn.utils.validation import NotFittedError
+from sknnr import EuclideanKNNRegressor
 
 from sknnr_spatial import wrap
+from sknnr_spatial.cache import ChunkCache
 from sknnr_spatial.estimator import is_fitted
+from sknnr_spatial.search import IVFKNN, BruteForceKNN, CoherentKNN
 
 from .image_utils import ModelData, parametrize_model_data, unwrap_image
 
@@ -305,3 +316,756 @@ def test_wrapper_is_fitted(dummy_model_data):
     estimator = estimator.fit(X, y)
     assert is_fitted(estimator._wrapped)
     assert is_fitted(estimator)
+
+
+@parametrize_model_data()
+def test_skip_nodata_matches_masked(model_data: ModelData):
+    """Test that skipping NoData pixels doesn't change predictions or neighbors."""
+    X_image = np.random.rand(5, 8, 16)
+    X_image[:, :4, :] = -1
+    X_image[2, 6, 3] = np.nan
+    X_image, X, y = model_data.set(X_image=X_image)
+
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    y_pred = unwrap_image(estimator.predict(X_image, nodata_vals=-1))
+    y_pred_skipped = unwrap_image(
+        estimator.predict(X_image, nodata_vals=-1, skip_nodata=True)
+    )
+    assert_array_equal(y_pred, y_pred_skipped)
+
+    dist, nn = estimator.kneighbors(X_image, nodata_vals=-1)
+    dist_skipped, nn_skipped = estimator.kneighbors(
+        X_image, nodata_vals=-1, skip_nodata=True
+    )
+    assert_array_equal(unwrap_image(dist), unwrap_image(dist_skipped))
+    assert_array_equal(unwrap_image(nn), unwrap_image(nn_skipped))
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+def test_predict_memmap(model_data: ModelData, tmp_path):
+    """Test that memory-mapped images predict the same as in-memory arrays."""
+    X_image, X, y = model_data
+    memmap = np.memmap(
+        tmp_path / "image.dat", dtype=X_image.dtype, shape=X_image.shape, mode="w+"
+    )
+    memmap[:] = X_image
+
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    assert_array_equal(estimator.predict(memmap), estimator.predict(X_image))
+
+
+@parametrize_model_data()
+def test_float32_dtype(model_data: ModelData):
+    """Test that float32 predictions and distances are returned when requested."""
+    X_image, X, y = model_data
+
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    y_pred = unwrap_image(estimator.predict(X_image))
+    y_pred_32 = unwrap_image(estimator.predict(X_image, dtype=np.float32))
+    dist_32, nn_32 = estimator.kneighbors(X_image, dtype=np.float32)
+    dist_32 = unwrap_image(dist_32)
+
+    assert y_pred_32.dtype == np.float32
+    assert dist_32.dtype == np.float32
+    assert_array_almost_equal(y_pred, y_pred_32, decimal=5)
+
+
+@parametrize_model_data()
+def test_classifier_nodata_stays_integer(model_data: ModelData):
+    """Test that masked classifier predictions and neighbors stay integer."""
+    X_image = np.random.rand(5, 8, 16)
+    X_image[:, 0, 0] = -1
+    X_image, X, y = model_data.set(X_image=X_image, single_output=True, squeeze=True)
+    y = (np.asarray(y) * 3).astype(int)
+
+    estimator = wrap(KNeighborsClassifier()).fit(X, y)
+
+    y_pred = unwrap_image(estimator.predict(X_image, nodata_vals=-1, output_nodata=-1))
+    nn = unwrap_image(
+        estimator.kneighbors(X_image, nodata_vals=-1, return_distance=False)
+    )
+
+    assert y_pred.dtype == np.int32
+    assert (y_pred[:, 0, 0] == -1).all()
+    assert (y_pred[:, 1:, 1:] >= 0).all()
+
+    assert nn.dtype.kind == "u"
+    assert (nn[:, 0, 0] == np.iinfo(nn.dtype).max).all()
+
+
+@parametrize_model_data()
+def test_classifier_float_labels_masked_with_nan(model_data: ModelData):
+    """Test that classifiers fit on float labels declare and fill float outputs."""
+    X_image = np.random.rand(5, 8, 16)
+    X_image[:, 0, 0] = -1
+    X_image, X, y = model_data.set(X_image=X_image, single_output=True, squeeze=True)
+    y = np.floor(np.asarray(y) * 3)
+
+    estimator = wrap(KNeighborsClassifier()).fit(X, y)
+    y_pred = estimator.predict(X_image, nodata_vals=-1)
+
+    outputs = (
+        list(y_pred.data_vars.values()) if isinstance(y_pred, xr.Dataset) else [y_pred]
+    )
+    for output in outputs:
+        assert output.dtype == np.float64
+        if isinstance(output, xr.DataArray):
+            assert np.isnan(output.attrs["_FillValue"])
+
+    y_pred = unwrap_image(y_pred)
+    assert y_pred.dtype == np.float64
+    assert np.isnan(y_pred[:, 0, 0]).all()
+    assert np.isin(y_pred[:, 1:, 1:], estimator.classes_).all()
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize(
+    ("n_samples", "output_nodata", "index_dtype", "expected_dtype"),
+    [
+        (10, None, None, np.uint8),
+        (255, None, None, np.uint8),
+        (256, None, None, np.uint16),
+        (3005, None, None, np.uint16),
+        (10, -1, None, np.int16),
+        (10, None, np.int64, np.int64),
+    ],
+)
+def test_kneighbors_index_dtype(
+    model_data: ModelData, n_samples, output_nodata, index_dtype, expected_dtype
+):
+    """Test that neighbor indices use the smallest sufficient or requested dtype."""
+    X_image, X, y = model_data.set(
+        X=np.random.rand(n_samples, 5), y=np.random.rand(n_samples, 3)
+    )
+
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    nn = estimator.kneighbors(
+        X_image,
+        return_distance=False,
+        output_nodata=output_nodata,
+        index_dtype=index_dtype,
+    )
+
+    nn = unwrap_image(nn)
+    assert nn.dtype == expected_dtype
+    assert nn.max() < n_samples
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+@pytest.mark.parametrize(
+    ("output_nodata", "index_dtype", "match"),
+    [
+        (0, None, "is a valid index"),
+        (None, np.uint8, "can store 1000 samples"),
+        (None, np.float32, "must be an integer type"),
+    ],
+)
+def test_kneighbors_index_dtype_raises(
+    model_data: ModelData, output_nodata, index_dtype, match
+):
+    """Test that unusable index dtypes and NoData values are rejected."""
+    X_image, X, y = model_data.set(X=np.random.rand(1000, 5), y=np.random.rand(1000, 3))
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    with pytest.raises(ValueError, match=match):
+        estimator.kneighbors(
+            X_image, output_nodata=output_nodata, index_dtype=index_dtype
+        )
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize(
+    ("method", "weights"), [("mean", "uniform"), ("weighted_mean", "distance")]
+)
+def test_impute_mean_matches_predict(model_data: ModelData, method, weights):
+    """Test that imputing means of the fitted targets matches regressor predictions."""
+    X_image, X, y = model_data
+
+    estimator = wrap(KNeighborsRegressor(weights=weights)).fit(X, y)
+
+    y_pred = unwrap_image(estimator.predict(X_image))
+    y_imputed = estimator.impute(X_image, y, method=method)
+
+    assert_array_almost_equal(unwrap_image(y_imputed), y_pred)
+    if isinstance(y_imputed, xr.DataArray):
+        assert list(y_imputed["variable"].values) == list(y.columns)
+    elif isinstance(y_imputed, xr.Dataset):
+        assert list(y_imputed.data_vars) == list(y.columns)
+
+
+@parametrize_model_data()
+def test_impute_mode_matches_classifier(model_data: ModelData):
+    """Test that imputing the mode of integer attributes matches a classifier."""
+    X_image, X, _ = model_data
+    y = np.random.randint(0, 3, size=(X.shape[0],))
+
+    estimator = wrap(KNeighborsClassifier()).fit(X, y)
+
+    y_pred = unwrap_image(estimator.predict(X_image))
+    y_imputed = unwrap_image(estimator.impute(X_image, y, method="mode"))
+
+    assert y_imputed.dtype == y.dtype
+    assert_array_equal(y_imputed, y_pred)
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize("kth", [1, 3])
+def test_impute_kth(model_data: ModelData, kth):
+    """Test that imputing the k-th neighbor returns its attributes."""
+    X_image, X, y = model_data
+
+    estimator = wrap(KNeighborsRegressor(n_neighbors=3)).fit(X, y)
+
+    nn = unwrap_image(estimator.kneighbors(X_image, return_distance=False))
+    y_imputed = unwrap_image(estimator.impute(X_image, y, method="kth", kth=kth))
+
+    expected = np.asarray(y)[nn[kth - 1]]
+    assert_array_equal(y_imputed, np.moveaxis(expected, -1, 0))
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize("method", ["mean", "weighted_mean", "mode", "kth"])
+def test_impute_from_neighbors_matches_impute(model_data: ModelData, method):
+    """Test that imputing from precomputed neighbors matches imputing directly."""
+    X_image = np.random.rand(5, 8, 16)
+    X_image[:, 0, :3] = -1
+    X_image, X, y = model_data.set(X_image=X_image)
+
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    dist, nn = estimator.kneighbors(X_image, nodata_vals=-1)
+    expected = estimator.impute(X_image, y, method=method, nodata_vals=-1)
+    imputed = estimator.impute_from_neighbors(nn, y, distances=dist, method=method)
+    assert_array_almost_equal(unwrap_image(imputed), unwrap_image(expected))
+
+    # NoData in the neighbor indices should be detected without distances
+    if method != "weighted_mean":
+        imputed = estimator.impute_from_neighbors(nn, y, method=method)
+        assert_array_almost_equal(unwrap_image(imputed), unwrap_image(expected))
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+@pytest.mark.parametrize(
+    ("kwargs", "match"),
+    [
+        ({"method": "median"}, "Unknown imputation method"),
+        ({"method": "kth", "kth": 6}, "must be between 1 and 5"),
+        ({"attributes": np.ones((3, 2))}, "Expected attributes for 10 samples"),
+        ({"attributes": np.array(["a"] * 10)}, "Attributes must be numeric"),
+    ],
+)
+def test_impute_validates(model_data: ModelData, kwargs, match):
+    """Test that invalid imputation arguments are rejected."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    kwargs = {"attributes": y, **kwargs}
+    with pytest.raises((ValueError, TypeError), match=match):
+        estimator.impute(X_image, **kwargs)
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize("weights", ["uniform", "distance"])
+@pytest.mark.parametrize("estimator", [KNeighborsRegressor, KNeighborsClassifier])
+def test_predict_with_neighbors_matches_separate(
+    model_data: ModelData, estimator, weights
+):
+    """Test that fused predictions and neighbors match separate calls."""
+    X_image, X, y = model_data
+    if estimator is KNeighborsClassifier:
+        y = np.random.randint(0, 3, size=y.shape)
+
+    estimator = wrap(estimator(n_neighbors=3, weights=weights)).fit(X, y)
+
+    y_pred, dist, nn = estimator.predict_with_neighbors(X_image)
+    expected_dist, expected_nn = estimator.kneighbors(X_image)
+
+    assert_array_almost_equal(
+        unwrap_image(y_pred), unwrap_image(estimator.predict(X_image))
+    )
+    assert_array_almost_equal(unwrap_image(dist), unwrap_image(expected_dist))
+    assert_array_equal(unwrap_image(nn), unwrap_image(expected_nn))
+
+
+def test_neighbor_predictions_reject_estimator_kwargs(dummy_model_data):
+    """Test that arguments for the estimator aren't dropped by neighbor searches."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    searched = wrap(KNeighborsRegressor(), search=BruteForceKNN()).fit(X, y)
+
+    with pytest.raises(ValueError, match="predicting from neighbors"):
+        estimator.predict(X_image, n_neighbors=3, extra=True)
+    with pytest.raises(ValueError, match="predicting from neighbors"):
+        searched.predict(X_image, extra=True)
+    with pytest.raises(ValueError, match="used with a neighbor search"):
+        searched.kneighbors(X_image, extra=True)
+
+
+def test_predict_with_neighbors_raises_unsupported(dummy_model_data):
+    """Test that estimators without fitted neighbors cannot predict from them."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(RandomForestRegressor()).fit(X, y)
+
+    with pytest.raises(NotImplementedError, match="predicting from neighbors"):
+        estimator.predict_with_neighbors(X_image)
+
+
+@parametrize_model_data()
+@pytest.mark.parametrize("estimator", [KNeighborsRegressor, KNeighborsClassifier])
+def test_predict_multiple_n_neighbors(model_data: ModelData, estimator):
+    """Test that predicting for several k matches predicting at each k separately."""
+    X_image, X, y = model_data
+    if estimator is KNeighborsClassifier:
+        y = np.random.randint(0, 3, size=y.shape)
+    ks = [1, 3, 5]
+
+    estimator_k = wrap(estimator(weights="distance")).fit(X, y)
+    y_pred = estimator_k.predict(X_image, n_neighbors=ks)
+
+    for i, k in enumerate(ks):
+        expected = wrap(estimator(n_neighbors=k, weights="distance")).fit(X, y)
+        expected = unwrap_image(expected.predict(X_image))
+
+        if isinstance(y_pred, np.ndarray):
+            assert y_pred.shape == (y.shape[1], len(ks), *X_image.shape[1:])
+            assert_array_almost_equal(y_pred[:, i], expected)
+        elif isinstance(y_pred, xr.DataArray):
+            assert y_pred.dims == ("variable", "n_neighbors", "y", "x")
+            assert list(y_pred["n_neighbors"].values) == ks
+            assert_array_almost_equal(y_pred.sel(n_neighbors=k), expected)
+        else:
+            assert y_pred[next(iter(y_pred.data_vars))].dims == (
+                "n_neighbors",
+                "y",
+                "x",
+            )
+            assert_array_almost_equal(
+                y_pred.sel(n_neighbors=k).to_dataarray(), expected
+            )
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+def test_predict_single_n_neighbors(model_data: ModelData):
+    """Test that predicting for a single k keeps the output dimensions."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    y_pred = estimator.predict(X_image, n_neighbors=3)
+    expected = wrap(KNeighborsRegressor(n_neighbors=3)).fit(X, y).predict(X_image)
+
+    assert_array_almost_equal(y_pred, expected)
+
+
+@pytest.mark.parametrize("n_neighbors", [[], [0, 1], [11]])
+def test_predict_n_neighbors_validates(dummy_model_data, n_neighbors):
+    """Test that numbers of neighbors outside the fitted samples are rejected."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    with pytest.raises(ValueError, match="must be between 1 and 10"):
+        estimator.predict(X_image, n_neighbors=n_neighbors)
+
+
+@parametrize_model_data(image_types=(np.ndarray, xr.DataArray))
+@pytest.mark.parametrize(
+    "batch_kwargs", [{"max_pixels_per_batch": 7}, {"memory_limit": "1kB"}]
+)
+def test_batched_pixels_match_unbatched(model_data: ModelData, batch_kwargs):
+    """Test that splitting chunks into batches of pixels doesn't change the output."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    expected_dist, expected_nn = estimator.kneighbors(X_image, return_distance=True)
+    dist, nn = estimator.kneighbors(X_image, return_distance=True, **batch_kwargs)
+
+    assert_array_equal(unwrap_image(dist), unwrap_image(expected_dist))
+    assert_array_equal(unwrap_image(nn), unwrap_image(expected_nn))
+    assert_array_equal(
+        unwrap_image(estimator.predict(X_image, **batch_kwargs)),
+        unwrap_image(estimator.predict(X_image)),
+    )
+
+
+@parametrize_model_data(
+    X_image=np.random.randint(0, 3, size=(5, 8, 16)).astype(float),
+    image_types=(np.ndarray, xr.DataArray),
+)
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_deduplicated_pixels_match_unique(model_data: ModelData, skip_nodata):
+    """Test that only predicting unique pixels doesn't change the output."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    kwargs = dict(nodata_vals=0, skip_nodata=skip_nodata)
+
+    expected_dist, expected_nn = estimator.kneighbors(X_image, **kwargs)
+    dist, nn = estimator.kneighbors(X_image, deduplicate=True, **kwargs)
+
+    assert_array_equal(unwrap_image(dist), unwrap_image(expected_dist))
+    assert_array_equal(unwrap_image(nn), unwrap_image(expected_nn))
+    assert_array_equal(
+        unwrap_image(estimator.predict(X_image, deduplicate=True, **kwargs)),
+        unwrap_image(estimator.predict(X_image, **kwargs)),
+    )
+
+
+@parametrize_model_data(image_types=(np.ndarray, xr.DataArray))
+def test_cached_chunks_skip_estimator(model_data: ModelData, tmp_path):
+    """Test that cached chunks are reused without calling the estimator again."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    cache = ChunkCache(tmp_path)
+
+    expected = unwrap_image(estimator.predict(X_image))
+    assert_array_equal(unwrap_image(estimator.predict(X_image, cache=cache)), expected)
+    assert cache.size > 0
+
+    with mock.patch.object(
+        KNeighborsRegressor, "predict", side_effect=AssertionError
+    ) as predict:
+        y_pred = unwrap_image(estimator.predict(X_image, cache=cache))
+        predict.assert_not_called()
+
+    assert_array_equal(y_pred, expected)
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+def test_cache_keys_depend_on_options(model_data: ModelData, tmp_path):
+    """Test that options that change results are cached separately."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    cache = ChunkCache(tmp_path)
+
+    dist, nn = estimator.kneighbors(X_image, n_neighbors=3, cache=cache)
+    dist5, nn5 = estimator.kneighbors(X_image, n_neighbors=5, cache=cache)
+    assert nn.shape[0] == 3
+    assert nn5.shape[0] == 5
+
+    # Options that don't change results share cached chunks
+    n_entries = len(list(tmp_path.iterdir()))
+    estimator.kneighbors(X_image, n_neighbors=3, deduplicate=True, cache=cache)
+    assert len(list(tmp_path.iterdir())) == n_entries
+
+    # Refitting changes the estimator, so nothing is shared
+    estimator.fit(X, y * 2)
+    estimator.kneighbors(X_image, n_neighbors=3, cache=cache)
+    assert len(list(tmp_path.iterdir())) > n_entries
+
+
+def test_memory_limit_sets_max_pixels_per_batch(dummy_model_data):
+    """Test that the memory limit is divided by the distances stored per pixel."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    # Each pixel stores 10 float64 distances
+    assert estimator._get_max_pixels_per_batch(memory_limit="1kB") == 12
+    assert estimator._get_max_pixels_per_batch(memory_limit=1) == 1
+    assert estimator._get_max_pixels_per_batch(5, memory_limit="1kB") == 5
+    assert estimator._get_max_pixels_per_batch() is None
+
+
+@parametrize_model_data()
+def test_chunk_memory_matches_unplanned(model_data: ModelData):
+    """Test that planning chunks from a memory budget doesn't change the output."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    expected = unwrap_image(estimator.predict(X_image))
+    y_pred = unwrap_image(estimator.predict(X_image, chunk_memory="256kB"))
+
+    assert_array_almost_equal(y_pred, expected)
+
+
+@parametrize_model_data(image_types=(np.ndarray,))
+@pytest.mark.parametrize("executor_type", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_executor_matches_serial(model_data: ModelData, executor_type):
+    """Test that predicting Numpy images with an executor matches serial prediction."""
+    X_image, X, y = model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    with executor_type(max_workers=2) as executor:
+        y_pred = estimator.predict(X_image, executor=executor, chunk_memory="2MB")
+        dist, nn = estimator.kneighbors(
+            X_image, return_distance=True, executor=executor, chunk_memory="2MB"
+        )
+
+    expected_dist, expected_nn = estimator.kneighbors(X_image, return_distance=True)
+    assert_array_almost_equal(y_pred, estimator.predict(X_image))
+    assert_array_almost_equal(dist, expected_dist)
+    assert_array_equal(nn, expected_nn)
+
+
+def test_estimator_registered_once_in_graph():
+    """Test that chunk tasks reference the estimator rather than embedding it."""
+    X = np.random.rand(5_000, 3)
+    y = np.random.rand(5_000)
+    X_image = xr.DataArray(np.random.rand(3, 40, 50), dims=["band", "y", "x"])
+    X_image = X_image.chunk({"band": -1, "y": 10, "x": 10})
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    estimator_size = len(cloudpickle.dumps(estimator))
+
+    y_pred = estimator.predict(X_image)
+    task_sizes = [
+        len(cloudpickle.dumps(task)) for task in dict(y_pred.__dask_graph__()).values()
+    ]
+
+    # Only one task holds the estimator, so the graph doesn't grow with chunks
+    assert X_image.data.npartitions == 20
+    assert sum(size > estimator_size / 2 for size in task_sizes) == 1
+    assert sum(task_sizes) < 2 * estimator_size
+    assert_array_almost_equal(y_pred.values, estimator.predict(X_image.values))
+
+
+@pytest.mark.parametrize("search_type", [BruteForceKNN, CoherentKNN])
+@pytest.mark.parametrize(
+    "estimator", [KNeighborsRegressor, KNeighborsClassifier, EuclideanKNNRegressor]
+)
+def test_exact_search_matches_estimator(estimator, search_type):
+    """Test that exact neighbor searches match the estimator's own search."""
+    X = np.random.rand(50, 4)
+    y = np.random.randint(0, 3, size=(50, 2))
+    X_image = np.random.rand(4, 8, 10)
+    X_flat = X_image.reshape(4, -1).T
+
+    wrapped = estimator(n_neighbors=5).fit(X, y)
+    image_estimator = wrap(estimator(n_neighbors=5), search=search_type()).fit(X, y)
+    dist, ind = image_estimator.kneighbors(X_image)
+    expected_dist, expected_ind = wrapped.kneighbors(X_flat)
+
+    assert_array_almost_equal(dist.reshape(5, -1).T, expected_dist)
+    assert_array_equal(ind.reshape(5, -1).T, expected_ind)
+    search = image_estimator._search
+    with mock.patch.object(search, "kneighbors", wraps=search.kneighbors) as spy:
+        y_pred = image_estimator.predict(X_image)
+
+    spy.assert_called()
+    assert_array_almost_equal(y_pred.reshape(2, -1).T, wrapped.predict(X_flat))
+
+
+@pytest.mark.parametrize(
+    "search",
+    [BruteForceKNN(), CoherentKNN(), IVFKNN(n_lists=5, n_probe=5)],
+    ids=["BruteForceKNN", "CoherentKNN", "IVFKNN"],
+)
+def test_search_keeps_float32_queries(search):
+    """Test that float32 queries are searched in float32 against one sample cast."""
+    rng = np.random.default_rng(0)
+    X, y = rng.random((50, 4)), rng.random(50)
+    queries = rng.random((80, 4)).astype(np.float32)
+    search.fit(KNeighborsRegressor().fit(X, y))
+
+    dist, ind = search.kneighbors(queries, 5)
+    expected_dist, expected_ind = search.kneighbors(queries.astype(np.float64), 5)
+    search.kneighbors(queries, 5)
+
+    assert dist.dtype == np.float32
+    assert search.X.dtype == np.float64
+    assert_array_almost_equal(dist, expected_dist, decimal=5)
+    assert_array_equal(ind, expected_ind)
+    assert {dtype for _, dtype in search._casts} == {np.dtype(np.float32)}
+
+
+def test_coherent_search_reuses_anchor_candidates():
+    """Test that smooth images are mostly searched among their anchors' candidates."""
+    X, y = np.random.rand(500, 3), np.random.rand(500)
+    rows, cols = np.mgrid[0:32, 0:32] / 32
+    X_image = np.stack([rows, cols, (rows + cols) / 2]) * 0.8 + 0.1
+    search = CoherentKNN(stride=4, n_candidates=30)
+    estimator = wrap(KNeighborsRegressor(), search=search).fit(X, y)
+
+    with mock.patch.object(
+        BruteForceKNN,
+        "_kneighbors",
+        autospec=True,
+        side_effect=BruteForceKNN._kneighbors,
+    ) as full_search:
+        dist, ind = estimator.kneighbors(X_image)
+
+    expected_dist, expected_ind = estimator._wrapped.kneighbors(
+        X_image.reshape(3, -1).T
+    )
+    assert_array_almost_equal(dist.reshape(5, -1).T, expected_dist)
+    assert_array_equal(ind.reshape(5, -1).T, expected_ind)
+
+    # Anchors are always searched, and most other pixels satisfy the bound
+    n_searched = sum(len(call.args[1]) for call in full_search.call_args_list)
+    assert n_searched < X_image[0].size / 3
+
+
+@pytest.mark.parametrize(
+    "options", [{"deduplicate": True}, {"max_pixels_per_batch": 100}], ids=str
+)
+def test_coherent_search_keeps_pixel_order(options):
+    """Test that deduplicating and batching keep pixels in row-major order."""
+    X, y = np.random.rand(500, 3), np.random.rand(500)
+    rows, cols = np.mgrid[0:32, 0:32] / 32
+    # Sorting these pixels by value would separate spatially adjacent pixels
+    X_image = np.stack([np.sin(rows * 6 + cols * 3) / 2 + 0.5, cols, rows]) * 0.8 + 0.1
+    search = CoherentKNN(stride=4, n_candidates=30)
+    estimator = wrap(KNeighborsRegressor(), search=search).fit(X, y)
+
+    n_searched = []
+    for kwargs in [{}, options]:
+        with mock.patch.object(
+            BruteForceKNN,
+            "_kneighbors",
+            autospec=True,
+            side_effect=BruteForceKNN._kneighbors,
+        ) as full_search:
+            estimator.kneighbors(X_image, **kwargs)
+
+        n_searched.append(sum(len(c.args[1]) for c in full_search.call_args_list))
+
+    assert n_searched[1] == n_searched[0] < X_image[0].size / 2
+
+
+def test_search_requires_euclidean_estimator():
+    """Test that searches can't be fit to estimators with other metrics."""
+    X, y = np.random.rand(50, 4), np.random.rand(50)
+    estimator = wrap(KNeighborsRegressor(metric="manhattan"), search=BruteForceKNN())
+
+    with pytest.raises(ValueError, match="Euclidean metric"):
+        estimator.fit(X, y)
+
+
+def test_ivf_search_is_exact_when_probing_all_lists():
+    """Test that an IVF search that probes every cluster matches an exact search."""
+    X, y = np.random.rand(200, 4), np.random.rand(200)
+    X_image = np.random.rand(4, 8, 10)
+    search = IVFKNN(n_lists=10, n_probe=10, random_state=0)
+    estimator = wrap(KNeighborsRegressor(), search=search).fit(X, y)
+
+    dist, ind = estimator.kneighbors(X_image)
+    expected_dist, expected_ind = estimator._wrapped.kneighbors(
+        X_image.reshape(4, -1).T
+    )
+
+    assert_array_almost_equal(dist.reshape(5, -1).T, expected_dist)
+    assert_array_equal(ind.reshape(5, -1).T, expected_ind)
+    assert estimator.measure_recall(X_image, window_size=(4, 4)) == 1.0
+
+
+def test_ivf_search_recall_increases_with_probes():
+    """Test that probing more clusters trades speed for recall."""
+    X, y = np.random.rand(2_000, 6), np.random.rand(2_000)
+    X_image = xr.DataArray(np.random.rand(6, 64, 64)).chunk()
+    search = IVFKNN(n_lists=40, n_probe=1, random_state=0)
+    estimator = wrap(KNeighborsRegressor(), search=search).fit(X, y)
+
+    recalls = []
+    for n_probe in [1, 4, 40]:
+        search.n_probe = n_probe
+        recalls.append(estimator.measure_recall(X_image, random_state=0))
+
+    assert recalls[0] < recalls[1] < recalls[2] == 1.0
+
+
+def test_measure_recall_requires_search(dummy_model_data):
+    """Test that recall can't be measured without a neighbor search."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    with pytest.raises(ValueError, match="requires a neighbor search"):
+        estimator.measure_recall(X_image)
+
+
+@pytest.mark.parametrize("method_name", ["predict", "kneighbors"])
+def test_estimate_samples_chunks(method_name):
+    """Test that estimates describe the full output but only process sampled chunks."""
+    rng = np.random.default_rng(0)
+    X, y = rng.random((20, 3)), rng.random((20, 2))
+    X_image = xr.DataArray(rng.random((3, 64, 64)), dims=["variable", "y", "x"]).chunk(
+        {"y": 16, "x": 32}
+    )
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    expected = getattr(estimator, method_name)(X_image)
+    expected_nbytes = sum(
+        output.nbytes
+        for output in (expected if isinstance(expected, tuple) else (expected,))
+    )
+
+    with mock.patch.object(
+        KNeighborsRegressor, "kneighbors", wraps=estimator._wrapped.kneighbors
+    ) as kneighbors:
+        estimate = estimator.estimate(
+            X_image, method_name=method_name, n_samples=2, random_state=0
+        )
+
+    assert estimate.n_tasks == 8
+    assert estimate.chunks == (16, 32)
+    assert estimate.n_sampled == 2
+    assert estimate.output_nbytes == expected_nbytes
+    assert estimate.runtime == pytest.approx(8 * estimate.task_runtime)
+    assert estimate.peak_memory > 0
+
+    # Each sampled chunk is processed once for runtime and once for memory, besides
+    # a single pixel used to check output dtypes while building the graph.
+    n_pixels = sum(
+        call.args[0].shape[0]
+        for call in kneighbors.call_args_list
+        if call.args[0].shape[0] > 1
+    )
+    assert n_pixels == 2 * 2 * 16 * 32
+
+
+def test_estimate_in_memory_tiles():
+    """Test that in-memory images are estimated in the tiles they're processed in."""
+    rng = np.random.default_rng(0)
+    X, y = rng.random((20, 3)), rng.random((20, 2))
+    X_image = rng.random((3, 1100, 600))
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    # Images processed in one task are sampled in smaller tiles
+    with mock.patch.object(
+        KNeighborsRegressor, "kneighbors", wraps=estimator._wrapped.kneighbors
+    ) as kneighbors:
+        estimate = estimator.estimate(X_image, n_samples=2, random_state=0)
+
+    assert estimate.n_tasks == 1
+    assert estimate.chunks == (1100, 600)
+    assert estimate.n_sampled == 2
+    assert estimate.output_nbytes == estimator.predict(X_image).nbytes
+    n_pixels = sum(call.args[0].shape[0] for call in kneighbors.call_args_list)
+    assert n_pixels <= 2 * 2 * 512 * 512
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        estimate = estimator.estimate(X_image, executor=executor)
+    assert estimate.n_tasks == 6
+    assert estimate.chunks == (512, 512)
+
+
+def test_estimate_validates_method_name(dummy_model_data):
+    """Test that only image methods can be estimated."""
+    X_image, X, y = dummy_model_data
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    with pytest.raises(ValueError, match="`method_name` must be one of"):
+        estimator.estimate(X_image, method_name="fit")
+
+
+def _inverse_square_weights(dist):
+    return 1.0 / (dist**2 + 1e-6)
+
+
+@pytest.mark.parametrize(
+    "weights",
+    ["uniform", "distance", _inverse_square_weights],
+    ids=["uniform", "distance", "callable"],
+)
+def test_predict_from_neighbors_matches_sklearn_weights(weights):
+    """Test that neighbor weights, including exact matches, match scikit-learn."""
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 3))
+    y = rng.random((50, 2))
+    # Duplicate a sample so some pixels have several neighbors at zero distance
+    X[1] = X[0]
+    X_image = np.concatenate([X[:10], rng.random((6, 3))]).T.reshape(3, 4, 4)
+
+    regressor = KNeighborsRegressor(n_neighbors=3, weights=weights)
+    expected = regressor.fit(X, y).predict(X_image.reshape(3, -1).T)
+    expected = expected.T.reshape(2, 4, 4)
+    y_pred, _, _ = wrap(clone(regressor)).fit(X, y).predict_with_neighbors(X_image)
+
+    assert_array_almost_equal(y_pred, expected)
@@ -1,12 +1,18 @@
 """Test the image module."""
 
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from unittest import mock
+
 import numpy as np
 import pytest
 import xarray as xr
 from numpy.testing import assert_array_equal
 
-from sknnr_spatial.image import Image
+from sknnr_spatial.image import Image, NDArrayImage, _PickledFunction
 from sknnr_spatial.types import ImageType
+from sknnr_spatial.utils.chunks import plan_chunks
 
 from .image_utils import (
     parametrize_image_types,
@@ -202,3 +208,495 @@ def test_wrappers(image_type):
     wrapped = wrap_image(array, type=image_type)
     assert isinstance(wrapped, image_type)
     assert_array_equal(unwrap_image(wrapped), array)
+
+
+@parametrize_image_types
+def test_skip_nodata_matches_masked_output(image_type: type[ImageType]):
+    """Test that skipping NoData gives the same output as masking after the fact."""
+    a = np.random.rand(3, 8, 8)
+    a[:, :4, :] = -1
+    a[1][6][2] = np.nan
+
+    outputs = []
+    for skip_nodata in (False, True):
+        image = Image.from_image(wrap_image(a, type=image_type), nodata_vals=-1)
+        output = image.apply_ufunc_across_bands(
+            func=lambda x: x * 2.0,
+            skip_nodata=skip_nodata,
+            output_dims=[["variable"]],
+            output_sizes={"variable": a.shape[0]},
+            output_dtypes=[np.float64],
+        )
+        outputs.append(unwrap_image(output))
+
+    assert_array_equal(*outputs)
+
+
+def test_skip_nodata_only_passes_valid_pixels():
+    """Test that only valid pixels are passed to the function when skipping NoData."""
+    a = np.random.rand(3, 8, 8)
+    a[:, :2, :] = -1
+    n_valid = 6 * 8
+    received_shapes = []
+
+    def func(x):
+        received_shapes.append(x.shape)
+        return x
+
+    image = Image.from_image(a, nodata_vals=-1)
+    image.apply_ufunc_across_bands(
+        func=func,
+        skip_nodata=True,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+    )
+
+    assert received_shapes == [(n_valid, a.shape[0])]
+
+
+@pytest.mark.parametrize("n_outputs", [1, 2])
+def test_skip_nodata_fully_masked_chunk(n_outputs):
+    """Test that chunks with no valid pixels don't call the function."""
+    a = np.full((3, 8, 8), -1.0)
+
+    def func(x):
+        raise AssertionError("The function should not be called.")
+
+    image = Image.from_image(a, nodata_vals=-1)
+    output = image.apply_ufunc_across_bands(
+        func=func,
+        skip_nodata=True,
+        output_dims=[["variable"]] * n_outputs,
+        output_sizes={"variable": 2},
+    )
+    outputs = output if n_outputs > 1 else (output,)
+
+    for output in outputs:
+        assert_array_equal(output, np.full((2, 8, 8), np.nan))
+
+
+def test_ndarray_input_not_copied():
+    """Test that Numpy images are passed to apply_ufunc as views, not copies."""
+    array = np.random.rand(3, 8, 8)
+    image = Image.from_image(array)
+
+    assert np.shares_memory(image._preprocess_ufunc_input(image.image), array)
+
+
+def test_chunk_is_read_only():
+    """Test that applied functions can't mutate the source image."""
+    array = np.random.rand(3, 8, 8)
+    original_array = array.copy()
+
+    def mutate(x):
+        x += 1
+        return x
+
+    image = Image.from_image(array)
+    with pytest.raises(ValueError, match="read-only"):
+        image.apply_ufunc_across_bands(
+            mutate, nan_fill=None, output_dims=[["variable"]]
+        )
+
+    assert_array_equal(array, original_array)
+
+
+@pytest.mark.parametrize("tile_size", [(1, 16), (3, 5), (8, 16)])
+@pytest.mark.parametrize("n_outputs", [1, 2])
+def test_tiled_ndarray_matches_untiled(tile_size, n_outputs):
+    """Test that tiled Numpy images give the same output as untiled images."""
+    array = np.random.rand(3, 8, 16)
+    array[1, 2, 3] = np.nan
+
+    def func(x):
+        return (x * 2.0,) * n_outputs if n_outputs > 1 else x * 2.0
+
+    outputs = []
+    for image in (NDArrayImage(array), NDArrayImage(array, tile_size=tile_size)):
+        output = image.apply_ufunc_across_bands(
+            func,
+            output_dims=[["variable"]] * n_outputs,
+            output_sizes={"variable": array.shape[0]},
+        )
+        outputs.append(output if n_outputs > 1 else (output,))
+
+    for untiled, tiled in zip(*outputs):
+        assert_array_equal(untiled, tiled)
+
+
+def test_memmap_processed_in_tiles(tmp_path):
+    """Test that memory-mapped images are tiled and give the same output as arrays."""
+    array = np.random.rand(3, 8, 16)
+    memmap = np.memmap(
+        tmp_path / "image.dat", dtype=array.dtype, shape=array.shape, mode="w+"
+    )
+    memmap[:] = array
+    memmap.flush()
+
+    bytes_per_row = array.shape[0] * array.shape[2] * array.itemsize
+    with mock.patch("sknnr_spatial.image.MEMMAP_TILE_BYTES", bytes_per_row * 3):
+        image = Image.from_image(
+            np.memmap(
+                tmp_path / "image.dat", dtype=array.dtype, shape=array.shape, mode="r"
+            )
+        )
+
+    assert isinstance(image, NDArrayImage)
+    assert image.tile_size == (3, 16)
+
+    output = image.apply_ufunc_across_bands(
+        lambda x: x * 2.0,
+        output_dims=[["variable"]],
+        output_sizes={"variable": array.shape[0]},
+    )
+    assert_array_equal(output, array * 2.0)
+
+
+@parametrize_image_types
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_dtype_preserved(image_type: type[ImageType], dtype, skip_nodata):
+    """Test that the chunk passed to the function and the output use the dtype."""
+    a = np.random.randint(0, 10, size=(3, 8, 8))
+    received_dtypes = set()
+
+    def func(x):
+        received_dtypes.add(x.dtype)
+        return x.astype(np.float64)
+
+    image = Image.from_image(wrap_image(a, type=image_type), nodata_vals=0)
+    output = image.apply_ufunc_across_bands(
+        func,
+        dtype=dtype,
+        skip_nodata=skip_nodata,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+        output_dtypes=[dtype],
+    )
+
+    assert unwrap_image(output).dtype == dtype
+    # Dask may call the function with an empty array to infer metadata
+    assert received_dtypes == {np.dtype(dtype)}
+
+
+@parametrize_image_types
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_integer_chunks_passed_unchanged_without_dtype(
+    image_type: type[ImageType], skip_nodata
+):
+    """Test that chunks keep their dtype if no dtype is given and NaNs aren't filled."""
+    a = np.random.randint(1, 10, size=(3, 8, 8)).astype(np.int16)
+    received_dtypes = set()
+
+    def func(x):
+        received_dtypes.add(x.dtype)
+        return x
+
+    image = Image.from_image(wrap_image(a, type=image_type), nodata_vals=0)
+    output = image.apply_ufunc_across_bands(
+        func,
+        nan_fill=None,
+        skip_nodata=skip_nodata,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+        output_dtypes=[np.int16],
+    )
+
+    assert_array_equal(unwrap_image(output), a)
+    assert received_dtypes == {np.dtype(np.int16)}
+
+
+def test_dtype_must_be_float():
+    """Test that non-floating point dtypes are rejected."""
+    image = Image.from_image(np.zeros((3, 2, 2)))
+
+    with pytest.raises(ValueError, match="must be a floating point type"):
+        image.apply_ufunc_across_bands(
+            lambda x: x, dtype=np.int32, output_dims=[["variable"]]
+        )
+
+
+@parametrize_image_types
+@pytest.mark.parametrize("skip_nodata", [True, False])
+@pytest.mark.parametrize(
+    ("output_nodata", "expected_fill"), [(None, -(2**31)), (-1, -1)]
+)
+def test_integer_outputs_masked_with_sentinel(
+    image_type: type[ImageType], skip_nodata, output_nodata, expected_fill
+):
+    """Test that masked integer outputs keep their dtype and use a NoData sentinel."""
+    a = np.ones((3, 8, 8))
+    a[:, 0, 0] = np.nan
+    expected_output = np.ones((3, 8, 8), dtype=np.int32)
+    expected_output[:, 0, 0] = expected_fill
+
+    image = Image.from_image(wrap_image(a, type=image_type))
+    output = image.apply_ufunc_across_bands(
+        lambda x: x.astype(np.int64),
+        skip_nodata=skip_nodata,
+        output_nodata=output_nodata,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+        output_dtypes=[np.int32],
+    )
+
+    assert_array_equal(unwrap_image(output), expected_output)
+    assert unwrap_image(output).dtype == np.int32
+
+    if image_type is xr.DataArray:
+        assert output.attrs["_FillValue"] == expected_fill
+    elif image_type is xr.Dataset:
+        assert all(output[v].attrs["_FillValue"] == expected_fill for v in output)
+
+
+@pytest.mark.parametrize("image_type", [xr.DataArray, xr.Dataset])
+def test_uncastable_integer_outputs_record_float_fill(image_type: type[ImageType]):
+    """Test that outputs that can't be cast to their integer dtype record NaN."""
+    a = np.ones((3, 8, 8))
+    a[:, 0, 0] = np.nan
+
+    image = Image.from_image(wrap_image(a, type=image_type))
+    output = image.apply_ufunc_across_bands(
+        lambda x: x + 0.5,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+        output_dtypes=[np.int32],
+    )
+
+    assert unwrap_image(output).dtype == np.float64
+    assert np.isnan(unwrap_image(output)[:, 0, 0]).all()
+    if image_type is xr.DataArray:
+        assert np.isnan(output.attrs["_FillValue"])
+    else:
+        assert all(np.isnan(output[v].attrs["_FillValue"]) for v in output)
+
+
+@parametrize_image_types
+def test_float_outputs_fill_value_replaced(image_type: type[ImageType]):
+    """Test that float outputs record NaN instead of the input fill value."""
+    a = np.ones((3, 8, 8))
+    img = wrap_image(a, type=image_type)
+    if image_type is not np.ndarray:
+        img = img.assign_attrs({"_FillValue": -32768})
+
+    output = Image.from_image(img).apply_ufunc_across_bands(
+        lambda x: x,
+        output_dims=[["variable"]],
+        output_sizes={"variable": a.shape[0]},
+        output_dtypes=[np.float64],
+    )
+
+    if image_type is xr.DataArray:
+        assert np.isnan(output.attrs["_FillValue"])
+    elif image_type is xr.Dataset:
+        assert all(np.isnan(output[v].attrs["_FillValue"]) for v in output)
+
+
+def test_output_nodata_out_of_range():
+    """Test that a NoData sentinel that can't be stored in the output dtype raises."""
+    image = Image.from_image(np.ones((3, 2, 2)))
+
+    with pytest.raises(ValueError, match="out of range for output dtype `uint8`"):
+        image.apply_ufunc_across_bands(
+            lambda x: x,
+            output_nodata=-1,
+            output_dims=[["variable"]],
+            output_dtypes=[np.uint8],
+        )
+
+
+@pytest.mark.parametrize("skip_nodata", [True, False])
+@pytest.mark.parametrize("n_outputs", [1, 2])
+def test_batched_pixels_match_unbatched(skip_nodata, n_outputs):
+    """Test that batching pixels bounds the batch size without changing the output."""
+    array = np.random.rand(3, 8, 16)
+    array[:, 0, :5] = -1
+    received_shapes = []
+
+    def func(x):
+        received_shapes.append(x.shape)
+        return (x * 2.0,) * n_outputs if n_outputs > 1 else x * 2.0
+
+    outputs = []
+    for max_pixels_per_batch in (None, 10):
+        output = Image.from_image(array, nodata_vals=-1).apply_ufunc_across_bands(
+            func,
+            output_dims=[["variable"]] * n_outputs,
+            output_sizes={"variable": array.shape[0]},
+            skip_nodata=skip_nodata,
+            max_pixels_per_batch=max_pixels_per_batch,
+        )
+        outputs.append(output if n_outputs > 1 else (output,))
+
+    n_pixels = 8 * 16 - (5 if skip_nodata else 0)
+    assert received_shapes[0] == (n_pixels, 3)
+    assert max(shape[0] for shape in received_shapes[1:]) == 10
+    assert sum(shape[0] for shape in received_shapes[1:]) == n_pixels
+
+    for unbatched, batched in zip(*outputs):
+        assert_array_equal(unbatched, batched)
+
+
+def test_deduplicate_calls_func_with_unique_pixels(caplog):
+    """Test that duplicate pixels are only passed to the function once."""
+    array = np.zeros((2, 8, 8))
+    array[:, :4] = 1.0
+    array[0, 0, 0] = 2.0
+    received_shapes = []
+
+    def func(x):
+        received_shapes.append(x.shape)
+        return x.sum(axis=1, keepdims=True)
+
+    image = Image.from_image(array)
+    kwargs = dict(output_dims=[["variable"]], output_sizes={"variable": 1})
+    with caplog.at_level("DEBUG", logger="sknnr_spatial.image"):
+        output = image.apply_ufunc_across_bands(func, deduplicate=True, **kwargs)
+
+    assert received_shapes == [(3, 2)]
+    assert "Deduplicated 64 pixels to 3 unique pixels (4.7%)." in caplog.text
+    assert_array_equal(output, image.apply_ufunc_across_bands(func, **kwargs))
+
+
+def test_max_pixels_per_batch_must_be_positive():
+    """Test that batches must contain at least one pixel."""
+    image = Image.from_image(np.random.rand(3, 8, 8))
+
+    with pytest.raises(ValueError, match="must be a positive integer"):
+        image.apply_ufunc_across_bands(
+            lambda x: x, output_dims=[["variable"]], max_pixels_per_batch=0
+        )
+
+
+@pytest.mark.parametrize(
+    ("shape", "memory_limit", "expected_chunks"),
+    [
+        ((16, 20), 64 * 100, (10, 10)),
+        ((16, 20), 64 * 160, (12, 13)),
+        ((16, 4), 64 * 40, (10, 4)),
+        ((16, 20), "1MB", (16, 20)),
+        ((16, 20), 64 * 3, (1, 3)),
+    ],
+)
+def test_plan_chunks_fits_memory_limit(shape, memory_limit, expected_chunks):
+    """Test that planned chunks are as large and square as the budget allows."""
+    plan = plan_chunks(shape, memory_limit=memory_limit, pixel_bytes=64)
+
+    assert plan.chunks == expected_chunks
+    assert plan.peak_memory <= plan.memory_limit
+    assert plan.n_chunks == np.prod(np.ceil(np.divide(shape, plan.chunks)))
+
+
+def test_plan_chunks_raises_if_too_small():
+    """Test that budgets too small for a single pixel are rejected."""
+    with pytest.raises(ValueError, match="too small to process a single pixel"):
+        plan_chunks((16, 20), memory_limit=100, pixel_bytes=64, fixed_bytes=50)
+
+
+def test_image_plan_chunks_counts_batches():
+    """Test that working memory is fixed per chunk when pixels are batched."""
+    image = Image.from_image(np.random.rand(3, 100, 100))
+
+    unbatched = image.plan_chunks("1MB", working_bytes_per_pixel=800)
+    batched = image.plan_chunks(
+        "1MB", working_bytes_per_pixel=800, max_pixels_per_batch=100
+    )
+
+    assert np.prod(batched.chunks) > np.prod(unbatched.chunks)
+    assert batched.peak_memory <= batched.memory_limit
+
+
+@pytest.mark.parametrize("chunked", [True, False])
+def test_chunk_memory_rechunks_or_tiles(chunked, caplog):
+    """Test that planned chunks are applied by rechunking or tiling the image."""
+    array = xr.DataArray(np.random.rand(3, 32, 40), dims=["band", "y", "x"])
+    array = array.chunk({"band": 1, "y": 5, "x": 5}) if chunked else array
+    image = Image.from_image(array)
+    received_shapes = []
+
+    def func(x):
+        received_shapes.append(x.shape)
+        return x
+
+    kwargs = dict(output_dims=[["variable"]], output_sizes={"variable": 3})
+    plan = image.plan_chunks("20kB", output_widths=[3])
+    with caplog.at_level("INFO", logger="sknnr_spatial.image"):
+        output = image.apply_ufunc_across_bands(func, chunk_memory="20kB", **kwargs)
+
+    assert str(plan) in caplog.text
+    if chunked:
+        assert (
+            output.chunks[1:]
+            == array.chunk(dict(zip(("y", "x"), plan.chunks))).chunks[1:]
+        )
+        output = output.compute()
+    assert max(shape[0] for shape in received_shapes) == np.prod(plan.chunks)
+    assert_array_equal(output, image.apply_ufunc_across_bands(func, **kwargs))
+
+
+@pytest.mark.parametrize("executor_type", [ThreadPoolExecutor, ProcessPoolExecutor])
+@pytest.mark.parametrize("n_outputs", [1, 2])
+def test_executor_matches_serial(executor_type, n_outputs):
+    """Test that tiles processed by an executor give the same output as serially."""
+    array = np.random.rand(3, 40, 50)
+    array[:, 0, 0] = -1
+    kwargs = dict(output_dims=[["variable"]] * n_outputs, output_sizes={"variable": 3})
+
+    def func(x):
+        return (x * 2.0,) * n_outputs if n_outputs > 1 else x * 2.0
+
+    image = Image.from_image(array, nodata_vals=-1)
+    expected = image.apply_ufunc_across_bands(func, **kwargs)
+
+    with (
+        executor_type(max_workers=2) as executor,
+        mock.patch("sknnr_spatial.image.EXECUTOR_TILE_SIZE", (16, 16)),
+    ):
+        output = image.apply_ufunc_across_bands(func, executor=executor, **kwargs)
+
+    outputs = output if n_outputs > 1 else (output,)
+    for output, expected_output in zip(
+        outputs, expected if n_outputs > 1 else (expected,)
+    ):
+        assert_array_equal(output, expected_output)
+
+
+def test_executor_ignored_for_dask_images():
+    """Test that Dask-backed images are computed by Dask rather than the executor."""
+    array = xr.DataArray(np.random.rand(3, 8, 8)).chunk()
+    executor = mock.Mock(spec=ThreadPoolExecutor)
+
+    output = Image.from_image(array).apply_ufunc_across_bands(
+        lambda x: x,
+        output_dims=[["variable"]],
+        output_sizes={"variable": 3},
+        executor=executor,
+    )
+
+    assert_array_equal(output.compute(), array)
+    executor.map.assert_not_called()
+
+
+def test_process_workers_attach_to_shared_arrays():
+    """Test that large arrays captured by a function are shared with process workers."""
+    weights = np.random.rand(100_000)
+
+    def func():
+        return weights.flags.owndata, weights.sum()
+
+    with (
+        ProcessPoolExecutor(max_workers=1) as executor,
+        _PickledFunction(func) as pickled,
+    ):
+        names = [block.name for block in pickled._blocks]
+        owndata, total = executor.submit(pickled).result()
+
+        assert len(pickle.dumps(pickled)) < weights.nbytes / 10
+        assert not owndata
+        assert total == pytest.approx(weights.sum())
+
+    # Shared memory is unlinked once the function is closed
+    assert names
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
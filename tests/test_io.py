@@ -0,0 +1,217 @@
+"""Tests for writing images to file."""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pytest
+import rasterio
+import rioxarray  # noqa: F401
+import xarray as xr
+import zarr
+from numpy.testing import assert_array_almost_equal, assert_array_equal
+from sklearn.neighbors import KNeighborsRegressor
+
+from sknnr_spatial import wrap
+from sknnr_spatial.io import zarr as zarr_io
+from sknnr_spatial.io.geotiff import write_geotiff
+from sknnr_spatial.io.zarr import get_manifest_path
+from sknnr_spatial.progress import ProgressTracker
+
+
+def _make_model_data(n_features=3, shape=(40, 50)):
+    X_image = np.random.rand(n_features, *shape)
+    X = np.random.rand(20, n_features)
+    y = np.random.rand(20, 2)
+
+    return X_image, X, y
+
+
+def _make_dataarray(X_image, crs="EPSG:5070"):
+    """Make a georeferenced, Dask-backed DataArray image."""
+    _, n_rows, n_cols = X_image.shape
+    da = xr.DataArray(
+        X_image,
+        dims=["band", "y", "x"],
+        coords={
+            "y": 1000.0 - 30.0 * np.arange(n_rows),
+            "x": 500.0 + 30.0 * np.arange(n_cols),
+        },
+    )
+    return da.rio.write_crs(crs).chunk({"band": -1, "y": 16, "x": 16})
+
+
+def test_predict_to_file_matches_predict(tmp_path):
+    """Test that streamed predictions match in-memory predictions and metadata."""
+    X_image, X, y = _make_model_data()
+    X_image = _make_dataarray(X_image)
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    path = estimator.predict_to_file(X_image, tmp_path / "pred.tif", blocksize=16)
+    expected = estimator.predict(X_image)
+
+    with rasterio.open(path) as src:
+        assert_array_almost_equal(src.read(), expected.values)
+        assert src.crs == "EPSG:5070"
+        assert src.transform == X_image.rio.transform()
+        assert src.descriptions == ("0", "1")
+        assert src.block_shapes == [(16, 16)] * 2
+        assert src.compression.name == "deflate"
+        assert np.isnan(src.nodata)
+
+
+def test_predict_to_file_ndarray(tmp_path):
+    """Test that Numpy predictions are written with their NoData value."""
+    X_image, X, y = _make_model_data()
+    X_image[:, 0, 0] = -1
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    path = estimator.predict_to_file(X_image, tmp_path / "pred.tif", nodata_vals=-1)
+
+    with rasterio.open(path) as src:
+        assert_array_almost_equal(
+            src.read(), estimator.predict(X_image, nodata_vals=-1)
+        )
+        assert np.isnan(src.nodata)
+        assert src.crs is None
+
+
+@pytest.mark.parametrize("with_distance", [True, False])
+def test_kneighbors_to_file(tmp_path, with_distance):
+    """Test that neighbors and optionally distances are written to separate files."""
+    X_image, X, y = _make_model_data()
+    X_image = _make_dataarray(X_image)
+    estimator = wrap(KNeighborsRegressor(n_neighbors=3)).fit(X, y)
+
+    distance_path = tmp_path / "dist.tif" if with_distance else None
+    paths = estimator.kneighbors_to_file(
+        X_image, tmp_path / "nn.tif", distance_path=distance_path
+    )
+    dist, nn = estimator.kneighbors(X_image, return_distance=True)
+
+    nn_path, dist_path = paths if with_distance else (paths, None)
+    with rasterio.open(nn_path) as src:
+        assert_array_equal(src.read(), nn.values)
+        assert src.dtypes[0] == nn.dtype
+        assert src.nodata == nn.attrs["_FillValue"]
+
+    if with_distance:
+        with rasterio.open(dist_path) as src:
+            assert_array_almost_equal(src.read(), dist.values)
+
+
+def test_write_cog(tmp_path):
+    """Test that images can be written as Cloud Optimized GeoTIFFs."""
+    image = _make_dataarray(np.random.rand(2, 64, 64))
+
+    path = write_geotiff(image, tmp_path / "image.tif", cog=True, blocksize=32)
+
+    with rasterio.open(path) as src:
+        assert src.tags(ns="IMAGE_STRUCTURE")["LAYOUT"] == "COG"
+        assert_array_almost_equal(src.read(), image.values)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_write_geotiff_validates_blocksize(tmp_path):
+    """Test that internal tiles must be a multiple of 16."""
+    with pytest.raises(ValueError, match="multiple of 16"):
+        write_geotiff(np.ones((1, 8, 8)), tmp_path / "image.tif", blocksize=10)
+
+
+def test_predict_to_zarr_matches_predict(tmp_path):
+    """Test that predictions written to Zarr match in-memory predictions."""
+    X_image, X, y = _make_model_data()
+    X_image = _make_dataarray(X_image)
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+
+    store = estimator.predict_to_zarr(X_image, tmp_path / "pred.zarr")
+    prediction = xr.open_zarr(store, consolidated=False)["prediction"]
+
+    assert prediction.dims == ("variable", "y", "x")
+    assert prediction.chunks[1:] == X_image.chunks[1:]
+    assert_array_almost_equal(prediction.values, estimator.predict(X_image).values)
+
+
+def test_predict_to_zarr_resumes(tmp_path):
+    """Test that re-running a job only computes chunks missing from the manifest."""
+    X_image, X, y = _make_model_data()
+    X_image = _make_dataarray(X_image)
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    store = estimator.predict_to_zarr(X_image, tmp_path / "pred.zarr")
+
+    # Simulate an interrupted run by forgetting the last chunk and erasing its data
+    manifest_path = get_manifest_path(store)
+    completed = manifest_path.read_text().splitlines()
+    manifest_path.write_text(
+        "\n".join(line for line in completed if line != "prediction/0.2.3") + "\n"
+    )
+    prediction = zarr.open_group(store, mode="r+")["prediction"]
+    prediction[:, 32:, 48:] = 0.0
+
+    with mock.patch(
+        "sknnr_spatial.io.zarr._write_block", wraps=zarr_io._write_block
+    ) as write_block:
+        estimator.predict_to_zarr(X_image, store)
+
+    assert write_block.call_count == 1
+    assert manifest_path.read_text().splitlines()[-1] == "prediction/0.2.3"
+    assert_array_almost_equal(prediction[:], estimator.predict(X_image).values)
+
+
+def test_predict_to_zarr_resumes_with_new_execution_options(tmp_path):
+    """Test that options that don't change predictions can differ between runs."""
+    X_image, X, y = _make_model_data()
+    X_image = _make_dataarray(X_image)
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        store = estimator.predict_to_zarr(
+            X_image,
+            tmp_path / "pred.zarr",
+            executor=executor,
+            progress=ProgressTracker(),
+            max_pixels_per_batch=100,
+        )
+
+    # Forget the last chunk so that the resumed run reports progress
+    manifest_path = get_manifest_path(store)
+    completed = manifest_path.read_text().splitlines()
+    manifest_path.write_text("\n".join(completed[:-1]) + "\n")
+
+    reports = []
+    with (
+        ThreadPoolExecutor(max_workers=1) as executor,
+        mock.patch(
+            "sknnr_spatial.io.zarr._write_block", wraps=zarr_io._write_block
+        ) as write_block,
+    ):
+        estimator.predict_to_zarr(
+            X_image,
+            store,
+            executor=executor,
+            progress=reports.append,
+            chunk_memory="16KB",
+        )
+
+    assert write_block.call_count == 1
+    assert reports
+    assert manifest_path.read_text().splitlines() == completed
+    prediction = zarr.open_group(store, mode="r")["prediction"]
+    assert_array_almost_equal(prediction[:], estimator.predict(X_image).values)
+
+
+def test_predict_to_zarr_validates_store(tmp_path):
+    """Test that stores from other jobs or sources aren't resumed unless replaced."""
+    X_image, X, y = _make_model_data()
+    estimator = wrap(KNeighborsRegressor()).fit(X, y)
+    store = estimator.predict_to_zarr(X_image, tmp_path / "pred.zarr")
+
+    with pytest.raises(ValueError, match="different job"):
+        estimator.predict_to_zarr(X_image, store, dtype=np.float32)
+
+    estimator.predict_to_zarr(X_image, store, dtype=np.float32, overwrite=True)
+    prediction = xr.open_zarr(store, consolidated=False)["prediction"]
+    assert prediction.dtype == np.float32
+
+    (tmp_path / "other.zarr").mkdir()
+    with pytest.raises(FileExistsError, match="wasn't written by"):
+        estimator.predict_to_zarr(X_image, tmp_path / "other.zarr")
@@ -0,0 +1,78 @@
+"""Tests for chunk profiling."""
+
+import pytest
+import xarray as xr
+
+from sknnr_spatial.cache import ChunkCache
+from sknnr_spatial.profiling import STAGES, ChunkProfiler, start_chunk
+
+
+@pytest.fixture
+def estimator_and_chunked_image(estimator_and_image):
+    estimator, image = estimator_and_image
+    image = xr.DataArray(image, dims=["variable", "y", "x"]).chunk({"y": 16, "x": 16})
+    return estimator, image
+
+
+@pytest.mark.parametrize("skip_nodata", [True, False])
+def test_profiler_records_each_chunk(estimator_and_chunked_image, skip_nodata):
+    """Test that each chunk's pixels, valid pixels, and stages are recorded."""
+    estimator, image = estimator_and_chunked_image
+
+    with ChunkProfiler() as profiler:
+        estimator.predict(image, skip_nodata=skip_nodata).compute()
+
+    df = profiler.to_dataframe()
+    assert len(df) == 4
+    assert (df["n_pixels"] == 16 * 16).all()
+    assert sorted(df["n_valid"]) == [128, 128, 256, 256]
+    assert (df["nbytes"] > 0).all()
+    assert (df[list(STAGES)] > 0).all().all()
+    assert (df["total"] >= df[list(STAGES)].sum(axis=1)).all()
+    assert "4 chunks (0 cached), 1024 pixels (768 valid)" in profiler.summary()
+
+
+def test_profiler_only_records_within_context(estimator_and_chunked_image):
+    """Test that chunks are only profiled while a profiler is active."""
+    estimator, image = estimator_and_chunked_image
+    y_pred = estimator.predict(image)
+
+    assert start_chunk(1) is None
+
+    with ChunkProfiler() as outer, ChunkProfiler() as inner:
+        y_pred.compute()
+    y_pred.compute()
+
+    assert len(outer.profiles) == len(inner.profiles) == 4
+
+
+def test_profiler_callback_and_cached_chunks(estimator_and_chunked_image, tmp_path):
+    """Test that the callback receives every chunk, including cached chunks."""
+    estimator, image = estimator_and_chunked_image
+    cache = ChunkCache(tmp_path)
+    received = []
+
+    with ChunkProfiler(callback=received.append) as profiler:
+        estimator.predict(image, cache=cache).compute()
+        estimator.predict(image, cache=cache).compute()
+
+    assert received == profiler.profiles
+    assert [p.cached for p in received] == [False] * 4 + [True] * 4
+
+
+def test_profiler_records_unique_pixels(estimator_and_chunked_image):
+    """Test that the number of unique pixels is recorded for deduplicated chunks."""
+    estimator, image = estimator_and_chunked_image
+    # Repeat one column of pixels across each row
+    image = image.isel(x=[0] * 32).chunk({"y": 16, "x": 16})
+
+    with ChunkProfiler() as profiler:
+        estimator.predict(image).compute()
+        estimator.predict(image, skip_nodata=True, deduplicate=True).compute()
+
+    df = profiler.to_dataframe()
+    assert df["n_unique"][:4].isna().all()
+    assert sorted(df["n_unique"][4:]) == [8, 8, 16, 16]
+    assert "4 chunks deduplicated, 48 unique pixels (4.7% of their pixels)" in (
+        profiler.summary()
+    )
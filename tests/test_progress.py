@@ -0,0 +1,89 @@
+"""Tests for progress tracking."""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+
+import pytest
+import xarray as xr
+
+from sknnr_spatial.progress import Progress, ProgressTracker
+
+
+def test_progress_reports_dask_chunks(estimator_and_image):
+    """Test that each lazily computed chunk is reported once it's processed."""
+    estimator, image = estimator_and_image
+    image = xr.DataArray(image, dims=["variable", "y", "x"]).chunk({"y": 16, "x": 16})
+    updates = []
+    tracker = ProgressTracker(callback=updates.append)
+
+    y_pred = estimator.predict(image, progress=tracker)
+    assert tracker.snapshot().total == 4
+    assert tracker.snapshot().completed == 0
+
+    y_pred.compute()
+    assert [update.completed for update in updates] == [1, 2, 3, 4]
+
+    final = tracker.snapshot()
+    assert final.fraction == 1.0
+    assert final.remaining == 0.0
+    assert final.n_pixels == 32 * 32
+    assert final.n_valid == 24 * 32
+    assert final.throughput > 0
+
+
+@pytest.mark.parametrize(
+    "executor", [None, ThreadPoolExecutor, ProcessPoolExecutor], ids=str
+)
+def test_progress_reports_tiles(estimator_and_image, executor):
+    """Test that tiles of in-memory images are reported with any executor."""
+    estimator, image = estimator_and_image
+    tracker = ProgressTracker()
+
+    with executor(max_workers=2) if executor else nullcontext() as pool:
+        estimator.predict(
+            image, progress=tracker, executor=pool, chunk_memory=16 * 16 * 200
+        )
+
+    final = tracker.snapshot()
+    assert final.total > 1
+    assert final.completed == final.total
+    assert final.n_pixels == 32 * 32
+    assert final.n_valid == 24 * 32
+
+
+def test_progress_tracks_multiple_calls(estimator_and_image):
+    """Test that a tracker passed to multiple methods tracks their chunks together."""
+    estimator, image = estimator_and_image
+    tracker = ProgressTracker()
+
+    estimator.predict(image, progress=tracker)
+    estimator.kneighbors(image, progress=tracker)
+
+    assert tracker.snapshot().completed == tracker.snapshot().total == 2
+
+
+def test_progress_accepts_callable(estimator_and_image):
+    """Test that a plain callable is reported to through a new tracker."""
+    estimator, image = estimator_and_image
+    updates = []
+
+    estimator.predict(image, progress=updates.append, chunk_memory=16 * 16 * 200)
+
+    assert len(updates) > 1
+    assert updates[-1].completed == updates[-1].total == len(updates)
+    assert updates[-1].n_pixels == 32 * 32
+
+
+def test_progress_estimates_remaining_time():
+    """Test that remaining time is extrapolated from completed chunks."""
+    progress = Progress(
+        completed=2, total=10, n_pixels=200, n_valid=100, elapsed=4.0, throughput=50.0
+    )
+
+    assert progress.fraction == 0.2
+    assert progress.remaining == 16.0
+    assert str(progress) == (
+        "2/10 chunks (20.0%), 200 pixels (100 valid), 50 pixels/s, 4s elapsed, "
+        "16s remaining"
+    )
+    assert Progress(0, 10, 0, 0, 0.0, 0.0).remaining is None